@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import { bookingsAPI, moviesAPI } from '../utils/api';
+import { API_URL, availabilityAPI, bookingsAPI, moviesAPI, queueAPI } from '../utils/api';
 import '../styles/BookingForm.css';
 
 const TICKET_PRICES: Record<string, number> = {
@@ -26,15 +26,24 @@ function BookingForm() {
   const [numberOfTickets, setNumberOfTickets] = useState(1);
   const [ticketType, setTicketType] = useState('Regular');
   const [ticketSlot, setTicketSlot] = useState(TIME_SLOTS[0]);
+  const [seatsAvailable, setSeatsAvailable] = useState<Record<string, number>>({});
 
   const [loading, setLoading] = useState(false);
+  const [queuePosition, setQueuePosition] = useState<number | null>(null);
   const [error, setError] = useState('');
-  const [bookingResult, setBookingResult] = useState<{ seat_number: string; qr_code: string } | null>(null);
+  const [bookingResult, setBookingResult] = useState<{ seat_number: string; qr_url: string } | null>(null);
 
   useEffect(() => {
     if (movieId) fetchMovie();
   }, [movieId]);
 
+  useEffect(() => {
+    if (!movieId) return;
+    return availabilityAPI.subscribe(Number(movieId), (update) =>
+      setSeatsAvailable(seats => ({ ...seats, [update.ticket_slot]: update.seats_available }))
+    );
+  }, [movieId]);
+
   const fetchMovie = async () => {
     try {
       const res = await moviesAPI.getById(Number(movieId));
@@ -56,8 +65,24 @@ function BookingForm() {
         ticket_type: ticketType,
         ticket_slot: ticketSlot,
       });
-      if (res.data && res.data.seat_number && res.data.qr_code) {
-        setBookingResult({ seat_number: res.data.seat_number, qr_code: res.data.qr_code });
+      let booking = res.data;
+      if (res.status === 202) {
+        // The movie has a waiting room: wait for our turn, then for the booking
+        let ticket = res.data;
+        while (ticket.status === 'waiting' || ticket.status === 'admitted') {
+          setQueuePosition(ticket.position);
+          await new Promise(resolve => setTimeout(resolve, 2000));
+          ticket = (await queueAPI.get(ticket.id)).data;
+        }
+        setQueuePosition(null);
+        if (ticket.status === 'failed') {
+          setError(ticket.detail || 'Booking failed');
+          return;
+        }
+        booking = ticket.booking;
+      }
+      if (booking && booking.seat_number && booking.qr_url) {
+        setBookingResult({ seat_number: booking.seat_number, qr_url: booking.qr_url });
       }
       alert('Booking successful!');
       // Optionally, you can navigate after showing result
@@ -65,6 +90,7 @@ function BookingForm() {
     } catch (err: any) {
       setError(err.response?.data?.detail || 'Booking failed');
     } finally {
+      setQueuePosition(null);
       setLoading(false);
     }
   };
@@ -116,7 +142,12 @@ function BookingForm() {
               <label>Time Slot</label>
               <select value={ticketSlot} onChange={(e) => setTicketSlot(e.target.value)}>
                 {TIME_SLOTS.map(slot => (
-                  <option key={slot} value={slot}>{slot}</option>
+                  <option key={slot} value={slot} disabled={seatsAvailable[slot] === 0}>
+                    {slot}
+                    {seatsAvailable[slot] === undefined
+                      ? ''
+                      : seatsAvailable[slot] === 0 ? ' (sold out)' : ` (${seatsAvailable[slot]} seats left)`}
+                  </option>
                 ))}
               </select>
             </div>
@@ -147,7 +178,9 @@ function BookingForm() {
             {error && <p className="error-message">{error}</p>}
 
             <button type="submit" disabled={loading} className="book-btn">
-              {loading ? 'Processing...' : 'Confirm Booking'}
+              {queuePosition
+                ? `In the waiting room, position ${queuePosition}`
+                : loading ? 'Processing...' : 'Confirm Booking'}
             </button>
           </form>
         ) : (
@@ -155,7 +188,7 @@ function BookingForm() {
             <h2>Booking Confirmed!</h2>
             <p><strong>Your Seat Number:</strong> {bookingResult.seat_number}</p>
             <p><strong>Your QR Code:</strong></p>
-            <img src={bookingResult.qr_code} alt="QR Code" style={{ width: '150px', height: '150px' }} />
+            <img src={`${API_URL}${bookingResult.qr_url}`} alt="QR Code" style={{ width: '150px', height: '150px' }} />
             <button className="book-btn" onClick={() => navigate('/my-bookings')}>Go to My Bookings</button>
           </div>
         )}
@@ -1,13 +1,13 @@
 import { useEffect, useState, type ReactNode } from 'react';
 import { FaTrash } from 'react-icons/fa';
 import { useNavigate } from 'react-router-dom';
-import { bookingsAPI } from '../utils/api';
+import { API_URL, bookingsAPI } from '../utils/api';
 import Footer from '../components/footer';
 import Navbar from '../components/navbar';
 import '../styles/BookingList.css';
 interface Booking {
   seat_number: string;
-  qr_code: any;
+  qr_url: string;
   id: number;
   uuid: string;
   Movies_id: number;
@@ -173,10 +173,10 @@ function BookingList() {
                       <strong>Booked on:</strong>{' '}
                       {new Date(booking.created_at).toLocaleDateString()}
                     </p>
-                    {booking.qr_code && (
+                    {booking.qr_url && (
                       <div style={{ marginTop: '1rem' }}>
                         <strong>QR Code:</strong><br />
-                        <img src={booking.qr_code} alt="QR Code" style={{ width: '120px', height: '120px' }} />
+                        <img src={`${API_URL}${booking.qr_url}`} alt="QR Code" style={{ width: '120px', height: '120px' }} />
                       </div>
                     )}
                   </div>
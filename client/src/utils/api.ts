@@ -1,6 +1,6 @@
 import axios from 'axios';
 
-const API_URL = 'http://localhost:8080';
+export const API_URL = 'http://localhost:8080';
 
 const api = axios.create({
   baseURL: API_URL,
@@ -44,9 +44,60 @@ export const bookingsAPI = {
     tickets_booked: number;
     ticket_type: string;
     ticket_slot: string;
-  }) => api.post('/user/bookings', data),
-  delete: (id: number) => api.delete(`/user/bookings/${id}`),
+  }, idempotencyKey?: string) =>
+    api.post('/user/bookings', data, idempotencyKey ? { headers: { 'Idempotency-Key': idempotencyKey } } : undefined),
+  delete: (id: number, idempotencyKey?: string) =>
+    api.delete(`/user/bookings/${id}`, idempotencyKey ? { headers: { 'Idempotency-Key': idempotencyKey } } : undefined),
 };
 
+// Orders for a movie with an open waiting room come back as a 202 with a queue ticket
+export const queueAPI = {
+  get: (id: string) => api.get(`/user/queue/${id}`),
+};
+
+export const holdsAPI = {
+  create: (data: {
+    Movies_id: number;
+    tickets_booked: number;
+    ticket_type: string;
+    ticket_slot: string;
+  }) => api.post('/user/holds', data),
+  confirm: (id: string, idempotencyKey?: string) =>
+    api.post(`/user/holds/${id}/confirm`, null, idempotencyKey ? { headers: { 'Idempotency-Key': idempotencyKey } } : undefined),
+  release: (id: string) => api.delete(`/user/holds/${id}`),
+};
+
+export const availabilityAPI = {
+  // Server-Sent Events of seat counts, one `availability` event per slot change
+  subscribe: (movieId: number, onUpdate: (update: {
+    Movies_id: number;
+    ticket_slot: string;
+    capacity: number;
+    seats_sold: number;
+    seats_available: number;
+  }) => void) => {
+    const source = new EventSource(`${API_URL}/movies/${movieId}/availability`);
+    source.addEventListener('availability', (event) => onUpdate(JSON.parse((event as MessageEvent).data)));
+    return () => source.close();
+  },
+};
+
+export const analyticsAPI = {
+  get: (params?: {
+    start?: string;
+    end?: string;
+    granularity?: 'hour' | 'day' | 'month';
+  }) => api.get('/admin/analytics', { params }),
+};
+
+export const exportAPI = {
+  bookings: (params?: {
+    format?: 'csv' | 'ndjson';
+    start?: string;
+    end?: string;
+    active?: boolean;
+    include_qr?: boolean;
+  }) => api.get('/admin/bookings/export', { params, responseType: 'blob' }),
+};
 
 export default api;
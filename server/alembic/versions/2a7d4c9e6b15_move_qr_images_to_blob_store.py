@@ -0,0 +1,80 @@
+"""Move inline QR images of bookings to the blob store
+
+Bookings made before QR codes were rendered on demand keep the PNG as a
+base64 data URI in qr_code. This stores each image in blob_store.py and puts
+a blob:<key> reference in its place. On SQLite, run VACUUM afterwards to
+give the freed pages back to the filesystem.
+
+Revision ID: 2a7d4c9e6b15
+Revises: 8c5f3e9a1d24
+Create Date: 2026-10-18 22:10:00.000000
+
+"""
+import base64
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from blob_store import blob_ref, blob_store, ref_key
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2a7d4c9e6b15'
+down_revision: Union[str, Sequence[str], None] = '8c5f3e9a1d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DATA_URI_PREFIX = 'data:image/png;base64,'
+BATCH_SIZE = 500
+
+log = logging.getLogger('alembic')
+
+bookings = sa.table('bookings', sa.column('id', sa.Integer), sa.column('qr_code', sa.String))
+
+
+def _rewrite(pattern: str, convert) -> None:
+    """Replace qr_code of the rows matching ``pattern``, in id order and batches.
+
+    Rows for which ``convert`` returns None are left as they are.
+    """
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(bookings.c.id, bookings.c.qr_code)
+            .where(bookings.c.id > last_id, bookings.c.qr_code.like(pattern))
+            .order_by(bookings.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        changes = [{'row_id': row.id, 'qr_code': convert(row.id, row.qr_code)} for row in rows]
+        changes = [change for change in changes if change['qr_code'] is not None]
+        if changes:
+            conn.execute(sa.update(bookings).where(bookings.c.id == sa.bindparam('row_id')), changes)
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _rewrite(
+        DATA_URI_PREFIX + '%',
+        lambda row_id, value: blob_ref(blob_store.put(base64.b64decode(value[len(DATA_URI_PREFIX):]), 'image/png')),
+    )
+
+
+def _inline(row_id: int, value: str):
+    png = blob_store.get(ref_key(value))
+    if png is None:
+        # qr_code cannot be NULL
+        log.warning('Booking %s: QR blob %s is missing, keeping the reference', row_id, value)
+        return None
+    return DATA_URI_PREFIX + base64.b64encode(png).decode('ascii')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Blobs stay in the store, other rows may share them
+    _rewrite('blob:%', _inline)
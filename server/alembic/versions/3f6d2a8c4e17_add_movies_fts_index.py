@@ -0,0 +1,41 @@
+"""Add FTS5 search index over movie titles and genres
+
+Revision ID: 3f6d2a8c4e17
+Revises: 7e3a1c2b9d40
+Create Date: 2026-10-18 15:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6d2a8c4e17'
+down_revision: Union[str, Sequence[str], None] = '7e3a1c2b9d40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # FTS5 is SQLite only, other databases keep using ILIKE
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    # IF NOT EXISTS: the server creates the index at startup as well
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5("
+        "title, genre, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts_terms USING fts5vocab(movies_fts, 'row')")
+    op.execute("DELETE FROM movies_fts")
+    op.execute("INSERT INTO movies_fts (rowid, title, genre) SELECT id, title, genre FROM movies")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("DROP TABLE movies_fts_terms")
+    op.execute("DROP TABLE movies_fts")
@@ -0,0 +1,28 @@
+"""Add title and genre index for catalog imports
+
+Revision ID: 5d2f8a1c7b39
+Revises: c4a8e2f61d05
+Create Date: 2026-10-18 19:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2f8a1c7b39'
+down_revision: Union[str, Sequence[str], None] = 'c4a8e2f61d05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_movies_title_genre', 'movies', ['title', 'genre'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_movies_title_genre', table_name='movies')
@@ -0,0 +1,28 @@
+"""Add composite index for booking history pagination
+
+Revision ID: 7e3a1c2b9d40
+Revises: e1b7c3d5a902
+Create Date: 2026-10-18 12:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e3a1c2b9d40'
+down_revision: Union[str, Sequence[str], None] = 'e1b7c3d5a902'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_bookings_user_created', 'bookings', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_bookings_user_created', table_name='bookings')
@@ -0,0 +1,32 @@
+"""Add indexes for catalog filters and per-show booking lookups
+
+Revision ID: 8c5f3e9a1d24
+Revises: 5d2f8a1c7b39
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c5f3e9a1d24'
+down_revision: Union[str, Sequence[str], None] = '5d2f8a1c7b39'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_movies_genre_rating', 'movies', ['genre', 'rating'], unique=False)
+    op.create_index('ix_movies_rating', 'movies', ['rating'], unique=False)
+    op.create_index('ix_bookings_movie_slot', 'bookings', ['Movies_id', 'ticket_slot', 'Status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_bookings_movie_slot', table_name='bookings')
+    op.drop_index('ix_movies_rating', table_name='movies')
+    op.drop_index('ix_movies_genre_rating', table_name='movies')
@@ -0,0 +1,77 @@
+"""Add screens and showtimes with sold seat counters
+
+Revision ID: 9b1e4d7f2a63
+Revises: 3f6d2a8c4e17
+Create Date: 2026-10-18 16:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b1e4d7f2a63'
+down_revision: Union[str, Sequence[str], None] = '3f6d2a8c4e17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TIME_SLOTS = ["09:00-12:00", "12:00-15:00", "15:00-18:00", "18:00-21:00", "21:00-24:00"]
+CAPACITY = 240
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    screens = op.create_table(
+        'screens',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('capacity', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    showtimes = op.create_table(
+        'showtimes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('Movies_id', sa.Integer(), nullable=False),
+        sa.Column('screen_id', sa.Integer(), nullable=False),
+        sa.Column('ticket_slot', sa.String(), nullable=False),
+        sa.Column('capacity', sa.Integer(), nullable=False),
+        sa.Column('seats_sold', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['Movies_id'], ['movies.id']),
+        sa.ForeignKeyConstraint(['screen_id'], ['screens.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('Movies_id', 'ticket_slot'),
+    )
+
+    # Every existing movie gets the default schedule, counting what is already sold
+    op.bulk_insert(screens, [{'id': 1, 'name': 'Screen 1', 'capacity': CAPACITY}])
+    movies = sa.table('movies', sa.column('id'))
+    bookings = sa.table(
+        'bookings', sa.column('Movies_id'), sa.column('ticket_slot'),
+        sa.column('tickets_booked'), sa.column('Status', sa.Boolean),
+    )
+    slots = sa.union_all(*(sa.select(sa.literal(slot).label('slot')) for slot in TIME_SLOTS)).subquery()
+    sold = (
+        sa.select(sa.func.coalesce(sa.func.sum(bookings.c.tickets_booked), 0))
+        .where(
+            bookings.c.Movies_id == movies.c.id,
+            bookings.c.ticket_slot == slots.c.slot,
+            bookings.c.Status == sa.true(),
+        )
+        .scalar_subquery()
+    )
+    op.execute(
+        showtimes.insert().from_select(
+            ['Movies_id', 'screen_id', 'ticket_slot', 'capacity', 'seats_sold'],
+            sa.select(movies.c.id, sa.literal(1), slots.c.slot, sa.literal(CAPACITY), sold)
+            .select_from(movies.join(slots, sa.true())),
+        )
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('showtimes')
+    op.drop_table('screens')
@@ -0,0 +1,76 @@
+"""Add hourly, daily and monthly booking rollups for analytics
+
+Revision ID: c4a8e2f61d05
+Revises: 9b1e4d7f2a63
+Create Date: 2026-10-18 18:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a8e2f61d05'
+down_revision: Union[str, Sequence[str], None] = '9b1e4d7f2a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ROLLUPS = {
+    'booking_stats_hourly': ('hour', '%Y-%m-%d %H:00:00.000000'),
+    'booking_stats_daily': ('day', '%Y-%m-%d 00:00:00.000000'),
+    'booking_stats_monthly': ('month', '%Y-%m-01 00:00:00.000000'),
+}
+DIMENSIONS = {
+    'total': None,
+    'movie': 'Movies_id',
+    'slot': 'ticket_slot',
+    'type': 'ticket_type',
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    is_sqlite = op.get_bind().dialect.name == 'sqlite'
+    bookings = sa.table(
+        'bookings', sa.column('created_at', sa.DateTime), sa.column('Movies_id', sa.Integer),
+        sa.column('ticket_slot', sa.String), sa.column('ticket_type', sa.String),
+        sa.column('tickets_booked', sa.Integer), sa.column('ticket_price', sa.Integer),
+        sa.column('Status', sa.Boolean),
+    )
+    for name, (unit, pattern) in ROLLUPS.items():
+        table = op.create_table(
+            name,
+            sa.Column('dimension', sa.String(), nullable=False),
+            sa.Column('bucket', sa.DateTime(), nullable=False),
+            sa.Column('key', sa.String(), nullable=False),
+            sa.Column('bookings', sa.Integer(), nullable=False),
+            sa.Column('tickets', sa.Integer(), nullable=False),
+            sa.Column('revenue', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('dimension', 'bucket', 'key'),
+            sqlite_with_rowid=False,
+        )
+        # Backfill from the active bookings, one pass per dimension
+        if is_sqlite:
+            bucket = sa.func.strftime(pattern, bookings.c.created_at)
+        else:
+            bucket = sa.func.date_trunc(unit, bookings.c.created_at)
+        bucket = bucket.label('bucket')
+        for dimension, column in DIMENSIONS.items():
+            key = sa.cast(bookings.c[column], sa.String) if column else sa.literal('')
+            op.execute(table.insert().from_select(
+                ['dimension', 'bucket', 'key', 'bookings', 'tickets', 'revenue'],
+                sa.select(
+                    sa.literal(dimension), bucket, key.label('key'),
+                    sa.func.count(), sa.func.sum(bookings.c.tickets_booked), sa.func.sum(bookings.c.ticket_price),
+                )
+                .where(bookings.c.Status == sa.true(), bookings.c.created_at.isnot(None))
+                .group_by(bucket, key),
+            ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in ROLLUPS:
+        op.drop_table(name)
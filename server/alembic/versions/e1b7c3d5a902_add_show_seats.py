@@ -0,0 +1,39 @@
+"""Add show_seats seat bitmaps
+
+Revision ID: e1b7c3d5a902
+Revises: b5ed2ecb161f
+Create Date: 2026-10-18 11:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1b7c3d5a902'
+down_revision: Union[str, Sequence[str], None] = 'b5ed2ecb161f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rows are seeded from bookings.seat_number the first time a show is booked
+    op.create_table(
+        'show_seats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('Movies_id', sa.Integer(), nullable=False),
+        sa.Column('ticket_slot', sa.String(), nullable=False),
+        sa.Column('row', sa.Integer(), nullable=False),
+        sa.Column('taken', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['Movies_id'], ['movies.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('Movies_id', 'ticket_slot', 'row'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('show_seats')
@@ -0,0 +1,273 @@
+"""Booking rollups behind the admin analytics API.
+
+``booking_stats_hourly``, ``booking_stats_daily`` and ``booking_stats_monthly``
+hold bookings, tickets and revenue per hour, day or month in which bookings
+were made, once in total and once per movie, per slot and per ticket type. A
+bucket is about ``movies + slots + types + 1`` rows however many bookings it
+had, and a date range is read as whole months in the middle with days and
+hours only at its edges, so the dashboard reads a few thousand rollup rows
+instead of grouping the whole ``bookings`` table.
+
+The booking routes add a booking's numbers when it is created and take them
+away when it is cancelled, in the same transaction. To fill the rollups from
+existing bookings, e.g. after deploying them:
+
+    cd server
+    python analytics.py rebuild
+"""
+import argparse
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy import String, cast, delete, func, literal, select, true, union_all
+
+import models
+
+ROLLUPS = {
+    "hour": models.BookingStatsHourly,
+    "day": models.BookingStatsDaily,
+    "month": models.BookingStatsMonthly,
+}
+# Coarsest first, the order ranges are covered in
+UNITS = ["month", "day", "hour"]
+# Rollup dimension -> booking column it groups by, None for the overall totals
+DIMENSIONS = {
+    "total": None,
+    "movie": "Movies_id",
+    "slot": "ticket_slot",
+    "type": "ticket_type",
+}
+KEY_COLUMNS = ("dimension", "bucket", "key")
+SUM_COLUMNS = ("bookings", "tickets", "revenue")
+
+
+def bucket_start(moment: datetime, unit: str) -> datetime:
+    if unit == "month":
+        return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if unit == "day":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def next_bucket(bucket: datetime, unit: str) -> datetime:
+    if unit == "month":
+        return bucket.replace(year=bucket.year + bucket.month // 12, month=bucket.month % 12 + 1)
+    return bucket + (timedelta(days=1) if unit == "day" else timedelta(hours=1))
+
+
+def cover(start: datetime, end: datetime) -> list[tuple[str, datetime, datetime]]:
+    """Split bucket-aligned ``[start, end)`` into ``(unit, start, end)`` ranges
+    using the coarsest rollup each part lines up with."""
+    ranges = []
+    moment = start
+    while moment < end:
+        for unit in UNITS:
+            if bucket_start(moment, unit) != moment:
+                continue
+            following = next_bucket(moment, unit)
+            if following <= end:
+                break
+        if ranges and ranges[-1][0] == unit:
+            ranges[-1] = (unit, ranges[-1][1], following)
+        else:
+            ranges.append((unit, moment, following))
+        moment = following
+    return ranges
+
+
+def _upsert(db, model):
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    statement = insert(model)
+    return statement.on_conflict_do_update(
+        index_elements=list(KEY_COLUMNS),
+        set_={name: getattr(model, name) + statement.excluded[name] for name in SUM_COLUMNS},
+    )
+
+
+async def record(db, bookings: Iterable, sign: int = 1) -> None:
+    """Add (``sign=1``) or remove (``sign=-1``) bookings from the rollups.
+
+    ``bookings`` are ``Bookings`` objects or dicts with the same keys and an
+    explicit ``created_at``. The caller commits.
+    """
+    bookings = [
+        booking if isinstance(booking, dict) else booking.__dict__
+        for booking in bookings
+    ]
+    for unit, model in ROLLUPS.items():
+        deltas = defaultdict(lambda: [0, 0, 0])
+        for booking in bookings:
+            if booking["created_at"] is None:
+                continue
+            bucket = bucket_start(booking["created_at"], unit)
+            for dimension, column in DIMENSIONS.items():
+                delta = deltas[(dimension, bucket, str(booking[column]) if column else "")]
+                delta[0] += sign
+                delta[1] += sign * booking["tickets_booked"]
+                delta[2] += sign * booking["ticket_price"]
+        if deltas:
+            await db.execute(
+                _upsert(db, model),
+                [dict(zip(KEY_COLUMNS + SUM_COLUMNS, key + tuple(delta))) for key, delta in deltas.items()],
+            )
+
+
+def _bucket_expression(dialect: str, unit: str, created_at=models.Bookings.created_at):
+    if dialect == "postgresql":
+        return func.date_trunc(unit, created_at)
+    # SQLAlchemy stores DateTime values on SQLite as "YYYY-MM-DD HH:MM:SS.ffffff",
+    # so a bucket is a prefix of that text; cheaper than strftime per row
+    length, suffix = {
+        "hour": (13, ":00:00.000000"),
+        "day": (10, " 00:00:00.000000"),
+        "month": (7, "-01 00:00:00.000000"),
+    }[unit]
+    return func.substr(created_at, 1, length).concat(suffix)
+
+
+def _rollup_bookings(conn, unit: str, model) -> None:
+    bucket = _bucket_expression(conn.dialect.name, unit).label("bucket")
+    for dimension, column in DIMENSIONS.items():
+        key = cast(getattr(models.Bookings, column), String) if column else literal("")
+        conn.execute(
+            model.__table__.insert().from_select(
+                list(KEY_COLUMNS + SUM_COLUMNS),
+                select(
+                    literal(dimension),
+                    bucket,
+                    key.label("key"),
+                    func.count(),
+                    func.sum(models.Bookings.tickets_booked),
+                    func.sum(models.Bookings.ticket_price),
+                )
+                .where(models.Bookings.Status == true(), models.Bookings.created_at.isnot(None))
+                .group_by(bucket, key),
+            )
+        )
+
+
+def _sum_rollup(conn, unit: str, model, source) -> None:
+    bucket = _bucket_expression(conn.dialect.name, unit, source.bucket).label("bucket")
+    conn.execute(
+        model.__table__.insert().from_select(
+            list(KEY_COLUMNS + SUM_COLUMNS),
+            select(
+                source.dimension,
+                bucket,
+                source.key,
+                *(func.sum(getattr(source, name)) for name in SUM_COLUMNS),
+            ).group_by(source.dimension, bucket, source.key),
+        )
+    )
+
+
+def rebuild(conn) -> None:
+    """Recompute the rollups from the active bookings on a sync connection.
+
+    Only the hourly rollup reads ``bookings``; days are summed from hours and
+    months from days.
+    """
+    source = None
+    for unit, model in ROLLUPS.items():
+        conn.execute(delete(model))
+        if source is None:
+            _rollup_bookings(conn, unit, model)
+        else:
+            _sum_rollup(conn, unit, model, source)
+        source = model
+
+
+async def summary(db, start: datetime, end: datetime, unit: str = "day") -> dict:
+    """Totals and breakdowns for bookings made in ``[start, end)``, with a
+    series per ``unit``; whole buckets at either end are included."""
+    first = bucket_start(start, unit)
+    last = bucket_start(end, unit)
+    last = last if last == end else next_bucket(last, unit)
+
+    parts = []
+    for part_unit, part_start, part_end in cover(first, last):
+        model = ROLLUPS[part_unit]
+        parts.append(
+            select(model.dimension, model.key, model.bookings, model.tickets, model.revenue)
+            # Lists the dimensions so each one is a range scan of the primary key
+            .where(
+                model.dimension.in_(list(DIMENSIONS)),
+                model.bucket >= part_start,
+                model.bucket < part_end,
+            )
+        )
+    rows = union_all(*parts).subquery()
+    groups = (await db.execute(
+        select(
+            rows.c.dimension,
+            rows.c.key,
+            func.sum(rows.c.bookings),
+            func.sum(rows.c.tickets),
+            func.sum(rows.c.revenue),
+        )
+        .group_by(rows.c.dimension, rows.c.key)
+        # Cancellations leave rows that add up to zero
+        .having(func.sum(rows.c.bookings) != 0)
+    )).all() if parts else []
+
+    model = ROLLUPS[unit]
+    series = (await db.execute(
+        select(model.bucket, model.bookings, model.tickets, model.revenue)
+        .where(model.dimension == "total", model.bookings != 0, model.bucket >= first, model.bucket < last)
+        .order_by(model.bucket)
+    )).all()
+
+    breakdowns = defaultdict(list)
+    for dimension, key, *values in groups:
+        breakdowns[dimension].append((key, dict(zip(SUM_COLUMNS, values))))
+
+    by_movie = [{"Movies_id": int(key), **values} for key, values in breakdowns["movie"]]
+    if by_movie:
+        titles = dict((await db.execute(
+            select(models.Movies.id, models.Movies.title).where(
+                models.Movies.id.in_([row["Movies_id"] for row in by_movie])
+            )
+        )).all())
+        for row in by_movie:
+            row["movie_name"] = titles.get(row["Movies_id"], "Unknown")
+
+    totals = breakdowns["total"][0][1] if breakdowns["total"] else dict.fromkeys(SUM_COLUMNS, 0)
+    return {
+        "start": start,
+        "end": end,
+        "granularity": unit,
+        "totals": totals,
+        "by_movie": sorted(by_movie, key=lambda row: row["revenue"], reverse=True),
+        "by_slot": sorted(
+            ({"ticket_slot": key, **values} for key, values in breakdowns["slot"]),
+            key=lambda row: row["ticket_slot"],
+        ),
+        "by_ticket_type": sorted(
+            ({"ticket_type": key, **values} for key, values in breakdowns["type"]),
+            key=lambda row: row["revenue"],
+            reverse=True,
+        ),
+        "series": [row._asdict() for row in series],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain the booking analytics rollups.")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    from database import engine
+
+    started = datetime.now()
+    with engine.begin() as conn:
+        rebuild(conn)
+        counts = {unit: conn.scalar(select(func.count()).select_from(model)) for unit, model in ROLLUPS.items()}
+    print(f"rebuilt rollups in {(datetime.now() - started).total_seconds():.1f}s: {counts}")
+
+
+if __name__ == "__main__":
+    main()
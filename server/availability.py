@@ -0,0 +1,259 @@
+"""Live seat availability pushed to subscribed clients.
+
+Routes that sell or give back seats call ``seat_feed.changed`` after their
+commit. That only marks the show as changed; every
+``AVAILABILITY_FLUSH_MS`` the feed reads the seat counts of the changed
+shows that have subscribers in one query and hands them out, so a burst of
+bookings for a show reaches each client as one update with the latest count.
+
+The feed also keeps the latest counts of every movie with subscribers, so a
+crowd joining a popular movie at once costs one database read, not one each.
+
+A subscriber keeps only the newest unread update per slot and a future to
+wake its connection, so nothing piles up behind a slow client and an idle
+one costs little more than its socket.
+
+With ``AVAILABILITY_BROKER_URL`` set to a ``redis://`` URL, changes are also
+published on a Redis channel so subscribers of every server process hear
+about bookings made in any of them; this needs the ``redis`` package.
+Without it the feed covers the process it runs in.
+
+A stream never ends on its own and servers wait for open responses before
+they stop, so run uvicorn with ``--timeout-graceful-shutdown``; ``close``
+then ends whatever subscriptions are left at shutdown. EventSource clients
+reconnect to the next server.
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import select, tuple_
+
+import models
+from database import AsyncSessionLocal
+
+AVAILABILITY_BROKER_URL = os.getenv("AVAILABILITY_BROKER_URL", "")
+AVAILABILITY_FLUSH_MS = int(os.getenv("AVAILABILITY_FLUSH_MS", "250"))
+# Seconds between keepalives on an idle connection
+AVAILABILITY_KEEPALIVE = int(os.getenv("AVAILABILITY_KEEPALIVE", "15"))
+
+log = logging.getLogger("showtimex.availability")
+
+
+class LocalBroker:
+    """Single process: there is nobody else to tell."""
+
+    async def start(self, deliver: Callable[[int, str], None]) -> None:
+        pass
+
+    async def publish(self, movie_id: int, slot: str) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisBroker:
+    CHANNEL = "showtimex:availability"
+
+    def __init__(self, url: str):
+        import redis.asyncio
+
+        self._client = redis.asyncio.from_url(url)
+        # Our own messages come back too and are skipped
+        self._origin = uuid.uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Callable[[int, str], None]) -> None:
+        pubsub = self._client.pubsub()
+        await pubsub.subscribe(self.CHANNEL)
+        self._listener = asyncio.create_task(self._listen(pubsub, deliver))
+
+    async def _listen(self, pubsub, deliver) -> None:
+        async for message in pubsub.listen():
+            if message["type"] != "message":
+                continue
+            origin, movie_id, slot = json.loads(message["data"])
+            if origin != self._origin:
+                deliver(movie_id, slot)
+
+    async def publish(self, movie_id: int, slot: str) -> None:
+        await self._client.publish(self.CHANNEL, json.dumps([self._origin, movie_id, slot]))
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+        await self._client.aclose()
+
+
+def make_broker(url: str = AVAILABILITY_BROKER_URL):
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBroker(url)
+    return LocalBroker()
+
+
+def availability(movie_id: int, slot: str, capacity: int, seats_sold: int) -> dict:
+    return {
+        "Movies_id": movie_id,
+        "ticket_slot": slot,
+        "capacity": capacity,
+        "seats_sold": seats_sold,
+        "seats_available": max(capacity - seats_sold, 0),
+    }
+
+
+class Subscriber:
+    __slots__ = ("movie_id", "pending", "closed", "_waiter")
+
+    def __init__(self, movie_id: int):
+        self.movie_id = movie_id
+        # slot -> newest update not read yet
+        self.pending: dict[str, dict] = {}
+        self.closed = False
+        self._waiter: Optional[asyncio.Future] = None
+
+    def wake(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def next(
+        self, gone: Optional[asyncio.Future] = None, timeout: float = AVAILABILITY_KEEPALIVE,
+    ) -> Optional[list[dict]]:
+        """Updates since the last call, or an empty list after ``timeout`` seconds
+        without any. None once the feed is closed or ``gone``, the client's
+        disconnect, is done.
+        """
+        if not self.pending and not self.closed:
+            # Plain futures, so waiting starts no task
+            self._waiter = asyncio.get_running_loop().create_future()
+            waiting = {self._waiter} if gone is None else {self._waiter, gone}
+            await asyncio.wait(waiting, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            self._waiter = None
+        if self.closed or (gone is not None and gone.done()):
+            return None
+        updates, self.pending = list(self.pending.values()), {}
+        return updates
+
+
+class SeatFeed:
+    def __init__(self, broker=None, interval: float = AVAILABILITY_FLUSH_MS / 1000):
+        self.broker = broker or make_broker()
+        self.interval = interval
+        self.updates = 0
+        self._subscribers: dict[int, set[Subscriber]] = {}
+        self._changed: set[tuple[int, str]] = set()
+        # movie -> slot -> latest update, for movies with subscribers
+        self._latest: dict[int, dict[str, dict]] = {}
+        # movie -> flushes that updated it, to spot a snapshot that was overtaken
+        self._flushed: dict[int, int] = {}
+        self._loading: dict[int, asyncio.Future] = {}
+        self._closed = False
+
+    def subscribe(self, movie_id: int) -> Subscriber:
+        subscriber = Subscriber(movie_id)
+        subscriber.closed = self._closed
+        self._subscribers.setdefault(movie_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        subscribers = self._subscribers.get(subscriber.movie_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[subscriber.movie_id]
+                self._latest.pop(subscriber.movie_id, None)
+                self._flushed.pop(subscriber.movie_id, None)
+
+    async def snapshot(self, movie_id: int, load: Callable[[], Awaitable[list[dict]]]) -> list[dict]:
+        """Counts of every slot of a movie; call after ``subscribe``.
+
+        ``load`` reads them from the database when the feed has none yet, once
+        for every caller waiting at the same time.
+        """
+        latest = self._latest.get(movie_id)
+        if latest is not None:
+            return list(latest.values())
+
+        loading = self._loading.get(movie_id)
+        if loading is None:
+            loading = self._loading[movie_id] = asyncio.ensure_future(load())
+            loading.add_done_callback(lambda done: self._loading.pop(movie_id, None))
+        flushed = self._flushed.get(movie_id, 0)
+        updates = await asyncio.shield(loading)
+        # Cached unless a flush may have sent newer counts in the meantime
+        if movie_id in self._subscribers and self._flushed.get(movie_id, 0) == flushed:
+            self._latest.setdefault(movie_id, {update["ticket_slot"]: update for update in updates})
+        return updates
+
+    def close(self) -> None:
+        """End every subscription, now and later; for server shutdown."""
+        self._closed = True
+        for subscribers in self._subscribers.values():
+            for subscriber in subscribers:
+                subscriber.closed = True
+                subscriber.wake()
+
+    def _mark(self, movie_id: int, slot: str) -> None:
+        self._changed.add((movie_id, slot))
+
+    async def changed(self, movie_id: int, slot: str) -> None:
+        """Note that seats of a show were sold or given back; call after the commit."""
+        self._mark(movie_id, slot)
+        try:
+            await self.broker.publish(movie_id, slot)
+        except Exception:
+            # The booking is committed already; other processes catch up on the next change
+            log.exception("Could not publish availability of movie %s, slot %s", movie_id, slot)
+
+    async def flush(self) -> None:
+        """Send the current counts of changed shows to their subscribers."""
+        shows = [show for show in self._changed if show[0] in self._subscribers]
+        self._changed.clear()
+        if not shows:
+            return
+
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(
+                    models.Showtimes.Movies_id,
+                    models.Showtimes.ticket_slot,
+                    models.Showtimes.capacity,
+                    models.Showtimes.seats_sold,
+                ).where(tuple_(models.Showtimes.Movies_id, models.Showtimes.ticket_slot).in_(shows))
+            )).all()
+
+        for movie_id, slot, capacity, seats_sold in rows:
+            update = availability(movie_id, slot, capacity, seats_sold)
+            self._flushed[movie_id] = self._flushed.get(movie_id, 0) + 1
+            if movie_id in self._latest:
+                self._latest[movie_id][slot] = update
+            for subscriber in self._subscribers.get(movie_id, ()):
+                subscriber.pending[slot] = update
+                subscriber.wake()
+                self.updates += 1
+
+    async def run(self) -> None:
+        """Flush every ``interval`` seconds until cancelled."""
+        await self.broker.start(self._mark)
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                try:
+                    await self.flush()
+                except Exception:
+                    log.exception("Availability flush failed")
+        finally:
+            await self.broker.close()
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "movies": len(self._subscribers),
+            "updates": self.updates,
+        }
+
+
+seat_feed = SeatFeed()
@@ -0,0 +1,122 @@
+"""Admin analytics latency from the rollups at millions of bookings.
+
+Generates ``--bookings`` bookings spread over ``--days`` days directly in
+SQLite, backfills the rollups with ``analytics.rebuild`` and then times the
+dashboard query for a few common windows, plus the same totals grouped
+straight from ``bookings`` for comparison.
+
+    cd server
+    python bench/bench_analytics.py --bookings 10000000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import GENRES, summarize
+
+SLOTS = ["09:00-12:00", "12:00-15:00", "15:00-18:00", "18:00-21:00", "21:00-24:00"]
+TYPES = [("Regular", 250), ("Premium", 350), ("IMAX", 450), ("4DX", 600)]
+
+
+def generate(conn, bookings: int, movies: int, days: int, end: datetime) -> None:
+    from sqlalchemy import text
+
+    conn.execute(text(
+        "INSERT INTO users (id, email, username, first_name, last_name, hashed_password, role) "
+        "VALUES (1, 'admin@example.com', 'admin', 'Bench', 'Admin', '!', 'admin')"
+    ))
+    conn.execute(text(
+        "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :movies) "
+        "INSERT INTO movies (id, title, genre, duration, rating, user_id) "
+        "SELECT i, 'Movie ' || i, :genre, 120, 7.5, 1 FROM n"
+    ), {"movies": movies, "genre": GENRES[0]})
+    slots = " ".join(f"WHEN {i} THEN '{slot}'" for i, slot in enumerate(SLOTS))
+    types = " ".join(f"WHEN {i} THEN '{name}'" for i, (name, _) in enumerate(TYPES))
+    prices = " ".join(f"WHEN {i} THEN {price}" for i, (_, price) in enumerate(TYPES))
+    conn.execute(text(
+        "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :bookings), "
+        "r AS (SELECT i, abs(random()) AS x, 1 + abs(random()) % 4 AS tickets FROM n) "
+        "INSERT INTO bookings (uuid, Movies_id, user_id, customer_name, tickets_booked, ticket_slot, "
+        "ticket_type, ticket_price, Status, seat_number, qr_code, created_at) "
+        f"SELECT 'b' || i, 1 + x % :movies, 1, 'admin', tickets, CASE x % 5 {slots} END, "
+        f"CASE (x / 5) % 4 {types} END, tickets * CASE (x / 5) % 4 {prices} END, "
+        "(x / 20) % 10 != 0, '', '', "
+        "strftime('%Y-%m-%d %H:%M:%S.000000', :end - (x / 200) % (:days * 86400), 'unixepoch') FROM r"
+    ), {"bookings": bookings, "movies": movies, "days": days, "end": int(end.timestamp())})
+
+
+async def time_queries(end: datetime, repeats: int) -> None:
+    from sqlalchemy import func, select
+
+    import analytics
+    import models
+    from database import AsyncSessionLocal, async_engine
+
+    windows = [
+        ("last 24h by hour", timedelta(days=1), "hour"),
+        ("last 7 days by hour", timedelta(days=7), "hour"),
+        ("last 7 days by day", timedelta(days=7), "day"),
+        ("last 30 days by day", timedelta(days=30), "day"),
+        ("last 365 days by day", timedelta(days=365), "day"),
+        ("last 365 days by month", timedelta(days=365), "month"),
+    ]
+    async with AsyncSessionLocal() as db:
+        for label, span, unit in windows:
+            latencies = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                await analytics.summary(db, end - span, end, unit)
+                latencies.append(time.perf_counter() - start)
+            result = summarize(latencies, sum(latencies))
+            print(f"rollup  {label:22} p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms")
+
+        # What the dashboard would cost without the rollups
+        start = time.perf_counter()
+        await db.execute(
+            select(models.Bookings.Movies_id, models.Bookings.ticket_slot, models.Bookings.ticket_type,
+                   func.count(), func.sum(models.Bookings.tickets_booked), func.sum(models.Bookings.ticket_price))
+            .where(models.Bookings.Status == True, models.Bookings.created_at >= end - timedelta(days=30))
+            .group_by(models.Bookings.Movies_id, models.Bookings.ticket_slot, models.Bookings.ticket_type)
+        )
+        print(f"bookings last 30 days by day  {(time.perf_counter() - start) * 1000:.1f} ms (one GROUP BY)")
+    await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=10_000_000)
+    parser.add_argument("--movies", type=int, default=200)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    end = datetime.utcnow().replace(microsecond=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Before anything imports database.py, which reads it once
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        import analytics
+        import models
+        from database import engine
+
+        models.Base.metadata.create_all(engine)
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            generate(conn, args.bookings, args.movies, args.days, end)
+        print(f"generated {args.bookings} bookings in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            analytics.rebuild(conn)
+        print(f"rebuilt rollups in {time.perf_counter() - started:.1f}s")
+        engine.dispose()
+
+        asyncio.run(time_queries(end, args.repeats))
+
+
+if __name__ == "__main__":
+    main()
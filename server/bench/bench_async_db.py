@@ -0,0 +1,105 @@
+"""Compare the blocking and the async database layer under concurrent load.
+
+Seeds a throwaway SQLite database, then serves the public catalog endpoints
+twice with uvicorn: once from ``sync_app`` below (sync ``def`` routes on
+``SessionLocal``, as the routes were before the async port) and once from
+``main.app``. Both get the same concurrent traffic and the script prints
+requests per second and latency for each.
+
+    cd server
+    python bench/bench_async_db.py --concurrency 64 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import seed, serve, summarize
+
+if os.getenv("DATABASE_URL"):
+    # Imported by uvicorn inside the benchmark: build the pre-port sync app
+    from fastapi import Depends, FastAPI, HTTPException
+    from sqlalchemy.orm import Session
+
+    import models
+    from database import SessionLocal
+
+    def get_sync_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    sync_app = FastAPI()
+
+    @sync_app.get("/api/health")
+    def health_check():
+        return {"status": "healthy"}
+
+    @sync_app.get("/movies/")
+    def get_movies(skip: int = 0, limit: int = 10, search: str = None, db: Session = Depends(get_sync_db)):
+        query = db.query(models.Movies)
+        if search:
+            query = query.filter(models.Movies.title.ilike(f"%{search}%"))
+        total = query.count()
+        return {"movies": query.offset(skip).limit(limit).all(), "total": total}
+
+    @sync_app.get("/movies/{movie_id}")
+    def get_movie_details(movie_id: int, db: Session = Depends(get_sync_db)):
+        movie = db.query(models.Movies).filter(models.Movies.id == movie_id).first()
+        if not movie:
+            raise HTTPException(status_code=404, detail="Movie not found")
+        return {"id": movie.id, "title": movie.title}
+
+
+async def drive(base_url: str, movies: int, concurrency: int, duration: float) -> dict:
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(client):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            if random.random() < 0.5:
+                url = f"/movies/{random.randint(1, movies)}"
+            else:
+                url = f"/movies/?search={random.randint(1, 99)}&skip=0&limit=10"
+            start = time.perf_counter()
+            response = await client.get(url)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+
+    return summarize(latencies, duration, errors)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--movies", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        seed(db_path, movies=args.movies)
+        for label, app in (("sync (before)", "bench.bench_async_db:sync_app"), ("async (after)", "main:app")):
+            with serve(app, db_path, args.port) as base_url:
+                result = asyncio.run(drive(base_url, args.movies, args.concurrency, args.duration))
+            print(f"{label:15} {result}")
+
+
+if __name__ == "__main__":
+    main()
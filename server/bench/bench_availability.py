@@ -0,0 +1,117 @@
+"""Cost of idle availability subscribers and fan-out latency of an update.
+
+Starts ``main:app``, opens ``--subscribers`` Server-Sent Events streams on
+``GET /movies/1/availability``, and reports the server's heap per idle
+subscriber. Then it books tickets for the movie ``--bookings`` times and
+measures how long each update takes to reach every subscriber, counted from
+the booking's response.
+
+    cd server
+    python bench/bench_availability.py --subscribers 10000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_export import server_heap_kib
+from common import seed, serve, summarize, token
+
+
+async def subscriber(port: int, connected: asyncio.Event, arrivals: list, index: int, ready: list) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /movies/1/availability HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n\r\n")
+    snapshot = 0
+    try:
+        while line := await reader.readline():
+            if not line.startswith(b"data:"):
+                continue
+            if snapshot < 5:
+                snapshot += 1
+                if snapshot == 5:
+                    ready[0] += 1
+                    if ready[0] == ready[1]:
+                        connected.set()
+                continue
+            arrivals[index] = time.perf_counter()
+    finally:
+        writer.close()
+
+
+async def run(base_url: str, port: int, subscribers: int, bookings: int, window_ms: int) -> dict:
+    connected = asyncio.Event()
+    arrivals = [0.0] * subscribers
+    ready = [0, subscribers]
+    heap_before = server_heap_kib(port)
+    started = time.perf_counter()
+    tasks = []
+    for index in range(subscribers):
+        tasks.append(asyncio.create_task(subscriber(port, connected, arrivals, index, ready)))
+        if index % 200 == 199:
+            # Stay under the listen backlog
+            await asyncio.sleep(0.05)
+    await asyncio.wait_for(connected.wait(), 300)
+    connect_seconds = time.perf_counter() - started
+    # Let the streams settle before sampling
+    await asyncio.sleep(1)
+    heap_idle = server_heap_kib(port)
+
+    latencies = []
+    headers = {"Authorization": f"Bearer {token(2)}"}
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=30) as client:
+        for _ in range(bookings):
+            for index in range(subscribers):
+                arrivals[index] = 0.0
+            response = await client.post("/user/bookings/", json={
+                "Movies_id": 1, "tickets_booked": 1, "ticket_slot": "18:00-21:00", "ticket_type": "Regular",
+            })
+            response.raise_for_status()
+            booked = time.perf_counter()
+            deadline = booked + 10
+            while time.perf_counter() < deadline and not all(arrivals):
+                await asyncio.sleep(0.005)
+            latencies.extend(arrival - booked for arrival in arrivals if arrival)
+            # Next booking in a fresh window
+            await asyncio.sleep(window_ms / 1000)
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    fan_out = summarize(latencies, 1.0)
+    return {
+        "subscribers": subscribers,
+        "connect_seconds": round(connect_seconds, 1),
+        "heap_before_mib": round(heap_before / 1024, 1),
+        "heap_idle_mib": round(heap_idle / 1024, 1),
+        "kib_per_subscriber": round((heap_idle - heap_before) / subscribers, 1),
+        "updates_delivered": fan_out["requests"],
+        "updates_expected": subscribers * bookings,
+        "fan_out_p50_ms": fan_out.get("p50_ms"),
+        "fan_out_p99_ms": fan_out.get("p99_ms"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=10_000)
+    parser.add_argument("--bookings", type=int, default=10)
+    parser.add_argument("--flush-ms", type=int, default=250)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed(path, users=2, movies=1)
+        env = {"AVAILABILITY_FLUSH_MS": str(args.flush_ms)}
+        with serve("main:app", path, args.port, env) as base_url:
+            print(asyncio.run(run(base_url, args.port, args.subscribers, args.bookings, args.flush_ms)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Time to first byte, throughput and server memory of the bookings export.
+
+For each size in ``--bookings`` this generates that many bookings, starts
+``main:app`` and downloads ``GET /admin/bookings/export`` while sampling the
+server's resident memory. Peak heap should stay flat as the export grows.
+
+    cd server
+    python bench/bench_export.py --bookings 10000 1000000 --format ndjson
+"""
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import serve, token
+
+
+def server_heap_kib(port: int) -> int:
+    """Resident heap of the uvicorn process listening on ``port``.
+
+    File-backed pages are left out: SQLite's mmap maps the database file, so
+    they grow with every page read but the kernel can drop them at any time.
+    """
+    for cmdline in glob.glob("/proc/[0-9]*/cmdline"):
+        try:
+            with open(cmdline, "rb") as f:
+                args = f.read().split(b"\0")
+            if b"uvicorn" in args and str(port).encode() in args:
+                with open(cmdline.replace("cmdline", "status")) as f:
+                    for line in f:
+                        if line.startswith("RssAnon:"):
+                            return int(line.split()[1])
+        except OSError:
+            continue
+    return 0
+
+
+def export(base_url: str, port: int, export_format: str) -> dict:
+    peak = [server_heap_kib(port)]
+    before = peak[0]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(0.05):
+            peak[0] = max(peak[0], server_heap_kib(port))
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    headers = {"Authorization": f"Bearer {token(1, 'admin')}"}
+    started = time.perf_counter()
+    first_byte = None
+    size = lines = 0
+    try:
+        with httpx.stream("GET", f"{base_url}/admin/bookings/export", params={"format": export_format},
+                          headers=headers, timeout=None) as response:
+            response.raise_for_status()
+            for chunk in response.iter_bytes():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - started
+                size += len(chunk)
+                lines += chunk.count(b"\n")
+    finally:
+        done.set()
+        sampler.join()
+    duration = time.perf_counter() - started
+    return {
+        "rows": lines - (export_format == "csv"),
+        "first_byte_ms": round(first_byte * 1000, 1),
+        "seconds": round(duration, 1),
+        "rows_per_sec": round(lines / duration),
+        "mib": round(size / 2**20, 1),
+        "heap_before_mib": round(before / 1024, 1),
+        "heap_peak_mib": round(peak[0] / 1024, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--movies", type=int, default=200)
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    for bookings in args.bookings:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            # Before anything imports database.py, which reads it once
+            os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+            from sqlalchemy import create_engine
+
+            import models
+            from bench_analytics import generate
+
+            engine = create_engine(f"sqlite:///{path}")
+            models.Base.metadata.create_all(engine)
+            with engine.begin() as conn:
+                generate(conn, bookings, args.movies, 30, datetime.utcnow())
+            engine.dispose()
+
+            with serve("main:app", path, args.port) as base_url:
+                print(f"{bookings:>10} bookings: {export(base_url, args.port, args.format)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Time ``POST /admin/movies/import`` for a large catalog.
+
+Seeds an empty database, starts ``main:app`` and uploads ``--rows`` generated
+movies as CSV, then uploads the same file again, which updates every movie
+instead of adding it.
+
+    cd server
+    python bench/bench_import.py --rows 100000
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import GENRES, seed, serve, token
+
+
+def catalog(rows: int) -> bytes:
+    rng = random.Random(7)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["title", "genre", "duration", "rating", "image_url"])
+    for i in range(rows):
+        writer.writerow([f"Imported Movie {i}", rng.choice(GENRES), rng.randint(80, 200),
+                         round(rng.uniform(1, 10), 1), f"https://example.com/{i}.jpg"])
+    return buffer.getvalue().encode("utf-8")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    body = catalog(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed(path, users=1, movies=1)
+        headers = {"Authorization": f"Bearer {token(1, 'admin')}", "Content-Type": "text/csv"}
+        with serve("main:app", path, args.port) as base_url:
+            for label in ("create", "update"):
+                started = time.perf_counter()
+                response = httpx.post(f"{base_url}/admin/movies/import", content=body, headers=headers, timeout=None)
+                response.raise_for_status()
+                report = response.json()
+                duration = time.perf_counter() - started
+                print(f"{label}: {args.rows} rows in {duration:.1f}s ({args.rows / duration:.0f} rows/s), "
+                      f"created {report['created']}, updated {report['updated']}, failed {report['failed']}")
+            started = time.perf_counter()
+            total = httpx.get(f"{base_url}/movies/", params={"search": "imported"}).json()["total"]
+            print(f"search after import: {total} matches in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
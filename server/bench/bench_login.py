@@ -0,0 +1,102 @@
+"""Measure login latency while booking traffic runs in parallel.
+
+Seeds a database where every user shares one bcrypt hash, starts ``main:app``
+and runs two loads at once: ``POST /auth/login`` from ``--logins`` clients and
+``POST /user/bookings/`` from ``--bookers`` clients. Both are reported with
+p50/p99 so the effect of a login spike on the rest of the API is visible.
+
+``--rounds`` sets the cost the seeded hashes were made with. When it differs
+from ``BCRYPT_ROUNDS`` on the server, the first login of each user rehashes.
+
+    cd server
+    python bench/bench_login.py --logins 16 --bookers 16 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+import httpx
+from passlib.hash import bcrypt
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import seed, serve, summarize, token
+
+PASSWORD = "bench-password"
+SLOTS = ["09:00-12:00", "12:00-15:00", "15:00-18:00", "18:00-21:00", "21:00-24:00"]
+
+
+async def drive(base_url: str, users: int, movies: int, logins: int, bookers: int, duration: float) -> dict:
+    headers = [{"Authorization": f"Bearer {token(user_id)}"} for user_id in range(1, users + 1)]
+    latencies = {"login": [], "booking": []}
+    errors = {"login": {}, "booking": {}}
+    deadline = time.perf_counter() + duration
+
+    async def timed(kind, ok_status, send):
+        start = time.perf_counter()
+        try:
+            status = (await send()).status_code
+        except httpx.HTTPError:
+            status = "error"
+        latencies[kind].append(time.perf_counter() - start)
+        if status != ok_status:
+            errors[kind][status] = errors[kind].get(status, 0) + 1
+
+    async def login_worker(client):
+        while time.perf_counter() < deadline:
+            body = {"email": f"user{random.randint(1, users)}@example.com", "password": PASSWORD}
+            await timed("login", 200, lambda: client.post("/auth/login", json=body))
+
+    async def booking_worker(client):
+        while time.perf_counter() < deadline:
+            body = {
+                "Movies_id": random.randint(1, movies),
+                "tickets_booked": random.randint(1, 4),
+                "ticket_slot": random.choice(SLOTS),
+                "ticket_type": "Regular",
+            }
+            await timed("booking", 201, lambda: client.post(
+                "/user/bookings/", json=body, headers=random.choice(headers)))
+
+    limits = httpx.Limits(max_connections=logins + bookers)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await asyncio.gather(
+            *(login_worker(client) for _ in range(logins)),
+            *(booking_worker(client) for _ in range(bookers)),
+        )
+
+    results = {}
+    for kind in ("login", "booking"):
+        results[kind] = summarize(latencies[kind], duration, sum(errors[kind].values()))
+        if errors[kind]:
+            results[kind]["statuses"] = errors[kind]
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--movies", type=int, default=200)
+    parser.add_argument("--logins", type=int, default=16)
+    parser.add_argument("--bookers", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    hashed = bcrypt.using(rounds=args.rounds, ident="2b").hash(PASSWORD)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        seed(db_path, users=args.users, movies=args.movies, hashed_password=hashed)
+        with serve("main:app", db_path, args.port) as base_url:
+            results = asyncio.run(drive(
+                base_url, args.users, args.movies, args.logins, args.bookers, args.duration))
+    for kind, result in results.items():
+        print(f"{kind:8} {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Micro-benchmarks of the CPU-bound helpers behind the hot endpoints.
+
+Times, in this process and without the worker pools:
+
+- ``generate_qr_code`` for a typical ticket payload
+- ``hash_password`` and ``verify_password`` at ``--rounds``
+- ``get_current_user`` with the verified-token cache cold and warm
+
+Prints ops/s and p50/p95/p99 per function as JSON. As with loadtest.py,
+``--output`` saves a run and ``--compare`` fails on a p95 regression.
+
+    cd server
+    python bench/bench_micro.py --output micro.json
+    python bench/bench_micro.py --compare micro.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import regressions, summarize, token
+
+
+def timed(fn, iterations: int, setup=None) -> dict:
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        if setup:
+            setup(i)
+        start = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - start)
+    result = summarize(latencies, time.perf_counter() - started)
+    del result["errors"]
+    result["calls"] = result.pop("requests")
+    result["ops_per_sec"] = result.pop("req_per_sec")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost")
+    parser.add_argument("--hash-iterations", type=int, default=20)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--compare", help="JSON report of an earlier run to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    # Read at import time by passwords.py
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    from passwords import hash_password, verify_password
+    from qr_renderer import generate_qr_code
+    from routes.auth import get_current_user
+    from routes.bookings import ticket_payload
+    from token_cache import token_cache
+
+    payloads = [ticket_payload(f"Movie {i}", f"E{i % 30 + 1},E{(i + 1) % 30 + 1}", "18:00-21:00", f"user{i}")
+                for i in range(args.iterations)]
+    hashed = hash_password("bench-password")
+    tokens = [token(i % 1000 + 1) for i in range(args.iterations)]
+
+    results = {
+        "generate_qr_code": timed(lambda i: generate_qr_code(payloads[i]), args.iterations),
+        "hash_password": timed(lambda i: hash_password("bench-password"), args.hash_iterations),
+        "verify_password": timed(lambda i: verify_password("bench-password", hashed), args.hash_iterations),
+        "get_current_user (cold)": timed(
+            lambda i: get_current_user(tokens[i]), args.iterations, setup=lambda i: token_cache.clear()),
+        "get_current_user (warm)": timed(lambda i: get_current_user(tokens[0]), args.iterations),
+    }
+
+    report = {"config": {"iterations": args.iterations, "rounds": args.rounds}, "functions": results}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["functions"]
+        slower = regressions(results, baseline, args.tolerance)
+        if slower:
+            print("Regressions:\n  " + "\n  ".join(slower), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
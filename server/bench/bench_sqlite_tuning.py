@@ -0,0 +1,79 @@
+"""Stress concurrent booking writes with and without the SQLite tuning.
+
+Each run seeds a fresh database (journal_mode=WAL sticks to the file), starts
+``main:app`` with ``SQLITE_TUNING`` off or on and fires ``POST /user/bookings/``
+from many concurrent clients. It reports bookings per second, latency and how
+many requests failed, e.g. with "database is locked".
+
+    cd server
+    python bench/bench_sqlite_tuning.py --concurrency 32 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import seed, serve, summarize, token
+
+SLOTS = ["09:00-12:00", "12:00-15:00", "15:00-18:00", "18:00-21:00", "21:00-24:00"]
+
+
+async def drive(base_url: str, users: int, movies: int, concurrency: int, duration: float) -> dict:
+    headers = [{"Authorization": f"Bearer {token(user_id)}"} for user_id in range(1, users + 1)]
+    latencies = []
+    statuses = {}
+    deadline = time.perf_counter() + duration
+
+    async def worker(client):
+        while time.perf_counter() < deadline:
+            body = {
+                "Movies_id": random.randint(1, movies),
+                "tickets_booked": random.randint(1, 4),
+                "ticket_slot": random.choice(SLOTS),
+                "ticket_type": "Regular",
+            }
+            start = time.perf_counter()
+            try:
+                response = await client.post("/user/bookings/", json=body, headers=random.choice(headers))
+                status = response.status_code
+            except httpx.HTTPError:
+                status = "error"
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+
+    result = summarize(latencies, duration, sum(n for s, n in statuses.items() if s != 201))
+    result["bookings_per_sec"] = round(statuses.get(201, 0) / duration, 1)
+    result["statuses"] = statuses
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--movies", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    for label, tuning in (("default pragmas", "0"), ("tuned pragmas", "1")):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.db")
+            seed(db_path, users=args.users, movies=args.movies)
+            with serve("main:app", db_path, args.port, env={"SQLITE_TUNING": tuning}) as base_url:
+                result = asyncio.run(drive(base_url, args.users, args.movies, args.concurrency, args.duration))
+        print(f"{label:16} {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Booking throughput of a launch rush, direct and through a waiting room.
+
+Seeds ``--users`` users and one movie, then has every user book a ticket at
+once, spread over the movie's slots, two ways on fresh databases:
+
+- direct: each ``POST /user/bookings/`` commits its own booking
+- queued: an admin opens a waiting room at ``--rate`` admissions a second,
+  orders get queue tickets, and clients poll ``GET /user/queue/{id}`` until
+  their booking is written by the group-committing writer
+
+For each it prints bookings per second, time from order to booking, and
+the commits, SQL statements and database time it took per booking. On one
+machine the client competes with the server for CPU, so the database figures
+say more than the wall clock.
+
+    cd server
+    python bench/bench_waiting_room.py --users 1000 --rate 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import seed, serve, summarize, token
+
+SLOTS = ["09:00-12:00", "12:00-15:00", "15:00-18:00", "18:00-21:00", "21:00-24:00"]
+
+
+def order(user_id: int) -> dict:
+    return {"Movies_id": 1, "tickets_booked": 1, "ticket_slot": SLOTS[user_id % len(SLOTS)], "ticket_type": "Regular"}
+
+
+async def book(client: httpx.AsyncClient, user_id: int, poll: float) -> tuple[bool, float]:
+    """Order as ``user_id`` and wait for the booking; (booked, seconds taken)."""
+    headers = {"Authorization": f"Bearer {token(user_id)}"}
+    started = time.perf_counter()
+    try:
+        response = await client.post("/user/bookings/", json=order(user_id), headers=headers)
+        while response.status_code in (200, 202) and response.json()["status"] in ("waiting", "admitted"):
+            await asyncio.sleep(poll)
+            response = await client.get(f"/user/queue/{response.json()['id']}", headers=headers)
+    except httpx.HTTPError:
+        return False, time.perf_counter() - started
+    booked = response.status_code == 201 or (response.status_code == 200 and response.json()["status"] == "booked")
+    return booked, time.perf_counter() - started
+
+
+def metric(text: str, name: str) -> float:
+    """Sum of every series of ``name`` in a Prometheus exposition."""
+    return sum(float(value) for value in re.findall(rf"^{re.escape(name)}(?:{{[^}}]*}})? (\S+)$", text, re.MULTILINE))
+
+
+async def rush(base_url: str, users: int, concurrency: int, rate: float, poll: float) -> dict:
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        if rate:
+            response = await client.put(
+                "/admin/movies/1/waiting-room", json={"admit_per_second": rate},
+                headers={"Authorization": f"Bearer {token(1, 'admin')}"},
+            )
+            response.raise_for_status()
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(book(client, user_id, poll) for user_id in range(2, users + 2)))
+        duration = time.perf_counter() - started
+        health = (await client.get("/api/health")).json()
+        metrics = (await client.get("/metrics")).text
+
+    latencies = [seconds for booked, seconds in results if booked]
+    summary = summarize(latencies, duration, errors=len(results) - len(latencies))
+    summary["seconds"] = round(duration, 1)
+    if latencies:
+        booked = len(latencies)
+        commits = metric(metrics, 'showtimex_span_seconds_count{span="db_commit"}')
+        summary["commits"] = int(commits)
+        summary["queries_per_booking"] = round(metric(metrics, "showtimex_db_query_seconds_count") / booked, 2)
+        summary["db_ms_per_booking"] = round(
+            (metric(metrics, "showtimex_db_query_seconds_sum")
+             + metric(metrics, 'showtimex_span_seconds_sum{span="db_commit"}')) * 1000 / booked, 2,
+        )
+    if rate:
+        summary["largest_batch"] = health["waiting_room"]["largest_batch"]
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=500, help="waiting room admissions per second")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--poll", type=float, default=0.5, help="seconds between queue polls")
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    report = {}
+    for mode, rate in (("direct", 0), ("queued", args.rate)):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            seed(path, users=args.users + 1, movies=1)
+            with serve("main:app", path, args.port) as base_url:
+                report[mode] = asyncio.run(rush(base_url, args.users, args.concurrency, rate, args.poll))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
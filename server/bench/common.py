@@ -0,0 +1,108 @@
+"""Helpers shared by the benchmark scripts in this directory."""
+import contextlib
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import timedelta
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+import httpx
+
+GENRES = ["Action", "Drama", "Comedy", "Thriller", "Sci-Fi", "Horror", "Romance", "Animation"]
+
+
+def seed(path: str, users: int = 1, movies: int = 100, hashed_password: str = "!", titles: list = None) -> None:
+    """Create a fresh SQLite database with ``users`` users and ``movies`` movies.
+
+    User 1 is an admin and owns every movie. Every user gets ``hashed_password``,
+    which by default matches no password. ``titles`` replaces the generated
+    "Movie N" titles and sets the number of movies.
+    """
+    from sqlalchemy import create_engine, insert
+
+    import models
+
+    rng = random.Random(42)
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Users), [{
+            "email": f"user{i}@example.com", "username": f"user{i}", "first_name": "Bench",
+            "last_name": str(i), "hashed_password": hashed_password, "role": "admin" if i == 1 else "user",
+        } for i in range(1, users + 1)])
+        conn.execute(insert(models.Movies), [{
+            "title": title, "genre": rng.choice(GENRES), "duration": rng.randint(80, 200),
+            "rating": round(rng.uniform(1, 10), 1), "user_id": 1,
+        } for title in titles or [f"Movie {i}" for i in range(1, movies + 1)]])
+    engine.dispose()
+
+
+def token(user_id: int, role: str = "user") -> str:
+    from routes.auth import create_access_token
+
+    return create_access_token(
+        {"sub": f"user{user_id}@example.com", "user_id": user_id, "role": role, "username": f"user{user_id}"},
+        expires_delta=timedelta(hours=1),
+    )
+
+
+@contextlib.contextmanager
+def serve(app: str, db_path: str, port: int, env: dict = None):
+    """Run ``app`` with uvicorn in a subprocess against ``db_path``."""
+    # Every virtual user comes from one IP and books far beyond a person's budget
+    process_env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", PYTHONPATH=SERVER_DIR,
+                       RATE_LIMIT_ENABLED="false")
+    process_env.update(env or {})
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning",
+         "--timeout-graceful-shutdown", "5", "--app-dir", SERVER_DIR],
+        env=process_env,
+    )
+    try:
+        for _ in range(200):
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/api/health")
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError(f"{app} did not start")
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def percentile(ordered: list, fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(latencies: list, duration: float, errors: int = 0) -> dict:
+    if not latencies:
+        return {"requests": 0, "errors": errors}
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "req_per_sec": round(len(ordered) / duration, 1),
+        "p50_ms": round(statistics.median(ordered) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+    }
+
+
+def regressions(results: dict, baseline: dict, tolerance: float, metric: str = "p95_ms") -> list:
+    """Names whose ``metric`` grew by more than ``tolerance`` (0.2 = 20%) over ``baseline``."""
+    slower = []
+    for name, result in results.items():
+        before = baseline.get(name, {}).get(metric)
+        after = result.get(metric)
+        if before and after is not None and after > before * (1 + tolerance):
+            slower.append(f"{name}: {metric} {before} -> {after}")
+    return slower
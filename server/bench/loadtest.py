@@ -0,0 +1,187 @@
+"""Mixed load test of the booking and catalog hot paths.
+
+Seeds a SQLite database with ``--movies`` movies, starts ``main:app`` and runs
+``--concurrency`` virtual users for ``--duration`` seconds. Each one signs up
+and logs in, then loops over a weighted mix of catalog browse, search, movie
+details and showtimes, booking create, list and cancel, and now and then a
+fresh login. Prints throughput and p50/p95/p99 per endpoint as JSON.
+
+Save a run with ``--output`` and pass it as ``--compare`` to a later run to
+exit non-zero when any endpoint's p95 got more than ``--tolerance`` slower.
+
+    cd server
+    python bench/loadtest.py --concurrency 32 --duration 30 --output baseline.json
+    python bench/loadtest.py --concurrency 32 --duration 30 --compare baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import regressions, seed, serve, summarize
+
+PASSWORD = "load-test-password"
+SLOTS = ["09:00-12:00", "12:00-15:00", "15:00-18:00", "18:00-21:00", "21:00-24:00"]
+TICKET_TYPES = ["Regular", "Premium", "IMAX", "4DX"]
+DEFAULT_MIX = "browse=30,search=20,details=10,showtimes=10,book=15,list=10,cancel=4,login=1"
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list] = {}
+        self.statuses: dict[str, dict] = {}
+
+    async def call(self, name: str, ok_status: int, send):
+        start = time.perf_counter()
+        try:
+            response = await send()
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, "error"
+        self.latencies.setdefault(name, []).append(time.perf_counter() - start)
+        if status != ok_status:
+            counts = self.statuses.setdefault(name, {})
+            counts[status] = counts.get(status, 0) + 1
+            return None
+        return response
+
+    def report(self, duration: float) -> dict:
+        results = {}
+        for name, latencies in sorted(self.latencies.items()):
+            statuses = self.statuses.get(name, {})
+            results[name] = summarize(latencies, duration, sum(statuses.values()))
+            if statuses:
+                results[name]["statuses"] = {str(status): count for status, count in statuses.items()}
+        return results
+
+
+async def virtual_user(client: httpx.AsyncClient, recorder: Recorder, number: int, movies: int,
+                       weights: dict, deadline: float, rng: random.Random) -> None:
+    account = {
+        "username": f"load{number}", "email": f"load{number}@example.com", "password": PASSWORD,
+        "first_name": "Load", "last_name": str(number), "role": "user",
+    }
+    credentials = {"email": account["email"], "password": PASSWORD}
+    await recorder.call("POST /auth/signup", 200, lambda: client.post("/auth/signup", json=account))
+
+    async def login():
+        response = await recorder.call("POST /auth/login", 200, lambda: client.post("/auth/login", json=credentials))
+        return {"Authorization": f"Bearer {response.json()['access_token']}"} if response else None
+
+    headers = await login()
+    if headers is None:
+        return
+    booked = []
+    names, cumulative = list(weights), list(weights.values())
+
+    while time.perf_counter() < deadline:
+        action = rng.choices(names, cumulative)[0]
+        movie_id = rng.randint(1, movies)
+        if action == "browse":
+            params = {"skip": rng.randrange(0, max(1, movies - 10)), "limit": 10}
+            await recorder.call("GET /movies/", 200, lambda: client.get("/movies/", params=params))
+        elif action == "search":
+            term = f"movie {movie_id}"[:rng.randint(3, len(str(movie_id)) + 6)]
+            await recorder.call("GET /movies/?search", 200, lambda: client.get("/movies/", params={"search": term}))
+        elif action == "details":
+            await recorder.call("GET /movies/{id}", 200, lambda: client.get(f"/movies/{movie_id}"))
+        elif action == "showtimes":
+            await recorder.call("GET /movies/{id}/showtimes", 200, lambda: client.get(f"/movies/{movie_id}/showtimes"))
+        elif action == "book":
+            body = {
+                "Movies_id": movie_id,
+                "tickets_booked": rng.randint(1, 4),
+                "ticket_slot": rng.choice(SLOTS),
+                "ticket_type": rng.choice(TICKET_TYPES),
+            }
+            response = await recorder.call(
+                "POST /user/bookings/", 201, lambda: client.post("/user/bookings/", json=body, headers=headers))
+            if response is not None:
+                booked.append(response.json()["id"])
+        elif action == "list":
+            await recorder.call("GET /user/bookings/", 200, lambda: client.get("/user/bookings/", headers=headers))
+        elif action == "cancel" and booked:
+            booking_id = booked.pop(rng.randrange(len(booked)))
+            await recorder.call(
+                "DELETE /user/bookings/{id}", 204, lambda: client.delete(f"/user/bookings/{booking_id}", headers=headers))
+        elif action == "login":
+            headers = await login() or headers
+
+
+async def drive(base_url: str, concurrency: int, movies: int, weights: dict, duration: float, seed_value: int) -> dict:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(
+            virtual_user(client, recorder, number, movies, weights, deadline, random.Random(seed_value + number))
+            for number in range(1, concurrency + 1)
+        ))
+        elapsed = time.perf_counter() - started
+    results = recorder.report(elapsed)
+    results["total"] = summarize(
+        [latency for latencies in recorder.latencies.values() for latency in latencies],
+        elapsed,
+        sum(sum(statuses.values()) for statuses in recorder.statuses.values()),
+    )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--movies", type=int, default=1000)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weights per action, default {DEFAULT_MIX}")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12, help="BCRYPT_ROUNDS of the server")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8770)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--compare", help="JSON report of an earlier run to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        seed(db_path, users=1, movies=args.movies)
+        env = {"BCRYPT_ROUNDS": str(args.bcrypt_rounds)}
+        with serve("main:app", db_path, args.port, env) as base_url:
+            results = asyncio.run(drive(
+                base_url, args.concurrency, args.movies, parse_mix(args.mix), args.duration, args.seed))
+
+    report = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "port")},
+        "endpoints": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["endpoints"]
+        slower = regressions(results, baseline, args.tolerance)
+        if slower:
+            print("Regressions:\n  " + "\n  ".join(slower), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Content-addressed storage for binary objects such as ticket QR images.
+
+``put`` stores bytes under the hex SHA-256 of their content and returns that
+key, so the same image stored twice is kept once and a key never changes
+meaning. Rows keep a short ``blob:<key>`` reference instead of the bytes.
+
+``BLOB_STORE_URL`` picks the backend:
+
+- a directory (default ``./blobs``): each blob is a file at
+  ``<dir>/ab/cd/<key>``, written to a temporary file and renamed into place
+- ``s3://bucket/prefix``: any S3-compatible service, needs the ``boto3``
+  package; ``BLOB_S3_ENDPOINT`` points it at MinIO, R2 and the like
+
+Reads hand back an iterator of chunks so responses stream the object
+instead of loading it whole.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from typing import Iterator, Optional
+from urllib.parse import urlparse
+
+BLOB_STORE_URL = os.getenv("BLOB_STORE_URL", "./blobs")
+BLOB_S3_ENDPOINT = os.getenv("BLOB_S3_ENDPOINT", "")
+CHUNK_SIZE = 64 * 1024
+
+REF_PREFIX = "blob:"
+KEY_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+def _read_chunks(file) -> Iterator[bytes]:
+    with file:
+        while chunk := file.read(CHUNK_SIZE):
+            yield chunk
+
+
+class LocalBackend:
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Readers never see a partly written file
+        fd, partial = tempfile.mkstemp(dir=directory, prefix=".partial-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(partial, path)
+        except BaseException:
+            os.unlink(partial)
+            raise
+
+    def open(self, key: str) -> Optional[Iterator[bytes]]:
+        try:
+            return _read_chunks(open(self._path(key), "rb"))
+        except FileNotFoundError:
+            return None
+
+    def delete(self, key: str) -> None:
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3Backend:
+    def __init__(self, url: str, endpoint: str = BLOB_S3_ENDPOINT):
+        import boto3
+
+        parsed = urlparse(url)
+        self.bucket = parsed.netloc
+        self.prefix = parsed.path.strip("/")
+        self._client = boto3.client("s3", endpoint_url=endpoint or None)
+
+    def _name(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        self._client.put_object(Bucket=self.bucket, Key=self._name(key), Body=data, ContentType=content_type)
+
+    def open(self, key: str) -> Optional[Iterator[bytes]]:
+        try:
+            body = self._client.get_object(Bucket=self.bucket, Key=self._name(key))["Body"]
+        except self._client.exceptions.NoSuchKey:
+            return None
+        return body.iter_chunks(CHUNK_SIZE)
+
+    def delete(self, key: str) -> None:
+        self._client.delete_object(Bucket=self.bucket, Key=self._name(key))
+
+
+def make_backend(url: str = BLOB_STORE_URL):
+    if url.startswith("s3://"):
+        return S3Backend(url)
+    return LocalBackend(url)
+
+
+class BlobStore:
+    def __init__(self, backend=None):
+        self.backend = backend or make_backend()
+
+    def put(self, data: bytes, content_type: str = "application/octet-stream") -> str:
+        """Store ``data`` and return its key."""
+        key = hashlib.sha256(data).hexdigest()
+        self.backend.put(key, data, content_type)
+        return key
+
+    def open(self, key: str) -> Optional[Iterator[bytes]]:
+        """Chunks of the blob stored under ``key``, or None if there is none."""
+        if not KEY_PATTERN.fullmatch(key):
+            return None
+        return self.backend.open(key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        chunks = self.open(key)
+        return None if chunks is None else b"".join(chunks)
+
+    def delete(self, key: str) -> None:
+        if KEY_PATTERN.fullmatch(key):
+            self.backend.delete(key)
+
+
+def blob_ref(key: str) -> str:
+    return REF_PREFIX + key
+
+
+def ref_key(value: str) -> Optional[str]:
+    """Key of a ``blob:<key>`` reference, None for any other value."""
+    return value[len(REF_PREFIX):] if value.startswith(REF_PREFIX) else None
+
+
+blob_store = BlobStore()
@@ -0,0 +1,214 @@
+"""Bulk import of movies from CSV or JSON Lines.
+
+Rows are read from the file a chunk at a time, validated against
+``schemas.MovieCreate`` and written in one transaction per chunk. A row whose
+title and genre match a movie of the importing admin updates the fields the
+row gives, any other row adds a movie with its showtimes and search entry.
+Rows matching only movies of other admins fail, as updating those through
+the API would. Later rows with
+the same title and genre as an earlier row of the file are reported as
+duplicates and skipped. A failed chunk does not undo the chunks before it.
+
+CSV files need a header row naming the ``MovieCreate`` fields. From the
+command line, as the admin who will own new movies:
+
+    cd server
+    python catalog_import.py catalog.csv --user-id 1
+
+Servers pick up movies imported from another process once their catalog
+cache entries and typo-correction vocabulary expire.
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+from itertools import islice
+from typing import IO, Iterator, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import insert, select, tuple_, update
+
+import models
+import schemas
+import search as movie_search
+import showtimes
+from response_cache import catalog_cache
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+# Failed rows listed in the report; the counts always cover every row
+IMPORT_MAX_ERRORS = 1000
+FORMATS = ("csv", "jsonl")
+FIELDS = list(schemas.MovieCreate.model_fields)
+
+
+def guess_format(name: str) -> str:
+    return "jsonl" if name.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def _records(file: IO[str], file_format: str) -> Iterator[tuple[int, object]]:
+    """``(row number, dict)`` per record, or ``(row number, error)`` if unreadable."""
+    if file_format == "jsonl":
+        for number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                yield number, f"Invalid JSON: {error}"
+                continue
+            yield number, record if isinstance(record, dict) else "Expected a JSON object"
+        return
+
+    reader = csv.DictReader(file)
+    number = 0
+    while True:
+        number += 1
+        try:
+            record = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as error:
+            yield number, f"Invalid CSV: {error}"
+            continue
+        # Empty cells are missing values, not empty strings
+        yield number, {key: value for key, value in record.items() if key and value not in ("", None)}
+
+
+def read_movies(file: IO[str], file_format: str) -> Iterator[tuple[int, object]]:
+    """``(row number, MovieCreate)`` per valid row, ``(row number, [errors])`` otherwise."""
+    for number, record in _records(file, file_format):
+        if isinstance(record, str):
+            yield number, [record]
+            continue
+        try:
+            yield number, schemas.MovieCreate.model_validate(record)
+        except ValidationError as error:
+            yield number, [
+                f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors()
+            ]
+
+
+async def _write_chunk(db, movies: list[schemas.MovieCreate], user_id: int) -> tuple[int, int, list[int]]:
+    """Write ``movies``; (created, updated, indexes of movies owned by another admin)."""
+    keys = [(movie.title, movie.genre) for movie in movies]
+    owned, others = {}, set()
+    for movie_id, title, genre, owner_id in (await db.execute(
+        select(models.Movies.id, models.Movies.title, models.Movies.genre, models.Movies.user_id)
+        .where(tuple_(models.Movies.title, models.Movies.genre).in_(keys))
+    )).all():
+        if owner_id == user_id:
+            owned[(title, genre)] = movie_id
+        else:
+            others.add((title, genre))
+
+    updates, inserts, conflicts = [], [], []
+    for index, (key, movie) in enumerate(zip(keys, movies)):
+        if key in owned:
+            # Fields the row leaves out keep their value
+            updates.append({"id": owned[key], **movie.model_dump(exclude_unset=True)})
+        elif key in others:
+            conflicts.append(index)
+        else:
+            inserts.append({**movie.model_dump(), "user_id": user_id})
+
+    if updates:
+        await db.execute(update(models.Movies), updates)
+    new_ids = []
+    if inserts:
+        new_ids = (await db.execute(
+            insert(models.Movies).returning(models.Movies.id, sort_by_parameter_order=True),
+            inserts,
+        )).scalars().all()
+        await showtimes.add_showtimes(db, new_ids)
+
+    await movie_search.index_movies(db, [
+        (row["id"], row["title"], row["genre"]) for row in updates
+    ] + [
+        (movie_id, row["title"], row["genre"]) for movie_id, row in zip(new_ids, inserts)
+    ])
+    return len(inserts), len(updates), conflicts
+
+
+async def import_movies(session_factory, rows: Iterator[tuple[int, object]], user_id: int) -> dict:
+    """Write the rows of ``read_movies`` and return the import report."""
+    report = {"created": 0, "updated": 0, "duplicates": 0, "failed": 0, "errors": []}
+    seen: dict[tuple[str, str], int] = {}
+
+    def fail(number: int, errors: list[str]) -> None:
+        report["failed"] += 1
+        if len(report["errors"]) < IMPORT_MAX_ERRORS:
+            report["errors"].append({"row": number, "errors": errors})
+
+    while True:
+        # Parsing and validation run off the event loop
+        chunk = await run_in_threadpool(lambda: list(islice(rows, IMPORT_CHUNK_SIZE)))
+        if not chunk:
+            break
+
+        numbers, movies = [], []
+        for number, movie in chunk:
+            if isinstance(movie, list):
+                fail(number, movie)
+                continue
+            key = (movie.title, movie.genre)
+            if key in seen:
+                report["duplicates"] += 1
+                continue
+            seen[key] = number
+            numbers.append(number)
+            movies.append(movie)
+        if not movies:
+            continue
+
+        async with session_factory() as db:
+            try:
+                created, updated, conflicts = await _write_chunk(db, movies, user_id)
+                await db.commit()
+            except Exception as error:
+                await db.rollback()
+                for number in numbers:
+                    fail(number, [f"Not saved: {error.__class__.__name__}"])
+                continue
+        for index in conflicts:
+            fail(numbers[index], ["Can only update your own movies"])
+        report["created"] += created
+        report["updated"] += updated
+        await catalog_cache.invalidate()
+
+    report["errors_truncated"] = report["failed"] > len(report["errors"])
+    return report
+
+
+def open_text(file: IO[bytes]) -> IO[str]:
+    # utf-8-sig drops the byte order mark spreadsheet exports start with
+    return io.TextIOWrapper(file, encoding="utf-8-sig", errors="replace", newline="")
+
+
+async def _main(path: str, file_format: str, user_id: int) -> dict:
+    from database import AsyncSessionLocal, async_engine, engine
+
+    models.Base.metadata.create_all(bind=engine)
+    movie_search.ensure_index(engine)
+    try:
+        with open(path, "rb") as file:
+            return await import_movies(AsyncSessionLocal, read_movies(open_text(file), file_format), user_id)
+    finally:
+        await async_engine.dispose()
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Import movies from a CSV or JSON Lines file.")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+    parser.add_argument("--user-id", type=int, required=True, help="admin who owns the new movies")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(_main(args.path, args.format or guess_format(args.path), args.user_id))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Short-lived seat holds between choosing seats and booking them.
+
+A hold sets seats aside in ``seat_inventory`` for ``SEAT_HOLD_TTL`` seconds.
+Nothing is written to the database until the hold is confirmed, so placing,
+releasing and expiring holds never waits on a database lock, and a hold on a
+full show is refused from memory.
+
+Expiry times are kept in a heap. Every hold operation first pops the holds
+that are due, and ``sweep`` does the same once a second while the server
+runs, so an expired hold frees its seats within about a second.
+
+Holds live in the server process that placed them, like the seat map cache.
+With several processes, a confirm fails with ``SeatsUnavailable`` if another
+process sold one of the held seats in the meantime.
+"""
+import asyncio
+import heapq
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from seating import SeatsUnavailable, load_show, seat_inventory
+
+SEAT_HOLD_TTL = int(os.getenv("SEAT_HOLD_TTL", "300"))
+# Holds one user may have open at a time
+SEAT_HOLD_MAX_PER_USER = int(os.getenv("SEAT_HOLD_MAX_PER_USER", "4"))
+
+
+class TooManyHolds(Exception):
+    """Raised when a user already has ``SEAT_HOLD_MAX_PER_USER`` open holds."""
+
+
+@dataclass
+class Hold:
+    id: str
+    user_id: int
+    movie_id: int
+    slot: str
+    ticket_type: str
+    seats: int  # seat mask, see seating.py
+    expires_at: float  # time.time()
+
+
+class SeatHolds:
+    def __init__(self, ttl: int = SEAT_HOLD_TTL, max_per_user: int = SEAT_HOLD_MAX_PER_USER):
+        self.ttl = ttl
+        self.max_per_user = max_per_user
+        self.expired = 0
+        self._holds: dict[str, Hold] = {}
+        self._per_user: dict[int, int] = {}
+        self._expiry: list[tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def _remove(self, hold: Hold) -> None:
+        del self._holds[hold.id]
+        left = self._per_user[hold.user_id] - 1
+        if left:
+            self._per_user[hold.user_id] = left
+        else:
+            del self._per_user[hold.user_id]
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Free the seats of every hold that is due and return how many there were."""
+        now = time.time() if now is None else now
+        due = []
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= now:
+                _, hold_id = heapq.heappop(self._expiry)
+                hold = self._holds.get(hold_id)
+                if hold is not None:
+                    self._remove(hold)
+                    due.append(hold)
+            self.expired += len(due)
+        for hold in due:
+            seat_inventory.unhold(hold.movie_id, hold.slot, hold.seats)
+        return len(due)
+
+    async def place(
+        self, db: AsyncSession, user_id: int, movie_id: int, slot: str, count: int, ticket_type: str,
+    ) -> Hold:
+        """Hold ``count`` seats of a show; the caller commits.
+
+        Raises ``TooManyHolds`` or ``SeatsUnavailable``.
+        """
+        self.expire()
+        # Checked again below, other requests of the user may place holds meanwhile
+        if self._per_user.get(user_id, 0) >= self.max_per_user:
+            raise TooManyHolds()
+
+        # Seeds show_seats the first time a show is used
+        await load_show(db, movie_id, slot)
+        seats = seat_inventory.hold(movie_id, slot, count)
+        if not seats:
+            raise SeatsUnavailable()
+
+        hold = Hold(uuid.uuid4().hex, user_id, movie_id, slot, ticket_type, seats, time.time() + self.ttl)
+        with self._lock:
+            full = self._per_user.get(user_id, 0) >= self.max_per_user
+            if not full:
+                self._holds[hold.id] = hold
+                self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+                heapq.heappush(self._expiry, (hold.expires_at, hold.id))
+        if full:
+            seat_inventory.unhold(movie_id, slot, seats)
+            raise TooManyHolds()
+        return hold
+
+    def take(self, hold_id: str, user_id: int) -> Optional[Hold]:
+        """Remove a hold of ``user_id`` to confirm it; its seats stay held.
+
+        The caller either writes the seats with ``take_held_seats`` or hands
+        them back with ``seat_inventory.unhold``.
+        """
+        self.expire()
+        with self._lock:
+            hold = self._holds.get(hold_id)
+            if hold is None or hold.user_id != user_id:
+                return None
+            self._remove(hold)
+            return hold
+
+    def release(self, hold_id: str, user_id: int) -> bool:
+        hold = self.take(hold_id, user_id)
+        if hold is None:
+            return False
+        seat_inventory.unhold(hold.movie_id, hold.slot, hold.seats)
+        return True
+
+    async def sweep(self, interval: float = 1.0) -> None:
+        """Expire holds every ``interval`` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            self.expire()
+
+    def stats(self) -> dict:
+        return {"open": len(self._holds), "expired": self.expired}
+
+
+seat_holds = SeatHolds()
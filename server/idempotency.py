@@ -0,0 +1,165 @@
+"""Replay of booking writes sent again with the same ``Idempotency-Key``.
+
+The first request with a key runs the route and stores its status and JSON
+body; a repeat within ``IDEMPOTENCY_TTL`` seconds gets the stored response
+back without running the route again. A repeat that arrives while the first
+is still running waits for it instead of starting a second execution.
+
+Keys are scoped to the user, method and path, and stored as a SHA-256
+digest next to a digest of the request body. Reusing a key for a different
+body is a ``422``. Responses are only stored when the route finished with a
+result or an ``HTTPException`` below 500; after any other failure the next
+request with the key runs the route again. A route that returns a
+``Response`` of its own, such as the 202 of a queued booking, has its
+status, body and headers stored as they are.
+
+The store is an in-process bounded LRU, so with several server processes a
+retry is only recognised by the process that handled the first attempt.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_STORE_SIZE = int(os.getenv("IDEMPOTENCY_STORE_SIZE", "100000"))
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyStore:
+    def __init__(self, size: int = IDEMPOTENCY_STORE_SIZE, ttl: int = IDEMPOTENCY_TTL):
+        self.size = size
+        self.ttl = ttl
+        self.replays = 0
+        # digest -> (expires at, request digest, status code, body, headers)
+        self._entries: "OrderedDict[bytes, tuple[float, bytes, int, bytes, Optional[dict]]]" = OrderedDict()
+        # digest -> (request digest, set once the running request is done)
+        self._running: dict[bytes, tuple[bytes, asyncio.Event]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(user_id: int, method: str, path: str, idempotency_key: str) -> bytes:
+        return hashlib.sha256(f"{user_id}\0{method}\0{path}\0{idempotency_key}".encode("utf-8")).digest()
+
+    def _get(self, key: bytes) -> Optional[tuple[float, bytes, int, bytes, Optional[dict]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _put(
+        self, key: bytes, fingerprint: bytes, status_code: int, body: bytes, headers: Optional[dict] = None,
+    ) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, fingerprint, status_code, body, headers)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _response(status_code: int, body: bytes, replayed: bool, headers: Optional[dict] = None) -> Response:
+        headers = dict(headers or {})
+        if replayed:
+            headers["Idempotent-Replayed"] = "true"
+        if status_code == 204:
+            return Response(status_code=204, headers=headers)
+        return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
+
+    async def run(
+        self,
+        key: bytes,
+        fingerprint: bytes,
+        call: Callable[[], Awaitable],
+        status_code: int = 200,
+        response_model=None,
+    ) -> Response:
+        """Response of ``call``, or the stored one when ``key`` was seen before."""
+        while True:
+            entry = self._get(key)
+            if entry is not None:
+                if entry[1] != fingerprint:
+                    raise HTTPException(status_code=422, detail="Idempotency-Key was used for a different request")
+                self.replays += 1
+                return self._response(entry[2], entry[3], replayed=True, headers=entry[4])
+
+            running = self._running.get(key)
+            if running is None:
+                break
+            if running[0] != fingerprint:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was used for a different request")
+            await running[1].wait()
+
+        done = asyncio.Event()
+        self._running[key] = (fingerprint, done)
+        try:
+            try:
+                result = await call()
+            except HTTPException as error:
+                if error.status_code >= 500:
+                    raise
+                body = json.dumps({"detail": error.detail}).encode("utf-8")
+                self._put(key, fingerprint, error.status_code, body)
+                raise
+
+            if isinstance(result, Response):
+                # The route picked its own status, e.g. the 202 of a queued booking
+                headers = {
+                    name: value for name, value in result.headers.items()
+                    if name not in ("content-length", "content-type")
+                }
+                self._put(key, fingerprint, result.status_code, result.body, headers)
+                return result
+
+            if response_model is not None:
+                result = response_model.model_validate(result)
+            body = json.dumps(jsonable_encoder(result), separators=(",", ":")).encode("utf-8")
+            self._put(key, fingerprint, status_code, body)
+            return self._response(status_code, body, replayed=False)
+        finally:
+            del self._running[key]
+            done.set()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "running": len(self._running), "replays": self.replays}
+
+
+def fingerprint(*parts) -> bytes:
+    return hashlib.sha256(json.dumps(jsonable_encoder(parts), sort_keys=True).encode("utf-8")).digest()
+
+
+idempotency_store = IdempotencyStore()
+
+
+async def idempotent(
+    idempotency_key: Optional[str],
+    user_id: int,
+    method: str,
+    path: str,
+    request_parts: tuple,
+    call: Callable[[], Awaitable],
+    status_code: int = 200,
+    response_model=None,
+):
+    """Run ``call`` once per ``Idempotency-Key``; without a key, just run it."""
+    if idempotency_key is None:
+        return await call()
+    if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Invalid Idempotency-Key")
+    return await idempotency_store.run(
+        idempotency_store.key(user_id, method, path, idempotency_key),
+        fingerprint(*request_parts),
+        call,
+        status_code=status_code,
+        response_model=response_model,
+    )
@@ -1,12 +1,47 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from database import engine, SessionLocal
-from routes import bookings, movies, auth
+from database import async_engine, engine, stream_engine
+from availability import seat_feed
+from holds import seat_holds
+from idempotency import idempotency_store
+import metrics
+from passwords import password_hasher
+from qr_renderer import qr_renderer
+from rate_limit import RateLimitMiddleware, admission, rate_limiter
+from response_cache import catalog_cache
+from search import ensure_index
+from token_cache import token_cache
+from waiting_room import waiting_room
+from routes import analytics, availability, bookings, exports, holds, movies, queue, auth
 import models
 
 
-app = FastAPI(title="ShowTimeX_Backend")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    sweeper = asyncio.create_task(seat_holds.sweep())
+    feed = asyncio.create_task(seat_feed.run())
+    queue_writer = asyncio.create_task(waiting_room.run(bookings.write_queued))
+    yield
+    seat_feed.close()
+    sweeper.cancel()
+    feed.cancel()
+    queue_writer.cancel()
+    qr_renderer.shutdown()
+    password_hasher.shutdown()
+    await async_engine.dispose()
+    await stream_engine.dispose()
+
+
+# orjson renders response bodies several times faster than the json module
+app = FastAPI(title="ShowTimeX_Backend", lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# Inside CORS, so browsers can read 429 and 503 responses
+app.add_middleware(RateLimitMiddleware)
 
 # Add CORS middleware
 app.add_middleware(
@@ -15,28 +50,58 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Response headers the client reads: the next page of bookings, catalog
+    # revalidation, and how long to back off after a 429, 503 or queued order
+    expose_headers=["X-Next-Cursor", "ETag", "Retry-After", "Location"],
 )
+# Outermost, so the timings cover CORS handling too
+app.add_middleware(metrics.TimingMiddleware)
+
+metrics.instrument_engine(async_engine)
+if stream_engine is not async_engine:
+    metrics.instrument_engine(stream_engine)
 
 
 # Create database tables
 models.Base.metadata.create_all(bind=engine)
+ensure_index(engine)
 
 
 # Include routers
 app.include_router(auth.router)
 app.include_router(bookings.router)
+app.include_router(holds.router)
 app.include_router(movies.router)
 app.include_router(movies.public_router)
+app.include_router(availability.router)
+app.include_router(queue.router)
+app.include_router(queue.admin_router)
+app.include_router(analytics.router)
+app.include_router(exports.router)
 
 @app.get("/")
 def root():
     return {"message": "Welcome to ShowTimeX Backend"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def read_metrics():
+    """Prometheus text exposition of request, SQL and span timings"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/api/health")
 def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "message": "ShowTimeX Backend is running"
+        "message": "ShowTimeX Backend is running",
+        "token_cache": token_cache.stats(),
+        "catalog_cache": catalog_cache.stats(),
+        "idempotency": idempotency_store.stats(),
+        "seat_holds": seat_holds.stats(),
+        "seat_feed": seat_feed.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "admission": admission.stats(),
+        "waiting_room": waiting_room.stats()
     }
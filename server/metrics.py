@@ -0,0 +1,243 @@
+"""Request timing, SQL counters and spans, exposed at ``/metrics``.
+
+``TimingMiddleware`` times every request by route template, from the first
+byte in to the last byte of the body out, so streamed responses count in
+full. While a request runs, engine events add each SQL statement's count and
+time to it, and ``span`` adds named blocks such as QR rendering, password
+hashing and session commits. All of it lands in Prometheus histograms.
+
+With ``SLOW_REQUEST_MS`` above 0, requests slower than that are logged on the
+``showtimex.slow`` logger with their spans and the SQL they ran.
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+# Statements listed per slow request, and characters kept of each
+SLOW_REQUEST_MAX_QUERIES = 50
+SLOW_REQUEST_SQL_LENGTH = 200
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+slow_log = logging.getLogger("showtimex.slow")
+
+
+class Histogram:
+    """Cumulative Prometheus histogram with one series per label tuple."""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...], buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # labels -> (bucket counts, count, sum)
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(self._series.items())
+            series = [(labels, (list(counts), count, total)) for labels, (counts, count, total) in series]
+        for labels, (counts, count, total) in series:
+            base = ",".join(f'{key}="{_escape(value)}"' for key, value in zip(self.labels, labels))
+            prefix = base + "," if base else ""
+            for bound, bucket in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {bucket}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            suffix = f"{{{base}}}" if base else ""
+            lines.append(f"{self.name}_count{suffix} {count}")
+            lines.append(f"{self.name}_sum{suffix} {total}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            base = ",".join(f'{key}="{_escape(value)}"' for key, value in zip(self.labels, labels))
+            lines.append(f"{self.name}{{{base}}} {value}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+request_duration = Histogram(
+    "showtimex_request_duration_seconds", "Time from request start to the end of the response body.",
+    ("method", "route"),
+)
+requests_total = Counter("showtimex_requests_total", "Finished requests.", ("method", "route", "status"))
+request_queries = Histogram(
+    "showtimex_request_queries", "SQL statements run per request.", ("method", "route"), QUERY_COUNT_BUCKETS,
+)
+request_db_duration = Histogram(
+    "showtimex_request_db_seconds", "Time per request spent executing SQL statements.", ("method", "route"),
+)
+span_duration = Histogram("showtimex_span_seconds", "Time spent in named spans.", ("span",))
+query_duration = Histogram("showtimex_db_query_seconds", "Time per SQL statement, in or out of requests.", ())
+
+REGISTRY = [request_duration, requests_total, request_queries, request_db_duration, span_duration, query_duration]
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time", "spans", "statements")
+
+    def __init__(self, keep_statements: bool):
+        self.queries = 0
+        self.db_time = 0.0
+        self.spans: dict[str, float] = {}
+        self.statements: Optional[list[tuple[float, str]]] = [] if keep_statements else None
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+@contextmanager
+def span(name: str):
+    """Time a block under ``name``, and add it to the current request if any."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        span_duration.observe(elapsed, name)
+        stats = _current.get()
+        if stats is not None:
+            stats.spans[name] = stats.spans.get(name, 0.0) + elapsed
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    query_duration.observe(elapsed)
+    stats = _current.get()
+    if stats is None:
+        return
+    stats.queries += 1
+    stats.db_time += elapsed
+    if stats.statements is not None and len(stats.statements) < SLOW_REQUEST_MAX_QUERIES:
+        stats.statements.append((elapsed, " ".join(statement.split())[:SLOW_REQUEST_SQL_LENGTH]))
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not run for a failed statement
+    started = exception_context.connection and exception_context.connection.info.get("query_started")
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine) -> None:
+    """Count and time every statement run on ``engine``, sync or async."""
+    target = getattr(engine, "sync_engine", engine)
+    event.listen(target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target, "after_cursor_execute", _after_cursor_execute)
+    event.listen(target, "handle_error", _handle_error)
+
+
+@event.listens_for(Session, "before_commit")
+def _commit_started(session):
+    session.info["commit_started"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_commit")
+def _commit_finished(session):
+    started = session.info.pop("commit_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    span_duration.observe(elapsed, "db_commit")
+    stats = _current.get()
+    if stats is not None:
+        stats.spans["db_commit"] = stats.spans.get("db_commit", 0.0) + elapsed
+
+
+class TimingMiddleware:
+    """ASGI middleware recording the metrics above for every HTTP request."""
+
+    def __init__(self, app, slow_request_ms: float = SLOW_REQUEST_MS):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(keep_statements=self.slow_request_ms > 0)
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_timed(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+
+            request_duration.observe(elapsed, method, path)
+            requests_total.inc(method, path, str(status))
+            request_queries.observe(stats.queries, method, path)
+            request_db_duration.observe(stats.db_time, method, path)
+
+            if self.slow_request_ms > 0 and elapsed * 1000 >= self.slow_request_ms:
+                slow_log.warning(
+                    "%s %s took %.1f ms, status %s, %d queries in %.1f ms, spans %s\n%s",
+                    method, scope["path"], elapsed * 1000, status, stats.queries, stats.db_time * 1000,
+                    {name: round(seconds * 1000, 1) for name, seconds in stats.spans.items()},
+                    "\n".join(f"  {seconds * 1000:8.1f} ms  {sql}" for seconds, sql in stats.statements),
+                )
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
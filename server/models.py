@@ -1,7 +1,7 @@
 from enum import Enum
 from datetime import datetime
 from database import Base
-from sqlalchemy import Column, Float, Integer, String, Text, Enum as SqlEnum, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Float, Integer, String, Text, Enum as SqlEnum, DateTime, ForeignKey, Boolean, Index, UniqueConstraint
 
 class Users(Base):
     __tablename__ = 'users'
@@ -17,6 +17,13 @@ class Users(Base):
 
 class Movies(Base):
     __tablename__ = 'movies'
+    __table_args__ = (
+        # Catalog imports match incoming movies on title and genre
+        Index("ix_movies_title_genre", "title", "genre"),
+        # GET /movies/ filtered by genre, by minimum rating, or both
+        Index("ix_movies_genre_rating", "genre", "rating"),
+        Index("ix_movies_rating", "rating"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     title = Column(String, nullable=False)
@@ -29,6 +36,13 @@ class Movies(Base):
 
 class Bookings(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # Keyset pagination of a user's booking history
+        Index("ix_bookings_user_created", "user_id", "created_at", "id"),
+        # Active bookings of one show, read when its seat map and seat count
+        # are first built; also serves the movies foreign key
+        Index("ix_bookings_movie_slot", "Movies_id", "ticket_slot", "Status"),
+    )
 
     class TicketType(str, Enum):
         REGULAR = "Regular"
@@ -61,6 +75,65 @@ class Bookings(Base):
     ticket_type = Column(String, nullable=False)
     ticket_price = Column(Integer, nullable=False)
     Status = Column(Boolean, default=True)
-    seat_number = Column(String, nullable=False)
-    qr_code = Column(String, nullable=False)
+    seat_number = Column(String, nullable=False)  # comma separated, e.g. "E14,E15"
+    qr_code = Column(String, nullable=False)  # ticket payload, rendered by qr_renderer.py
     created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ShowSeats(Base):
+    """Taken-seat bitmap of one row of a (movie, slot) show, see seating.py."""
+    __tablename__ = "show_seats"
+    __table_args__ = (UniqueConstraint("Movies_id", "ticket_slot", "row"),)
+
+    id = Column(Integer, primary_key=True)
+    Movies_id = Column(Integer, ForeignKey("movies.id"), nullable=False)
+    ticket_slot = Column(String, nullable=False)
+    row = Column(Integer, nullable=False)  # 0 = row A
+    taken = Column(Integer, nullable=False, default=0)  # bit n set = seat n+1 taken
+
+
+class Screens(Base):
+    __tablename__ = "screens"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+    capacity = Column(Integer, nullable=False)
+
+
+class Showtimes(Base):
+    """One (movie, slot) show with a running count of sold seats, see showtimes.py."""
+    __tablename__ = "showtimes"
+    __table_args__ = (UniqueConstraint("Movies_id", "ticket_slot"),)
+
+    id = Column(Integer, primary_key=True)
+    Movies_id = Column(Integer, ForeignKey("movies.id"), nullable=False)
+    screen_id = Column(Integer, ForeignKey("screens.id"), nullable=False)
+    ticket_slot = Column(String, nullable=False)  # one of Bookings.TIME_SLOTS
+    capacity = Column(Integer, nullable=False)
+    seats_sold = Column(Integer, nullable=False, default=0)
+
+
+class _BookingStats:
+    """Columns shared by the booking rollups, maintained by analytics.py."""
+    dimension = Column(String, primary_key=True)  # "total", "movie", "slot" or "type"
+    bucket = Column(DateTime, primary_key=True)  # start of the hour, day or month, UTC
+    key = Column(String, primary_key=True)  # movie id, slot or ticket type, "" for totals
+    bookings = Column(Integer, nullable=False, default=0)
+    tickets = Column(Integer, nullable=False, default=0)
+    revenue = Column(Integer, nullable=False, default=0)
+
+
+class BookingStatsHourly(_BookingStats, Base):
+    __tablename__ = "booking_stats_hourly"
+    # Rows are stored in (dimension, bucket) order, so a date range is one sequential read
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
+class BookingStatsDaily(_BookingStats, Base):
+    __tablename__ = "booking_stats_daily"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
+class BookingStatsMonthly(_BookingStats, Base):
+    __tablename__ = "booking_stats_monthly"
+    __table_args__ = {"sqlite_with_rowid": False}
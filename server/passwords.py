@@ -0,0 +1,93 @@
+"""Password hashing on a dedicated, bounded process pool.
+
+bcrypt costs hundreds of milliseconds of CPU per call, so hashing and
+verification run in worker processes instead of on the event loop or the
+shared threadpool. At most ``PASSWORD_HASH_QUEUE`` jobs may be waiting or
+running; callers beyond that wait up to ``PASSWORD_HASH_WAIT`` seconds for a
+slot and are then turned away with a 503, so a login spike cannot pile up
+unbounded work.
+
+The cost policy is ``BCRYPT_ROUNDS``. Hashes made with any other cost are
+flagged by ``verify`` so the caller can store the rehashed value on login.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from metrics import span
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "64"))
+PASSWORD_HASH_WAIT = float(os.getenv("PASSWORD_HASH_WAIT", "5"))
+
+# Security - Use bcrypt with bug detection disabled to avoid initialization errors
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+    bcrypt__ident="2b"
+)
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Return whether the password matches and, if the hash is outdated, a new one."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_QUEUE,
+                 wait: float = PASSWORD_HASH_WAIT):
+        self.workers = workers
+        self.wait = wait
+        self._slots = asyncio.Semaphore(max_pending)
+        self._pool = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    async def _run(self, fn, *args):
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.wait)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=503,
+                detail="Too many sign-in requests, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        try:
+            return await asyncio.wrap_future(self._executor().submit(fn, *args))
+        finally:
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        with span("password_hash"):
+            return await self._run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        with span("password_verify"):
+            return await self._run(verify_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+password_hasher = PasswordHasher()
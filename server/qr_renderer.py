@@ -0,0 +1,102 @@
+"""Ticket QR code rendering off the request path.
+
+PNG encoding is CPU bound, so it runs on a small process pool instead of the
+request thread. Rendered images are kept in an LRU cache keyed by the SHA-256
+of the ticket payload, and concurrent requests for the same payload share one
+render.
+"""
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import qrcode
+
+from metrics import span
+
+QR_POOL_WORKERS = int(os.getenv("QR_POOL_WORKERS", "2"))
+QR_CACHE_SIZE = int(os.getenv("QR_CACHE_SIZE", "2048"))
+
+
+def generate_qr_code(data: str) -> bytes:
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(data)
+    qr.make(fit=True)
+    img = qr.make_image(fill='red', back_color='white')
+    buf = io.BytesIO()
+    img.save(buf, format='PNG')
+    return buf.getvalue()
+
+
+def cache_key(data: str) -> str:
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class QRRenderer:
+    def __init__(self, workers: int = QR_POOL_WORKERS, cache_size: int = QR_CACHE_SIZE):
+        self.workers = workers
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._pending: dict[str, Future] = {}
+        # Reentrant: a future that is already done runs its callback inline
+        self._lock = threading.RLock()
+        self._pool = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn, not fork: the server process runs threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def _store(self, key: str, future: Future) -> None:
+        with self._lock:
+            self._pending.pop(key, None)
+            if future.exception() is None:
+                self._cache[key] = future.result()
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+    def submit(self, data: str) -> Future:
+        """Return a future for the PNG of ``data``, rendering it if needed."""
+        key = cache_key(data)
+        with self._lock:
+            png = self._cache.get(key)
+            if png is not None:
+                self._cache.move_to_end(key)
+                future = Future()
+                future.set_result(png)
+                return future
+            future = self._pending.get(key)
+            if future is None:
+                future = self._executor().submit(generate_qr_code, data)
+                self._pending[key] = future
+                future.add_done_callback(lambda done: self._store(key, done))
+            return future
+
+    def render(self, data: str) -> bytes:
+        return self.submit(data).result()
+
+    async def render_async(self, data: str) -> bytes:
+        # Time the request waits for generate_qr_code, 0 on a cache hit
+        with span("qr_render"):
+            return await asyncio.wrap_future(self.submit(data))
+
+    def prerender(self, data: str) -> None:
+        """Warm the cache in the background without waiting for the result."""
+        self.submit(data)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+qr_renderer = QRRenderer()
@@ -0,0 +1,238 @@
+"""Per-client rate limits and a global cap on requests in flight.
+
+``RateLimitMiddleware`` runs before routing. Each request is charged to one
+budget of ``<count>/<seconds>``:
+
+- ``auth``: sign-in and sign-up, keyed by client IP since there is no user
+  yet; every attempt costs a bcrypt run
+- ``booking``: writes to bookings and holds, keyed by user ID, which render
+  QR codes and take the database write lock
+- ``default``: everything else, keyed by user ID or, without a valid token,
+  by client IP
+
+Budgets are sliding-window counters: the count of the current fixed window
+plus the previous window's count weighted by how much of it still overlaps
+the last ``seconds``. That costs two integers per client and maps onto
+Redis ``INCR``/``EXPIRE``, so ``RATE_LIMIT_URL`` can point every process at
+one set of counters (needs the ``redis`` package). Over budget is a 429 with
+``Retry-After`` set to when the client fits again.
+
+Admitted requests then need one of ``ADMISSION_MAX_IN_FLIGHT`` slots. A
+request that cannot get one within ``ADMISSION_WAIT`` seconds is shed with a
+503 rather than queued behind work the server cannot finish in time. Health
+checks, metrics and availability streams, which stay open, skip both.
+"""
+import asyncio
+import math
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+
+from database import env_flag
+from routes.auth import get_current_user
+
+RATE_LIMIT_ENABLED = env_flag("RATE_LIMIT_ENABLED", True)
+RATE_LIMIT_URL = os.getenv("RATE_LIMIT_URL", "")
+RATE_LIMIT_DEFAULT = os.getenv("RATE_LIMIT_DEFAULT", "600/60")
+RATE_LIMIT_AUTH = os.getenv("RATE_LIMIT_AUTH", "20/60")
+RATE_LIMIT_BOOKING = os.getenv("RATE_LIMIT_BOOKING", "30/60")
+# 0 turns the in-flight cap off
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "256"))
+ADMISSION_WAIT = float(os.getenv("ADMISSION_WAIT", "0.5"))
+
+EXEMPT_PATHS = re.compile(r"^/(api/health|metrics)$|^/movies/\d+/availability$")
+# (methods, path) of the routes charged to each budget other than default
+ROUTE_BUDGETS = (
+    ("auth", {"POST"}, re.compile(r"^/auth/(login|signup)/?$")),
+    ("booking", {"POST", "PUT", "DELETE"}, re.compile(r"^/user/(bookings|holds)(/|$)")),
+)
+
+
+def parse_budget(value: str) -> tuple[int, int]:
+    """``"30/60"`` -> 30 requests per 60 seconds."""
+    count, _, seconds = value.partition("/")
+    return int(count), int(seconds or 60)
+
+
+def retry_after(limit: int, window: int, previous: int, current: int, elapsed: float) -> int:
+    """Seconds until a client with these window counts is under ``limit`` again."""
+    if current < limit and previous:
+        # The previous window's share fades until the estimate drops below the limit
+        wait = window * (1 - (limit - current) / previous) - elapsed
+    else:
+        # Only the next window helps, once enough of this one has slid out
+        wait = window - elapsed + window * (1 - limit / max(current, 1))
+    return max(1, math.ceil(wait))
+
+
+class MemoryBackend:
+    def __init__(self):
+        # key -> [window index, count in it, count in the window before, window seconds]
+        self._windows: dict[str, list[int]] = {}
+        self._next_prune = 0.0
+        self._lock = threading.Lock()
+
+    async def hit(self, key: str, window: int, index: int) -> tuple[int, int]:
+        """Count a request in window ``index``; returns (previous, current) counts."""
+        with self._lock:
+            self._prune()
+            entry = self._windows.get(key)
+            if entry is None or entry[0] < index - 1:
+                entry = self._windows[key] = [index, 0, 0, window]
+            elif entry[0] == index - 1:
+                entry[:3] = [index, 0, entry[1]]
+            entry[1] += 1
+            return entry[2], entry[1]
+
+    def _prune(self) -> None:
+        # Clients quiet for two windows start from zero anyway; drop them now and then
+        now = time.time()
+        if now < self._next_prune:
+            return
+        self._next_prune = now + 60
+        for key, (index, _, _, window) in list(self._windows.items()):
+            if index < now // window - 1:
+                del self._windows[key]
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+
+class RedisBackend:
+    def __init__(self, url: str):
+        import redis.asyncio
+
+        self._client = redis.asyncio.from_url(url)
+
+    async def hit(self, key: str, window: int, index: int) -> tuple[int, int]:
+        async with self._client.pipeline(transaction=False) as pipe:
+            pipe.get(f"ratelimit:{key}:{index - 1}")
+            pipe.incr(f"ratelimit:{key}:{index}")
+            pipe.expire(f"ratelimit:{key}:{index}", window * 2)
+            previous, current, _ = await pipe.execute()
+        return int(previous or 0), current
+
+    def __len__(self) -> int:
+        return 0
+
+
+def make_backend(url: str = RATE_LIMIT_URL):
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    return MemoryBackend()
+
+
+class RateLimiter:
+    def __init__(self, budgets: Optional[dict[str, tuple[int, int]]] = None, backend=None):
+        self.budgets = budgets or {
+            "default": parse_budget(RATE_LIMIT_DEFAULT),
+            "auth": parse_budget(RATE_LIMIT_AUTH),
+            "booking": parse_budget(RATE_LIMIT_BOOKING),
+        }
+        self.backend = backend or make_backend()
+        self.limited = 0
+
+    async def check(self, budget: str, client: str) -> Optional[int]:
+        """Count a request of ``client`` against ``budget``; seconds to wait if over it."""
+        limit, window = self.budgets[budget]
+        if limit <= 0:
+            return None
+        now = time.time()
+        index = int(now // window)
+        previous, current = await self.backend.hit(f"{budget}:{window}:{client}", window, index)
+        elapsed = now - index * window
+        if previous * (1 - elapsed / window) + current <= limit:
+            return None
+        self.limited += 1
+        return retry_after(limit, window, previous, current, elapsed)
+
+    def stats(self) -> dict:
+        return {"limited": self.limited, "clients": len(self.backend)}
+
+
+class AdmissionControl:
+    def __init__(self, max_in_flight: int = ADMISSION_MAX_IN_FLIGHT, wait: float = ADMISSION_WAIT):
+        self.max_in_flight = max_in_flight
+        self.wait = wait
+        self.in_flight = 0
+        self.shed = 0
+        self._slots = asyncio.Semaphore(max_in_flight) if max_in_flight > 0 else None
+
+    async def acquire(self) -> bool:
+        if self._slots is not None:
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.wait)
+            except asyncio.TimeoutError:
+                self.shed += 1
+                return False
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {"in_flight": self.in_flight, "max_in_flight": self.max_in_flight, "shed": self.shed}
+
+
+def route_budget(method: str, path: str) -> str:
+    for budget, methods, pattern in ROUTE_BUDGETS:
+        if method in methods and pattern.match(path):
+            return budget
+    return "default"
+
+
+def client_key(scope) -> str:
+    """``user:<id>`` for a request with a valid bearer token, else ``ip:<address>``."""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            token = value.decode("latin-1")
+            try:
+                current_user = get_current_user(token.split(" ")[1] if " " in token else token)
+            except HTTPException:
+                break
+            return f"user:{current_user['user_id']}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def rejection(status_code: int, detail: str, retry: int) -> ORJSONResponse:
+    return ORJSONResponse({"detail": detail}, status_code=status_code, headers={"Retry-After": str(retry)})
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying ``rate_limiter`` and ``admission`` to HTTP requests."""
+
+    def __init__(self, app, enabled: bool = RATE_LIMIT_ENABLED):
+        self.app = app
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or EXEMPT_PATHS.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        if self.enabled:
+            retry = await rate_limiter.check(route_budget(scope["method"], scope["path"]), client_key(scope))
+            if retry is not None:
+                await rejection(429, "Too many requests, slow down", retry)(scope, receive, send)
+                return
+
+        if not await admission.acquire():
+            await rejection(503, "Server is busy, try again shortly", 1)(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release()
+
+
+rate_limiter = RateLimiter()
+admission = AdmissionControl()
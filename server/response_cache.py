@@ -0,0 +1,142 @@
+"""Cache for public responses that only change when an admin edits the catalog.
+
+Entries are stored under ``<namespace>:<generation>:<key>``. Admin routes call
+``invalidate`` after a write, which bumps the generation so every older entry
+stops being read and ages out of the backend on its own.
+
+The default backend is an in-process TTL/LRU. Set ``RESPONSE_CACHE_URL`` to a
+``redis://`` URL to share entries and the generation between server
+processes; this needs the ``redis`` package.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "300"))
+# Browsers may reuse a response this long without asking; 0 means they
+# revalidate every time and get a 304 when nothing changed
+CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", "0"))
+
+
+class MemoryBackend:
+    def __init__(self, size: int = RESPONSE_CACHE_SIZE):
+        self.size = size
+        self._entries: "OrderedDict[str, tuple[float, bytes]]" = OrderedDict()
+        self._counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    async def counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    async def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+
+class RedisBackend:
+    def __init__(self, url: str):
+        import redis.asyncio
+
+        self._client = redis.asyncio.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        await self._client.set(key, value, ex=ttl)
+
+    async def counter(self, key: str) -> int:
+        return int(await self._client.get(key) or 0)
+
+    async def incr(self, key: str) -> int:
+        return await self._client.incr(key)
+
+
+def make_backend(url: str = RESPONSE_CACHE_URL):
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    return MemoryBackend()
+
+
+def cache_key(*parts) -> str:
+    """Stable key for already validated query parameters."""
+    return hashlib.sha256(json.dumps(parts, default=str).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, namespace: str, backend=None, ttl: int = RESPONSE_CACHE_TTL, max_age: int = CATALOG_MAX_AGE):
+        self.namespace = namespace
+        self.backend = backend or make_backend()
+        self.ttl = ttl
+        self.cache_control = f"public, max-age={max_age}" if max_age > 0 else "public, no-cache"
+        self.hits = 0
+        self.misses = 0
+
+    async def _key(self, key: str) -> str:
+        generation = await self.backend.counter(f"{self.namespace}:generation")
+        return f"{self.namespace}:{generation}:{key}"
+
+    async def invalidate(self) -> None:
+        """Forget every cached response; call after the write has committed."""
+        await self.backend.incr(f"{self.namespace}:generation")
+
+    async def value(self, key: str, load: Callable[[], Awaitable]):
+        """Cached JSON-compatible value for ``key``, computed by ``load`` on a miss."""
+        full_key = await self._key(key)
+        cached = await self.backend.get(full_key)
+        if cached is not None:
+            return json.loads(cached)
+        value = jsonable_encoder(await load())
+        await self.backend.set(full_key, json.dumps(value).encode("utf-8"), self.ttl)
+        return value
+
+    async def respond(self, request: Request, key: str, load: Callable[[], Awaitable]) -> Response:
+        """JSON response for ``key`` with ETag revalidation."""
+        full_key = await self._key(key)
+        body = await self.backend.get(full_key)
+        if body is None:
+            self.misses += 1
+            body = json.dumps(jsonable_encoder(await load()), separators=(",", ":")).encode("utf-8")
+            await self.backend.set(full_key, body, self.ttl)
+        else:
+            self.hits += 1
+
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        headers = {"ETag": etag, "Cache-Control": self.cache_control}
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+catalog_cache = ResponseCache("catalog")
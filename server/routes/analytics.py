@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta, timezone
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import HTTPBearer
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import analytics
+from database import get_db
+from routes.auth import admin_required
+
+router = APIRouter(prefix="/admin/analytics", tags=["analytics"])
+security = HTTPBearer()
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """``value`` in UTC without tzinfo, as created_at and the rollup buckets are stored."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+# ---------------- BOOKING ANALYTICS ----------------
+# Revenue and tickets sold for bookings made in [start, end), by movie, slot,
+# ticket type and hour, day or month. Defaults to the last 30 days. Bounds
+# with an offset are converted to UTC, bounds without one are taken as UTC.
+@router.get("/", dependencies=[Depends(security)])
+async def read_analytics(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: Literal["hour", "day", "month"] = "day",
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(admin_required),
+):
+    end = naive_utc(end) or datetime.utcnow()
+    start = naive_utc(start) or end - timedelta(days=30)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if granularity == "hour" and end - start > timedelta(days=31):
+        raise HTTPException(status_code=400, detail="Hourly analytics cover at most 31 days")
+
+    return await analytics.summary(db, start, end, granularity)
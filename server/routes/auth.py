@@ -1,39 +1,23 @@
 from fastapi import APIRouter, HTTPException, status, Depends
-from sqlalchemy.orm import Session
-from database import SessionLocal
+from starlette.requests import Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db
 import models
 import schemas
-from passlib.context import CryptContext
+from metrics import span
+from passwords import password_hasher
+from token_cache import token_cache
 from jose import jwt
 from datetime import datetime, timedelta
 from typing import Optional
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-# Security - Use bcrypt with bug detection disabled to avoid initialization errors
-pwd_context = CryptContext(
-    schemes=["bcrypt"],
-    deprecated="auto",
-    bcrypt__rounds=12,
-    bcrypt__ident="2b"
-)
 SECRET_KEY = "your-secret-key-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -45,15 +29,18 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 @router.post("/signup")
-def signup(user: schemas.UserRegister, db: Session = Depends(get_db)):
+async def signup(user: schemas.UserRegister, db: AsyncSession = Depends(get_db)):
     # Check if user already exists
-    existing_user = db.query(models.Users).filter(models.Users.email == user.email).first()
+    existing_user = (await db.execute(select(models.Users.id).where(models.Users.email == user.email))).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    existing_username = db.query(models.Users).filter(models.Users.username == user.username).first()
+    existing_username = (await db.execute(select(models.Users.id).where(models.Users.username == user.username))).first()
     if existing_username:
         raise HTTPException(status_code=400, detail="Username already taken")
+
+    # Hand the connection back while bcrypt runs
+    await db.commit()
     
     # Create new user
     db_user = models.Users(
@@ -61,12 +48,13 @@ def signup(user: schemas.UserRegister, db: Session = Depends(get_db)):
         username=user.username,
         first_name=user.first_name,
         last_name=user.last_name,
-        hashed_password=hash_password(user.password),
+        # bcrypt is slow on purpose, it runs on the password hashing pool
+        hashed_password=await password_hasher.hash(user.password),
         role=user.role.lower() if user.role else "user"
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     # Create token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -90,15 +78,24 @@ def signup(user: schemas.UserRegister, db: Session = Depends(get_db)):
     }
 
 @router.post("/login")
-def login(user: schemas.UserLogin, db: Session = Depends(get_db)):
+async def login(user: schemas.UserLogin, db: AsyncSession = Depends(get_db)):
     # Find user by email
-    db_user = db.query(models.Users).filter(models.Users.email == user.email).first()
+    db_user = (await db.execute(select(models.Users).where(models.Users.email == user.email))).scalars().first()
     if not db_user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
+
+    # Hand the connection back while bcrypt runs
+    await db.commit()
     
     # Verify password
-    if not verify_password(user.password, db_user.hashed_password):
+    verified, new_hash = await password_hasher.verify(user.password, db_user.hashed_password)
+    if not verified:
         raise HTTPException(status_code=401, detail="Invalid email or password")
+
+    # Hash was made under an older cost policy, store it with the current one
+    if new_hash:
+        db_user.hashed_password = new_hash
+        await db.commit()
     
     # Create token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -124,15 +121,42 @@ def login(user: schemas.UserLogin, db: Session = Depends(get_db)):
 def get_current_user(token: str = None) -> dict:
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
+    # Tokens seen before skip the HMAC check and claims parsing
+    current_user = token_cache.get(token)
+    if current_user is not None:
+        return current_user
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("user_id")
-        role: str = payload.get("role")
-        username: str = payload.get("username")
-        if user_id is None or role is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return {"user_id": user_id, "role": role, "username": username}
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.InvalidTokenError:
+    except jwt.JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    user_id: int = payload.get("user_id")
+    role: str = payload.get("role")
+    username: str = payload.get("username")
+    if user_id is None or role is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    current_user = {"user_id": user_id, "role": role, "username": username}
+    if payload.get("exp") is not None:
+        token_cache.put(token, current_user, payload["exp"])
+    return current_user
+
+
+def bearer_token(request: Request) -> str:
+    auth_header = request.headers.get("Authorization")
+    if not auth_header:
+        raise HTTPException(status_code=401, detail="Authorization header required")
+    return auth_header.split(" ")[1] if " " in auth_header else auth_header
+
+
+async def user_required(request: Request) -> dict:
+    with span("auth_token"):
+        return get_current_user(bearer_token(request))
+
+
+async def admin_required(request: Request) -> dict:
+    with span("auth_token"):
+        current_user = get_current_user(bearer_token(request))
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return current_user
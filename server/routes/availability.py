@@ -0,0 +1,115 @@
+import asyncio
+from typing import Optional
+
+import orjson
+from fastapi import APIRouter, HTTPException, Response, WebSocket
+
+from availability import Subscriber, availability, seat_feed
+from database import AsyncSessionLocal
+from routes.movies import load_showtimes
+
+router = APIRouter(prefix="/movies", tags=["availability"])
+
+# EventSource waits this long before reconnecting, e.g. after a restart
+RECONNECT_MS = 2000
+
+
+async def availability_snapshot(movie_id: int) -> list[dict]:
+    # The request's session would stay open for as long as the stream runs
+    async with AsyncSessionLocal() as db:
+        rows = await load_showtimes(db, movie_id)
+    return [availability(row.Movies_id, row.ticket_slot, row.capacity, row.seats_sold) for row in rows]
+
+
+async def subscribe(movie_id: int) -> tuple[Subscriber, list[dict]]:
+    # Subscribed before the snapshot is read, so no change falls in between
+    subscriber = seat_feed.subscribe(movie_id)
+    try:
+        return subscriber, await seat_feed.snapshot(movie_id, lambda: availability_snapshot(movie_id))
+    except BaseException:
+        seat_feed.unsubscribe(subscriber)
+        raise
+
+
+async def _http_disconnect(receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _websocket_disconnect(websocket: WebSocket) -> None:
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+class EventStream(Response):
+    """Server-Sent Events of one subscription.
+
+    Written against ASGI directly: StreamingResponse runs two tasks in a task
+    group per response, which doubles what an idle stream costs.
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(self, subscriber: Subscriber, snapshot: list[dict]):
+        self.subscriber = subscriber
+        self.snapshot = snapshot
+        self.status_code = 200
+        self.background = None
+        self.init_headers({"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    @staticmethod
+    def encode(updates: list[dict]) -> bytes:
+        if not updates:
+            return b": keepalive\n\n"
+        return b"".join(b"event: availability\ndata: " + orjson.dumps(update) + b"\n\n" for update in updates)
+
+    async def __call__(self, scope, receive, send) -> None:
+        gone = asyncio.ensure_future(_http_disconnect(receive))
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            body = f"retry: {RECONNECT_MS}\n\n".encode() + self.encode(self.snapshot)
+            updates: Optional[list[dict]] = self.snapshot
+            while updates is not None:
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+                updates = await self.subscriber.next(gone)
+                body = self.encode(updates or [])
+            if not gone.done():
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            gone.cancel()
+            seat_feed.unsubscribe(self.subscriber)
+
+
+# ---------------- LIVE SEAT AVAILABILITY ----------------
+# The seat counts of every slot of a movie, then an update whenever bookings
+# change one, see availability.py. Each event's data is one slot's counts.
+@router.get("/{movie_id}/availability", response_class=EventStream)
+async def stream_availability(movie_id: int):
+    subscriber, snapshot = await subscribe(movie_id)
+    return EventStream(subscriber, snapshot)
+
+
+# Same over a WebSocket; every message is a JSON list of slot counts
+@router.websocket("/{movie_id}/availability/ws")
+async def availability_socket(websocket: WebSocket, movie_id: int):
+    try:
+        subscriber, snapshot = await subscribe(movie_id)
+    except HTTPException:
+        await websocket.close(code=4404, reason="Movie not found")
+        return
+
+    gone = None
+    try:
+        await websocket.accept()
+        await websocket.send_text(orjson.dumps(snapshot).decode())
+        gone = asyncio.ensure_future(_websocket_disconnect(websocket))
+        while (updates := await subscriber.next(gone)) is not None:
+            # An empty list after a quiet while is not sent; uvicorn pings idle sockets
+            if updates:
+                await websocket.send_text(orjson.dumps(updates).decode())
+        if not gone.done():
+            await websocket.close(code=1001)
+    finally:
+        if gone is not None:
+            gone.cancel()
+        seat_feed.unsubscribe(subscriber)
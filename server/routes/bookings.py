@@ -1,70 +1,65 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from starlette.requests import Request
-from sqlalchemy.orm import Session
-from database import SessionLocal
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import func, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal, get_db
 import models
 import schemas
-from routes.auth import get_current_user
+from routes.auth import user_required
+from routes.queue import queue_booking
+from idempotency import idempotent
+from availability import seat_feed
+from waiting_room import waiting_room
+from qr_renderer import cache_key, qr_renderer
+from blob_store import blob_store, ref_key
+import analytics
+import showtimes
+from seating import SeatsUnavailable, parse_seats, release_seats, reserve_seat_groups, reserve_seats, seat_inventory, seat_labels
+from collections import defaultdict
+from datetime import datetime
 import uuid
-import random , string, qrcode, io, base64
+import base64
 
 router = APIRouter(prefix="/user/bookings", tags=["bookings"])
 
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Batch orders, holds and reseating would skip the queue of a movie with a waiting room
+WAITING_ROOM_ONLY = "This movie is booked through its waiting room, order it on its own"
 
 
 db_dependency = Depends(get_db)
 
 
-def user_required(request: Request):
-    auth_header = request.headers.get("Authorization")
-    if not auth_header:
-        raise HTTPException(status_code=401, detail="Authorization header required")
-
-    try:
-        token = auth_header.split(" ")[1]
-        return get_current_user(token)
-    except Exception:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-
-# Random seat number generator
-
-def generate_seat_number():
-    letter = random.choice(string.ascii_uppercase[:8])  # Rows A-H
-    number = random.randint(1, 30)  # Seats 1-30
-    return f"{letter}{number}"
-
-
-# QR code generator
+# Text encoded in the ticket QR code, stored on the booking as qr_code
 
-def generate_qr_code(data: str) -> str:
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(data)
-    qr.make(fit=True)
-    img = qr.make_image(fill='red', back_color='white')
-    buf = io.BytesIO()
-    img.save(buf, format='PNG')
-    qr_b64 = base64.b64encode(buf.getvalue()).decode('utf-8')
-    return f"data:image/png;base64,{qr_b64}"
+def ticket_payload(movie_title: str, seat_number: str, slot: str, username: str) -> str:
+    return f"Movie: {movie_title}, Seat: {seat_number}, Slot: {slot}, Name: {username}"
 
 
 # ---------------- CREATE BOOKING ----------------
+# Writes take an optional Idempotency-Key header; a retry with the same key
+# gets the first response back instead of a second booking, see idempotency.py.
+# Movies with an open waiting room queue the order instead, see waiting_room.py.
 @router.post("/", response_model=schemas.BookingResponse, status_code=201)
-def create_booking(
+async def create_booking(
     booking: schemas.BookingCreate,
-    db: Session = db_dependency,
+    db: AsyncSession = db_dependency,
     current_user: dict = Depends(user_required),
+    idempotency_key: Optional[str] = Header(None),
 ):
-    movie = db.query(models.Movies).filter(
-        models.Movies.id == booking.Movies_id
-    ).first()
+    return await idempotent(
+        idempotency_key, current_user["user_id"], "POST", "/user/bookings/", (booking,),
+        lambda: _create_booking(booking, db, current_user),
+        status_code=201, response_model=schemas.BookingResponse,
+    )
+
+
+async def _create_booking(booking: schemas.BookingCreate, db: AsyncSession, current_user: dict):
+    if waiting_room.is_open(booking.Movies_id):
+        return queue_booking(booking, current_user)
+
+    movie = await db.get(models.Movies, booking.Movies_id)
 
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
@@ -72,6 +67,9 @@ def create_booking(
     if booking.ticket_slot not in models.Bookings.TIME_SLOTS:
         raise HTTPException(status_code=400, detail="Invalid time slot")
 
+    if booking.tickets_booked < 1:
+        raise HTTPException(status_code=400, detail="At least one ticket is required")
+
     ticket_type_enum = models.Bookings.TicketType(booking.ticket_type)
 
     ticket_price = (
@@ -79,74 +77,390 @@ def create_booking(
         * booking.tickets_booked
     )
 
-    # To get seat details in QR 
-    seat_number = generate_seat_number()
-    ticket_data = f"Movie: {movie.title}, Seat: {seat_number}, Slot: {booking.ticket_slot}, Name: {current_user['username']}"
-    qr_code = generate_qr_code(ticket_data)
-
-    db_booking = models.Bookings(
-        uuid=str(uuid.uuid4()),
-        Movies_id=booking.Movies_id,
-        user_id=current_user["user_id"],
-        customer_name=current_user["username"],
-        tickets_booked=booking.tickets_booked,
-        ticket_slot=booking.ticket_slot,
-        ticket_type=ticket_type_enum.value,
-        ticket_price=ticket_price,
-        Status=True,
-        seat_number=seat_number,  # Add this field to your model
-        qr_code=qr_code           # Add this field to your model
+    # Rolled back with the rest of the transaction if anything below fails
+    if not await showtimes.sell(db, movie.id, booking.ticket_slot, booking.tickets_booked):
+        raise HTTPException(status_code=409, detail="Not enough seats available")
+
+    try:
+        seats = await reserve_seats(db, movie.id, booking.ticket_slot, booking.tickets_booked)
+    except SeatsUnavailable:
+        raise HTTPException(status_code=409, detail="Not enough seats available")
+
+    try:
+        # To get seat details in QR 
+        seat_number = ",".join(seat_labels(seats))
+        ticket_data = ticket_payload(movie.title, seat_number, booking.ticket_slot, current_user["username"])
+
+        db_booking = models.Bookings(
+            uuid=str(uuid.uuid4()),
+            Movies_id=booking.Movies_id,
+            user_id=current_user["user_id"],
+            customer_name=current_user["username"],
+            tickets_booked=booking.tickets_booked,
+            ticket_slot=booking.ticket_slot,
+            ticket_type=ticket_type_enum.value,
+            ticket_price=ticket_price,
+            Status=True,
+            seat_number=seat_number,
+            qr_code=ticket_data,
+            created_at=datetime.utcnow()
+        )
+
+        db.add(db_booking)
+        await analytics.record(db, [db_booking])
+        await db.commit()
+    except Exception:
+        seat_inventory.release(movie.id, booking.ticket_slot, seats)
+        raise
+
+    # The PNG is rendered in the background and served by GET /{uuid}/qr
+    qr_renderer.prerender(ticket_data)
+    await seat_feed.changed(movie.id, booking.ticket_slot)
+
+    return booking_response(db_booking, movie.title)
+
+# ---------------- CREATE BOOKINGS IN BULK ----------------
+@router.post("/batch", response_model=schemas.BookingBatchResponse)
+async def create_bookings_batch(
+    batch: schemas.BookingBatchCreate,
+    db: AsyncSession = db_dependency,
+    current_user: dict = Depends(user_required),
+    idempotency_key: Optional[str] = Header(None),
+):
+    return await idempotent(
+        idempotency_key, current_user["user_id"], "POST", "/user/bookings/batch", (batch,),
+        lambda: _create_bookings_batch(batch, db, current_user),
+        response_model=schemas.BookingBatchResponse,
+    )
+
+
+async def _create_bookings_batch(batch: schemas.BookingBatchCreate, db: AsyncSession, current_user: dict):
+    items = batch.items
+    results = [None] * len(items)
+
+    movie_ids = {item.Movies_id for item in items}
+    titles = dict(
+        (await db.execute(
+            select(models.Movies.id, models.Movies.title).where(models.Movies.id.in_(movie_ids))
+        )).all()
     )
 
-    db.add(db_booking)
-    db.commit()
-    db.refresh(db_booking)
+    # Group valid items per show so each show's seat map is written once
+    shows = defaultdict(list)
+    for index, item in enumerate(items):
+        if item.Movies_id not in titles:
+            results[index] = (404, "Movie not found")
+        elif waiting_room.is_open(item.Movies_id):
+            results[index] = (409, WAITING_ROOM_ONLY)
+        elif item.ticket_slot not in models.Bookings.TIME_SLOTS:
+            results[index] = (400, "Invalid time slot")
+        elif item.tickets_booked < 1:
+            results[index] = (400, "At least one ticket is required")
+        else:
+            shows[(item.Movies_id, item.ticket_slot)].append(index)
+
+    reserved = []
+    rows = []
+    now = datetime.utcnow()
+    try:
+        for (movie_id, slot), indexes in shows.items():
+            show_rows = await reserve_show_rows(
+                db, movie_id, slot, titles[movie_id], [(current_user, items[i]) for i in indexes], now, reserved,
+            )
+            for index, row in zip(indexes, show_rows):
+                if row is None:
+                    results[index] = (409, "Not enough seats available")
+                else:
+                    rows.append(row)
+                    results[index] = row
+
+        await insert_bookings(db, rows, titles)
+        await db.commit()
+    except Exception:
+        for movie_id, slot, seats in reserved:
+            seat_inventory.release(movie_id, slot, seats)
+        raise
+
+    for movie_id, slot in {(row["Movies_id"], row["ticket_slot"]) for row in rows}:
+        await seat_feed.changed(movie_id, slot)
+
+    response = []
+    for index, result in enumerate(results):
+        if isinstance(result, dict):
+            response.append({"index": index, "status_code": 201, "booking": result})
+        else:
+            response.append({"index": index, "status_code": result[0], "detail": result[1]})
+
+    return {"created": len(rows), "failed": len(items) - len(rows), "results": response}
+
+
+async def write_queued(tickets: list) -> list[tuple[int, object]]:
+    """Write the orders of admitted waiting-room tickets in one transaction."""
+    results = [None] * len(tickets)
+    async with AsyncSessionLocal() as db:
+        movie_ids = {ticket.movie_id for ticket in tickets}
+        titles = dict(
+            (await db.execute(
+                select(models.Movies.id, models.Movies.title).where(models.Movies.id.in_(movie_ids))
+            )).all()
+        )
 
-    response_data = db_booking.__dict__.copy()
-    response_data["movie_name"] = movie.title if movie else None
+        shows = defaultdict(list)
+        for index, ticket in enumerate(tickets):
+            if ticket.movie_id not in titles:
+                results[index] = (404, "Movie not found")
+            else:
+                shows[(ticket.movie_id, ticket.order.ticket_slot)].append(index)
+
+        reserved = []
+        rows = []
+        now = datetime.utcnow()
+        try:
+            for (movie_id, slot), indexes in shows.items():
+                orders = [(tickets[i].user, tickets[i].order) for i in indexes]
+                show_rows = await reserve_show_rows(db, movie_id, slot, titles[movie_id], orders, now, reserved)
+                for index, row in zip(indexes, show_rows):
+                    if row is None:
+                        results[index] = (409, "Not enough seats available")
+                    else:
+                        rows.append(row)
+                        results[index] = (201, row)
+
+            await insert_bookings(db, rows, titles)
+            await db.commit()
+        except Exception:
+            for movie_id, slot, seats in reserved:
+                seat_inventory.release(movie_id, slot, seats)
+            raise
+
+    for row in rows:
+        qr_renderer.prerender(row["qr_code"])
+    for movie_id, slot in {(row["Movies_id"], row["ticket_slot"]) for row in rows}:
+        await seat_feed.changed(movie_id, slot)
+    return results
+
+
+async def reserve_show_rows(
+    db: AsyncSession, movie_id: int, slot: str, title: str, orders: list, now: datetime, reserved: list,
+) -> list[Optional[dict]]:
+    """Seats and booking rows for ``orders`` of one show, (user, BookingCreate) pairs.
+
+    The show's seat map is written once for all of them. Orders that did not
+    fit get None. Reserved seats are appended to ``reserved`` as (movie, slot,
+    mask) for the caller to release if the transaction fails.
+    """
+    try:
+        masks = await reserve_seat_groups(db, movie_id, slot, [order.tickets_booked for _, order in orders])
+    except SeatsUnavailable:
+        masks = [0] * len(orders)
+
+    sold = sum(mask.bit_count() for mask in masks)
+    if sold and not await showtimes.sell(db, movie_id, slot, sold):
+        # The screen holds fewer seats than the seat map
+        union = 0
+        for mask in masks:
+            union |= mask
+        await release_seats(db, movie_id, slot, union)
+        masks = [0] * len(orders)
+
+    rows = []
+    for (user, order), seats in zip(orders, masks):
+        if not seats:
+            rows.append(None)
+            continue
+        reserved.append((movie_id, slot, seats))
+
+        ticket_type_enum = models.Bookings.TicketType(order.ticket_type)
+        seat_number = ",".join(seat_labels(seats))
+        rows.append({
+            "uuid": str(uuid.uuid4()),
+            "Movies_id": movie_id,
+            "user_id": user["user_id"],
+            "customer_name": user["username"],
+            "tickets_booked": order.tickets_booked,
+            "ticket_slot": slot,
+            "ticket_type": ticket_type_enum.value,
+            "ticket_price": models.Bookings.TICKET_PRICES[ticket_type_enum] * order.tickets_booked,
+            "Status": True,
+            "seat_number": seat_number,
+            "qr_code": ticket_payload(title, seat_number, slot, user["username"]),
+            "created_at": now,
+        })
+    return rows
+
+
+async def insert_bookings(db: AsyncSession, rows: list[dict], titles: dict) -> None:
+    """Insert booking rows from ``reserve_show_rows`` and fill in their id and movie_name."""
+    if not rows:
+        return
+    # One multi-row INSERT batch for the whole order, QR codes render on demand
+    ids = (await db.execute(
+        insert(models.Bookings).returning(models.Bookings.id, sort_by_parameter_order=True),
+        rows,
+    )).scalars().all()
+    for row, booking_id in zip(rows, ids):
+        row["id"] = booking_id
+        row["movie_name"] = titles[row["Movies_id"]]
+    await analytics.record(db, rows)
+
+
+# Columns of BookingResponse, read in one query joined to the movie title
+BOOKING_COLUMNS = (
+    models.Bookings.id,
+    models.Bookings.uuid,
+    models.Bookings.Movies_id,
+    models.Bookings.user_id,
+    models.Bookings.customer_name,
+    models.Bookings.tickets_booked,
+    models.Bookings.ticket_slot,
+    models.Bookings.ticket_type,
+    models.Bookings.ticket_price,
+    models.Bookings.Status,
+    models.Bookings.seat_number,
+    models.Bookings.created_at,
+)
+
+
+# Names accepted by ?fields=, in response order
+BOOKING_FIELDS = tuple(column.key for column in BOOKING_COLUMNS) + ("movie_name", "qr_url")
+
+
+def booking_rows(fields: tuple[str, ...] = BOOKING_FIELDS):
+    """Select of the booking columns behind ``fields``, plus id and created_at."""
+    needed = set(fields) | {"id", "created_at"}
+    if "qr_url" in needed:
+        needed.add("uuid")
+    query = select(*(column for column in BOOKING_COLUMNS if column.key in needed))
+    if "movie_name" in needed:
+        query = query.add_columns(
+            func.coalesce(models.Movies.title, "Unknown").label("movie_name"),
+        ).outerjoin(models.Movies, models.Movies.id == models.Bookings.Movies_id)
+    return query
+
+
+def booking_json(row, fields: tuple[str, ...] = BOOKING_FIELDS) -> dict:
+    """BookingResponse fields of a ``booking_rows`` row, without validating them again."""
+    data = row._asdict()
+    if "qr_url" in fields:
+        data["qr_url"] = f"/user/bookings/{data['uuid']}/qr"
+    return {name: data[name] for name in fields}
+
+
+def booking_response(booking: models.Bookings, movie_name: Optional[str]) -> dict:
+    response_data = {column.key: getattr(booking, column.key) for column in BOOKING_COLUMNS}
+    response_data["movie_name"] = movie_name
     return response_data
 
+
+def booking_history(
+    user_id: int, fields: tuple[str, ...] = BOOKING_FIELDS, after: Optional[tuple[datetime, int]] = None, limit: int = 10,
+):
+    """A page of the user's bookings, newest first, after the (created_at, id) of ``after``."""
+    query = booking_rows(fields).where(models.Bookings.user_id == user_id)
+    if after:
+        query = query.where(tuple_(models.Bookings.created_at, models.Bookings.id) < tuple_(*after))
+    return query.order_by(models.Bookings.created_at.desc(), models.Bookings.id.desc()).limit(limit)
+
+
+def parse_fields(fields: Optional[str]) -> tuple[str, ...]:
+    if fields is None:
+        return BOOKING_FIELDS
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in BOOKING_FIELDS]
+    if not names or unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown) or fields!r}")
+    return names
+
+
+def encode_cursor(created_at: datetime, booking_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{booking_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, booking_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(booking_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 # ---------------- GET USER BOOKINGS ----------------
+# Newest first. Pass the X-Next-Cursor header of a page as ?cursor= to get the
+# next one; pages seek on (user_id, created_at, id) instead of OFFSET.
+# ?fields=id,movie_name,Status returns only those keys and reads only their
+# columns. Rows are dumped with orjson as they come from the database, which
+# skips building and validating a BookingResponse per item.
 @router.get("/", response_model=List[schemas.BookingResponse])
-def read_bookings(
-    skip: int = 0,
-    limit: int = 10,
-    db: Session = db_dependency,
+async def read_bookings(
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="Comma-separated BookingResponse fields to return"),
+    db: AsyncSession = db_dependency,
     current_user: dict = Depends(user_required),
 ):
-    bookings = (
-        db.query(models.Bookings)
-        .filter(models.Bookings.user_id == current_user["user_id"])
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+    names = parse_fields(fields)
+    after = decode_cursor(cursor) if cursor else None
+    rows = (await db.execute(booking_history(current_user["user_id"], names, after, limit))).all()
 
-    result = []
-    for booking in bookings:
-        movie = (
-            db.query(models.Movies)
-            .filter(models.Movies.id == booking.Movies_id)
-            .first()
-        )
+    headers = {}
+    if len(rows) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].id)
 
-        data = booking.__dict__.copy()
-        data["movie_name"] = movie.title if movie else "Unknown"
-        result.append(data)
+    return ORJSONResponse([booking_json(row, names) for row in rows], headers=headers)
 
-    return result
+
+# ---------------- GET BOOKING QR CODE ----------------
+# No Authorization header: <img> tags cannot send one, and the random
+# booking uuid is only ever handed to the booking's owner.
+# qr_code holds the ticket payload, rendered on demand, or for bookings made
+# before that a blob:<key> reference to the stored PNG, see blob_store.py.
+@router.get("/{booking_uuid}/qr", response_class=Response)
+async def read_booking_qr(booking_uuid: str, request: Request, db: AsyncSession = db_dependency):
+    booking = (await db.execute(
+        select(models.Bookings.qr_code).where(models.Bookings.uuid == booking_uuid)
+    )).first()
+
+    if not booking:
+        raise HTTPException(status_code=404, detail="Booking not found")
+
+    # Hand the connection back before waiting on the render
+    await db.commit()
+
+    key = ref_key(booking.qr_code)
+    # Changes with the booking's seats. The URL does not, so browsers must ask
+    # every time; an unchanged ticket costs them a 304
+    etag = '"' + (key or cache_key(booking.qr_code))[:32] + '"'
+    headers = {"Cache-Control": "private, no-cache", "ETag": etag}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    if key is not None:
+        chunks = await run_in_threadpool(blob_store.open, key)
+        if chunks is None:
+            raise HTTPException(status_code=404, detail="QR code not found")
+        return StreamingResponse(chunks, media_type="image/png", headers=headers)
+
+    prefix = "data:image/png;base64,"
+    if booking.qr_code.startswith(prefix):
+        # Not moved to the blob store yet, see migration 2a7d4c9e6b15
+        png = base64.b64decode(booking.qr_code[len(prefix):])
+    else:
+        png = await qr_renderer.render_async(booking.qr_code)
+
+    return Response(content=png, media_type="image/png", headers=headers)
 
 
 # ---------------- GET SINGLE BOOKING ----------------
 @router.get("/{booking_id}", response_model=schemas.BookingResponse)
-def read_booking(
+async def read_booking(
     booking_id: int,
-    db: Session = db_dependency,
+    db: AsyncSession = db_dependency,
     current_user: dict = Depends(user_required),
 ):
-    booking = db.query(models.Bookings).filter(
-        models.Bookings.id == booking_id
-    ).first()
+    booking = (await db.execute(
+        booking_rows().where(models.Bookings.id == booking_id)
+    )).first()
 
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
@@ -154,20 +468,27 @@ def read_booking(
     if booking.user_id != current_user["user_id"]:
         raise HTTPException(status_code=403, detail="Access denied")
 
-    return booking
+    return ORJSONResponse(booking_json(booking))
 
 
 # ---------------- UPDATE BOOKING ----------------
 @router.put("/{booking_id}", response_model=schemas.BookingResponse)
-def update_booking(
+async def update_booking(
     booking_id: int,
     booking: schemas.BookingCreate,
-    db: Session = db_dependency,
+    db: AsyncSession = db_dependency,
     current_user: dict = Depends(user_required),
+    idempotency_key: Optional[str] = Header(None),
 ):
-    db_booking = db.query(models.Bookings).filter(
-        models.Bookings.id == booking_id
-    ).first()
+    return await idempotent(
+        idempotency_key, current_user["user_id"], "PUT", f"/user/bookings/{booking_id}", (booking,),
+        lambda: _update_booking(booking_id, booking, db, current_user),
+        response_model=schemas.BookingResponse,
+    )
+
+
+async def _update_booking(booking_id: int, booking: schemas.BookingCreate, db: AsyncSession, current_user: dict):
+    db_booking = await db.get(models.Bookings, booking_id)
 
     if not db_booking:
         raise HTTPException(status_code=404, detail="Booking not found")
@@ -175,25 +496,88 @@ def update_booking(
     if db_booking.user_id != current_user["user_id"]:
         raise HTTPException(status_code=403, detail="Access denied")
 
+    old_movie_id = db_booking.Movies_id
+    slot = db_booking.ticket_slot
+    new_seats = 0
+    reseat = db_booking.Status and (
+        booking.Movies_id != old_movie_id
+        or booking.tickets_booked != db_booking.tickets_booked
+    )
+    if reseat:
+        old_stats = {key: getattr(db_booking, key) for key in (
+            "created_at", "Movies_id", "ticket_slot", "ticket_type", "tickets_booked", "ticket_price",
+        )}
+        if booking.tickets_booked < 1:
+            raise HTTPException(status_code=400, detail="At least one ticket is required")
+        movie = await db.get(models.Movies, booking.Movies_id)
+        if not movie:
+            raise HTTPException(status_code=404, detail="Movie not found")
+
+        old_seats = seat_labels(parse_seats(db_booking.seat_number))
+        if booking.Movies_id == old_movie_id and booking.tickets_booked < len(old_seats):
+            # Fewer tickets for the same show: keep the first seats, free the rest
+            await showtimes.unsell(db, old_movie_id, slot, db_booking.tickets_booked - booking.tickets_booked)
+            await release_seats(db, old_movie_id, slot, parse_seats(",".join(old_seats[booking.tickets_booked:])))
+            db_booking.seat_number = ",".join(old_seats[:booking.tickets_booked])
+        else:
+            if waiting_room.is_open(booking.Movies_id):
+                raise HTTPException(status_code=409, detail=WAITING_ROOM_ONLY)
+            # Seat the new show first so the booking keeps its old seats on failure
+            if not await showtimes.sell(db, booking.Movies_id, slot, booking.tickets_booked):
+                raise HTTPException(status_code=409, detail="Not enough seats available")
+            try:
+                new_seats = await reserve_seats(db, booking.Movies_id, slot, booking.tickets_booked)
+            except SeatsUnavailable:
+                raise HTTPException(status_code=409, detail="Not enough seats available")
+            await showtimes.unsell(db, old_movie_id, slot, db_booking.tickets_booked)
+            await release_seats(db, old_movie_id, slot, parse_seats(db_booking.seat_number))
+            db_booking.seat_number = ",".join(seat_labels(new_seats))
+        db_booking.qr_code = ticket_payload(movie.title, db_booking.seat_number, slot, db_booking.customer_name)
+
     db_booking.Movies_id = booking.Movies_id
     db_booking.tickets_booked = booking.tickets_booked
+    if reseat:
+        # The price follows the seats, so revenue rollups stay in step with the counters
+        ticket_type_enum = models.Bookings.TicketType(db_booking.ticket_type)
+        db_booking.ticket_price = models.Bookings.TICKET_PRICES[ticket_type_enum] * booking.tickets_booked
+        await analytics.record(db, [old_stats], sign=-1)
+        await analytics.record(db, [db_booking])
+
+    try:
+        await db.commit()
+    except Exception:
+        if new_seats:
+            seat_inventory.release(booking.Movies_id, slot, new_seats)
+        # Seats released above are still taken in the database, reload them
+        seat_inventory.forget(old_movie_id, slot)
+        raise
 
-    db.commit()
-    db.refresh(db_booking)
+    if reseat:
+        await seat_feed.changed(old_movie_id, slot)
+        if booking.Movies_id != old_movie_id:
+            await seat_feed.changed(booking.Movies_id, slot)
 
-    return db_booking
+    result = await db.execute(booking_rows().where(models.Bookings.id == booking_id))
+    return result.first()._asdict()
 
 
 # ---------------- CANCEL BOOKING ----------------
 @router.delete("/{booking_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_booking(
+async def delete_booking(
     booking_id: int,
-    db: Session = db_dependency,
+    db: AsyncSession = db_dependency,
     current_user: dict = Depends(user_required),
+    idempotency_key: Optional[str] = Header(None),
 ):
-    booking = db.query(models.Bookings).filter(
-        models.Bookings.id == booking_id
-    ).first()
+    return await idempotent(
+        idempotency_key, current_user["user_id"], "DELETE", f"/user/bookings/{booking_id}", (),
+        lambda: _delete_booking(booking_id, db, current_user),
+        status_code=status.HTTP_204_NO_CONTENT,
+    )
+
+
+async def _delete_booking(booking_id: int, db: AsyncSession, current_user: dict):
+    booking = await db.get(models.Bookings, booking_id)
 
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
@@ -201,5 +585,12 @@ def delete_booking(
     if booking.user_id != current_user["user_id"]:
         raise HTTPException(status_code=403, detail="Access denied")
 
+    was_active = booking.Status
+    if was_active:
+        await showtimes.unsell(db, booking.Movies_id, booking.ticket_slot, booking.tickets_booked)
+        await release_seats(db, booking.Movies_id, booking.ticket_slot, parse_seats(booking.seat_number))
+        await analytics.record(db, [booking], sign=-1)
     booking.Status = False
-    db.commit()
+    await db.commit()
+    if was_active:
+        await seat_feed.changed(booking.Movies_id, booking.ticket_slot)
@@ -0,0 +1,93 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPBearer
+
+import models
+from database import StreamSessionLocal
+from routes.auth import admin_required
+from routes.bookings import booking_rows
+
+router = APIRouter(prefix="/admin/bookings", tags=["exports"])
+security = HTTPBearer()
+
+# Rows fetched from the database cursor and written to the client at a time
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def export_query(start: Optional[datetime], end: Optional[datetime], active: Optional[bool], include_qr: bool):
+    query = booking_rows()
+    if include_qr:
+        query = query.add_columns(models.Bookings.qr_code)
+    if start is not None:
+        query = query.where(models.Bookings.created_at >= start)
+    if end is not None:
+        query = query.where(models.Bookings.created_at < end)
+    if active is not None:
+        query = query.where(models.Bookings.Status == active)
+    # Primary key order: no sort, so the first rows are sent straight away
+    return query.order_by(models.Bookings.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def encode_csv(columns: list[str], rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+def encode_ndjson(columns: list[str], rows) -> str:
+    return "".join(
+        json.dumps(dict(zip(columns, map(_value, row))), separators=(",", ":")) + "\n"
+        for row in rows
+    )
+
+
+async def stream_bookings(query, export_format: str):
+    encode = encode_csv if export_format == "csv" else encode_ndjson
+    # The request's session is closed before the body is sent, so the stream
+    # opens its own
+    async with StreamSessionLocal() as db:
+        result = await db.stream(query)
+        columns = list(result.keys())
+        if export_format == "csv":
+            yield encode_csv(columns, [columns])
+        async for rows in result.partitions():
+            yield encode(columns, rows)
+
+
+# ---------------- EXPORT BOOKINGS ----------------
+# Every booking made in [start, end), oldest first, as CSV or one JSON object
+# per line. Rows are read and sent in batches, so memory use does not depend
+# on the size of the export. The ticket payload is left out unless include_qr.
+@router.get("/export", dependencies=[Depends(security)])
+async def export_bookings(
+    format: Literal["csv", "ndjson"] = "csv",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    active: Optional[bool] = None,
+    include_qr: bool = False,
+    current_user: dict = Depends(admin_required),
+):
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    filename = f"bookings-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}"
+    return StreamingResponse(
+        stream_bookings(export_query(start, end, active, include_qr), format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,149 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db
+import models
+import schemas
+from routes.auth import user_required
+from routes.bookings import WAITING_ROOM_ONLY, booking_response, ticket_payload
+from qr_renderer import qr_renderer
+from holds import TooManyHolds, seat_holds
+from idempotency import idempotent
+from availability import seat_feed
+from waiting_room import waiting_room
+import analytics
+import showtimes
+from seating import SeatsUnavailable, seat_inventory, seat_labels, take_held_seats
+from datetime import datetime
+import uuid
+
+router = APIRouter(prefix="/user/holds", tags=["holds"])
+
+
+db_dependency = Depends(get_db)
+
+
+def hold_response(hold) -> dict:
+    return {
+        "id": hold.id,
+        "Movies_id": hold.movie_id,
+        "ticket_slot": hold.slot,
+        "ticket_type": hold.ticket_type,
+        "tickets_booked": hold.seats.bit_count(),
+        "seat_number": ",".join(seat_labels(hold.seats)),
+        "expires_at": datetime.utcfromtimestamp(hold.expires_at),
+    }
+
+
+# ---------------- HOLD SEATS ----------------
+# Seats are set aside in memory for SEAT_HOLD_TTL seconds, see holds.py.
+# A full show is refused without waiting on the database.
+@router.post("/", response_model=schemas.HoldResponse, status_code=201)
+async def create_hold(
+    hold: schemas.BookingCreate,
+    db: AsyncSession = db_dependency,
+    current_user: dict = Depends(user_required),
+):
+    if hold.ticket_slot not in models.Bookings.TIME_SLOTS:
+        raise HTTPException(status_code=400, detail="Invalid time slot")
+
+    if hold.tickets_booked < 1:
+        raise HTTPException(status_code=400, detail="At least one ticket is required")
+
+    if waiting_room.is_open(hold.Movies_id):
+        raise HTTPException(status_code=409, detail=WAITING_ROOM_ONLY)
+
+    if not seat_inventory.is_loaded(hold.Movies_id, hold.ticket_slot):
+        # Only the first hold of a show needs to know the movie exists
+        if not await db.get(models.Movies, hold.Movies_id):
+            raise HTTPException(status_code=404, detail="Movie not found")
+
+    try:
+        placed = await seat_holds.place(
+            db, current_user["user_id"], hold.Movies_id, hold.ticket_slot, hold.tickets_booked, hold.ticket_type,
+        )
+    except TooManyHolds:
+        raise HTTPException(status_code=429, detail="Too many seats on hold")
+    except SeatsUnavailable:
+        raise HTTPException(status_code=409, detail="Not enough seats available")
+
+    # Keeps the seat map of a show seen for the first time
+    await db.commit()
+    return hold_response(placed)
+
+
+# ---------------- CONFIRM HOLD ----------------
+@router.post("/{hold_id}/confirm", response_model=schemas.BookingResponse, status_code=201)
+async def confirm_hold(
+    hold_id: str,
+    db: AsyncSession = db_dependency,
+    current_user: dict = Depends(user_required),
+    idempotency_key: Optional[str] = Header(None),
+):
+    return await idempotent(
+        idempotency_key, current_user["user_id"], "POST", f"/user/holds/{hold_id}/confirm", (),
+        lambda: _confirm_hold(hold_id, db, current_user),
+        status_code=201, response_model=schemas.BookingResponse,
+    )
+
+
+async def _confirm_hold(hold_id: str, db: AsyncSession, current_user: dict):
+    hold = seat_holds.take(hold_id, current_user["user_id"])
+    if hold is None:
+        raise HTTPException(status_code=404, detail="Hold not found or expired")
+
+    tickets = hold.seats.bit_count()
+    try:
+        movie = await db.get(models.Movies, hold.movie_id)
+        if not movie:
+            raise HTTPException(status_code=404, detail="Movie not found")
+
+        if not await showtimes.sell(db, movie.id, hold.slot, tickets):
+            raise HTTPException(status_code=409, detail="Not enough seats available")
+
+        try:
+            await take_held_seats(db, movie.id, hold.slot, hold.seats)
+        except SeatsUnavailable:
+            raise HTTPException(status_code=409, detail="Held seats were sold elsewhere")
+    except BaseException:
+        seat_inventory.unhold(hold.movie_id, hold.slot, hold.seats)
+        raise
+
+    try:
+        ticket_type_enum = models.Bookings.TicketType(hold.ticket_type)
+        seat_number = ",".join(seat_labels(hold.seats))
+        ticket_data = ticket_payload(movie.title, seat_number, hold.slot, current_user["username"])
+
+        db_booking = models.Bookings(
+            uuid=str(uuid.uuid4()),
+            Movies_id=movie.id,
+            user_id=current_user["user_id"],
+            customer_name=current_user["username"],
+            tickets_booked=tickets,
+            ticket_slot=hold.slot,
+            ticket_type=ticket_type_enum.value,
+            ticket_price=models.Bookings.TICKET_PRICES[ticket_type_enum] * tickets,
+            Status=True,
+            seat_number=seat_number,
+            qr_code=ticket_data,
+            created_at=datetime.utcnow()
+        )
+
+        db.add(db_booking)
+        await analytics.record(db, [db_booking])
+        await db.commit()
+    except Exception:
+        seat_inventory.release(movie.id, hold.slot, hold.seats)
+        raise
+
+    qr_renderer.prerender(ticket_data)
+    await seat_feed.changed(movie.id, hold.slot)
+
+    return booking_response(db_booking, movie.title)
+
+
+# ---------------- RELEASE HOLD ----------------
+@router.delete("/{hold_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def release_hold(hold_id: str, current_user: dict = Depends(user_required)):
+    if not seat_holds.release(hold_id, current_user["user_id"]):
+        raise HTTPException(status_code=404, detail="Hold not found or expired")
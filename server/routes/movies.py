@@ -1,46 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer
 from starlette.requests import Request
-from sqlalchemy.orm import Session
-from database import SessionLocal
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal, get_db
+import catalog_import
 import models
 import schemas
-from typing import List, Optional
-from routes.auth import get_current_user
-from fastapi import Query, HTTPException
-from typing import Optional
-from sqlalchemy.orm import Session
+import search as movie_search
+import showtimes
+import tempfile
+from typing import List, Literal, Optional
+from routes.auth import admin_required
+from response_cache import cache_key, catalog_cache
+from seating import seat_inventory
 
 router = APIRouter(prefix="/admin/movies", tags=["movies"])
 public_router = APIRouter(prefix="/movies", tags=["movies"])
 security = HTTPBearer()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 db_dependency = Depends(get_db)
 
-def admin_required(request: Request):
-    auth_header = request.headers.get("Authorization")
-    if not auth_header:
-        raise HTTPException(status_code=401, detail="Authorization header required")
-    try:
-        token = auth_header.split(" ")[1] if " " in auth_header else auth_header
-        current_user = get_current_user(token)
-        if current_user["role"] != "admin":
-            raise HTTPException(status_code=403, detail="Admin privileges required")
-        return current_user
-    except HTTPException:
-        raise
-    except:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-
 @router.post("/", response_model=schemas.MovieResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(security)])
-def create_movie(movie: schemas.MovieCreate, db: Session = db_dependency, current_user: dict = Depends(admin_required)):
+async def create_movie(movie: schemas.MovieCreate, db: AsyncSession = db_dependency, current_user: dict = Depends(admin_required)):
     db_movie = models.Movies(
         title=movie.title,
         genre=movie.genre,
@@ -49,76 +32,155 @@ def create_movie(movie: schemas.MovieCreate, db: Session = db_dependency, curren
         user_id=current_user["user_id"]
     )
     db.add(db_movie)
-    db.commit()
-    db.refresh(db_movie)
+    await db.flush()
+    await movie_search.index_movie(db, db_movie)
+    await showtimes.ensure_showtimes(db, db_movie.id)
+    await db.commit()
+    await catalog_cache.invalidate()
+    await db.refresh(db_movie)
     return db_movie
 
+# Bulk create or update from a CSV or JSON Lines request body, see
+# catalog_import.py. The body is spooled to a temporary file and read back a
+# chunk at a time, so its size is not bounded by memory. Past 1 MB the spool
+# writes to disk, so writes run in the thread pool.
+@router.post("/import", dependencies=[Depends(security)])
+async def import_movies(
+    request: Request,
+    format: Optional[Literal["csv", "jsonl"]] = None,
+    current_user: dict = Depends(admin_required),
+):
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "jsonl" if "json" in content_type else "csv"
+
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as upload:
+        async for chunk in request.stream():
+            await run_in_threadpool(upload.write, chunk)
+        upload.seek(0)
+        rows = catalog_import.read_movies(catalog_import.open_text(upload), format)
+        return await catalog_import.import_movies(AsyncSessionLocal, rows, current_user["user_id"])
+
 @router.get("/", response_model=List[schemas.MovieResponse], dependencies=[Depends(security)])
-def read_movies(skip: int = 0, limit: int = 10, db: Session = db_dependency, current_user: dict = Depends(admin_required)):
-    return db.query(models.Movies).offset(skip).limit(limit).all()
+async def read_movies(skip: int = 0, limit: int = 10, db: AsyncSession = db_dependency, current_user: dict = Depends(admin_required)):
+    result = await db.execute(select(models.Movies).offset(skip).limit(limit))
+    return result.scalars().all()
 
 @router.get("/{movie_id}", response_model=schemas.MovieResponse, dependencies=[Depends(security)])
-def read_movie(movie_id: int, db: Session = db_dependency, current_user: dict = Depends(admin_required)):
-    movie = db.query(models.Movies).filter(models.Movies.id == movie_id).first()
+async def read_movie(movie_id: int, db: AsyncSession = db_dependency, current_user: dict = Depends(admin_required)):
+    movie = await db.get(models.Movies, movie_id)
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
     return movie
 
 @router.put("/{movie_id}", response_model=schemas.MovieResponse, dependencies=[Depends(security)])
-def update_movie(movie_id: int, movie: schemas.MovieCreate, db: Session = db_dependency, current_user: dict = Depends(admin_required)):
-    db_movie = db.query(models.Movies).filter(models.Movies.id == movie_id).first()
+async def update_movie(movie_id: int, movie: schemas.MovieCreate, db: AsyncSession = db_dependency, current_user: dict = Depends(admin_required)):
+    db_movie = await db.get(models.Movies, movie_id)
     if not db_movie:
         raise HTTPException(status_code=404, detail="Movie not found")
     if db_movie.user_id != current_user["user_id"]:
         raise HTTPException(status_code=403, detail="Can only update your own movies")
     for key, value in movie.dict().items():
         setattr(db_movie, key, value)
-    db.commit()
-    db.refresh(db_movie)
+    await movie_search.index_movie(db, db_movie)
+    await db.commit()
+    await catalog_cache.invalidate()
+    await db.refresh(db_movie)
     return db_movie
 
 @router.delete("/{movie_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(security)])
-def delete_movie(movie_id: int, db: Session = db_dependency, current_user: dict = Depends(admin_required)):
-    db_movie = db.query(models.Movies).filter(models.Movies.id == movie_id).first()
+async def delete_movie(movie_id: int, db: AsyncSession = db_dependency, current_user: dict = Depends(admin_required)):
+    db_movie = await db.get(models.Movies, movie_id)
     if not db_movie:
         raise HTTPException(status_code=404, detail="Movie not found")
     if db_movie.user_id != current_user["user_id"]:
         raise HTTPException(status_code=403, detail="Can only delete your own movies")
-    db.delete(db_movie)
-    db.commit()
+    await db.execute(delete(models.ShowSeats).where(models.ShowSeats.Movies_id == movie_id))
+    await db.execute(delete(models.Showtimes).where(models.Showtimes.Movies_id == movie_id))
+    await db.delete(db_movie)
+    await movie_search.unindex_movie(db, movie_id)
+    await db.commit()
+    # The seat maps are gone, a new movie reusing the ID starts from empty shows
+    for slot in models.Bookings.TIME_SLOTS:
+        seat_inventory.forget(movie_id, slot)
+    await catalog_cache.invalidate()
     return None
 
 # Public endpoints
 
+def filter_movies(query, genre: Optional[str], min_rating: Optional[float]):
+    """``query`` narrowed to the genre and rating filters of ``GET /movies/``."""
+    if genre:
+        query = query.where(models.Movies.genre == genre)
+    if min_rating:
+        query = query.where(models.Movies.rating >= min_rating)
+    return query
+
+
+def count_movies(query):
+    return select(func.count()).select_from(query.order_by(None).subquery())
+
+
 @public_router.get("/", response_model=None)
-def get_movies(
+async def get_movies(
+    request: Request,
     skip: int = 0,
     limit: int = 10,
     search: Optional[str] = Query(None),
     genre: Optional[str] = Query(None),
     min_rating: Optional[float] = Query(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    query = db.query(models.Movies)
+    # Search is case and whitespace insensitive, so equal searches share a cache entry
+    search = " ".join(search.lower().split()) if search else None
 
-    if search:
-        query = query.filter(models.Movies.title.ilike(f"%{search}%"))
+    async def load_page():
+        query = select(models.Movies)
+        matches = None
 
-    if genre:
-        query = query.filter(models.Movies.genre == genre)
+        if search:
+            query, matches = await movie_search.search_movies(db, query, search)
 
-    if min_rating:
-        query = query.filter(models.Movies.rating >= min_rating)
+        query = filter_movies(query, genre, min_rating)
+
+        async def load_total():
+            if matches is not None and not genre and not min_rating:
+                return matches
+            return await db.scalar(count_movies(query))
 
-    total = query.count()
-    movies = query.offset(skip).limit(limit).all()
+        # Counted once per filter, not once per page
+        total = await catalog_cache.value(cache_key("movies-total", search, genre, min_rating), load_total)
+        movies = (await db.execute(query.offset(skip).limit(limit))).scalars().all()
+        return {"movies": movies, "total": total}
 
-    return {"movies": movies, "total": total}
+    key = cache_key("movies", skip, limit, search, genre, min_rating)
+    return await catalog_cache.respond(request, key, load_page)
 
 
 @public_router.get("/{movie_id}", response_model=schemas.MovieResponse)
-def get_movie_details(movie_id: int, db: Session = Depends(get_db)):
-    movie = db.query(models.Movies).filter(models.Movies.id == movie_id).first()
-    if not movie:
-        raise HTTPException(status_code=404, detail="Movie not found")
-    return movie
+async def get_movie_details(request: Request, movie_id: int, db: AsyncSession = Depends(get_db)):
+    async def load_movie():
+        movie = await db.get(models.Movies, movie_id)
+        if not movie:
+            raise HTTPException(status_code=404, detail="Movie not found")
+        return schemas.MovieResponse.model_validate(movie)
+
+    return await catalog_cache.respond(request, cache_key("movie", movie_id), load_movie)
+
+
+async def load_showtimes(db: AsyncSession, movie_id: int):
+    rows = await showtimes.movie_showtimes(db, movie_id)
+    if not rows:
+        if not await db.get(models.Movies, movie_id):
+            raise HTTPException(status_code=404, detail="Movie not found")
+        # Movie added before showtimes existed or loaded in bulk
+        await showtimes.ensure_showtimes(db, movie_id)
+        await db.commit()
+        rows = await showtimes.movie_showtimes(db, movie_id)
+    return rows
+
+
+@public_router.get("/{movie_id}/showtimes", response_model=List[schemas.ShowtimeResponse])
+async def get_movie_showtimes(movie_id: int, db: AsyncSession = Depends(get_db)):
+    return [row._asdict() for row in await load_showtimes(db, movie_id)]
+
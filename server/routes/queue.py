@@ -0,0 +1,93 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
+from fastapi.security import HTTPBearer
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_db
+import models
+import schemas
+from routes.auth import admin_required, user_required
+from waiting_room import AlreadyQueued, QueueFull, waiting_room
+
+router = APIRouter(prefix="/user/queue", tags=["waiting room"])
+admin_router = APIRouter(prefix="/admin/movies", tags=["waiting room"])
+
+db_dependency = Depends(get_db)
+security = HTTPBearer()
+
+
+def ticket_response(ticket) -> dict:
+    if ticket.status_code is None:
+        position = waiting_room.position(ticket)
+        state = "waiting" if position else "admitted"
+    else:
+        position = 0
+        state = "booked" if ticket.status_code == 201 else "failed"
+    response = {
+        "id": ticket.id,
+        "Movies_id": ticket.movie_id,
+        "ticket_slot": ticket.order.ticket_slot,
+        "status": state,
+        "position": position,
+        "estimated_wait": waiting_room.estimated_wait(ticket) if position else 0.0,
+        "status_code": ticket.status_code,
+    }
+    if state == "booked":
+        response["booking"] = ticket.result
+    elif state == "failed":
+        response["detail"] = ticket.result
+    return schemas.QueueTicketResponse.model_validate(response).model_dump(mode="json")
+
+
+def room_response(room) -> dict:
+    return {"Movies_id": room.movie_id, "admit_per_second": room.rate, "open": room.open, "waiting": len(room.queue)}
+
+
+def queue_booking(booking: schemas.BookingCreate, current_user: dict) -> ORJSONResponse:
+    """Queue an order for a movie with an open waiting room; a 202 with its ticket."""
+    if booking.ticket_slot not in models.Bookings.TIME_SLOTS:
+        raise HTTPException(status_code=400, detail="Invalid time slot")
+
+    if booking.tickets_booked < 1:
+        raise HTTPException(status_code=400, detail="At least one ticket is required")
+
+    try:
+        ticket = waiting_room.enqueue(booking.Movies_id, current_user, booking)
+    except QueueFull:
+        raise HTTPException(status_code=503, detail="The waiting room is full", headers={"Retry-After": "30"})
+    except AlreadyQueued:
+        raise HTTPException(status_code=409, detail="You already have an order waiting for this movie")
+
+    return ORJSONResponse(
+        ticket_response(ticket), status_code=status.HTTP_202_ACCEPTED, headers={"Location": f"/user/queue/{ticket.id}"},
+    )
+
+
+# ---------------- QUEUE TICKET ----------------
+# Position in the waiting room, then the booking or why it failed
+@router.get("/{ticket_id}", response_model=schemas.QueueTicketResponse)
+async def read_queue_ticket(ticket_id: str, current_user: dict = Depends(user_required)):
+    ticket = waiting_room.ticket(ticket_id, current_user["user_id"])
+    if ticket is None:
+        raise HTTPException(status_code=404, detail="Queue ticket not found")
+    return ORJSONResponse(ticket_response(ticket))
+
+
+# ---------------- OPEN / CLOSE A WAITING ROOM ----------------
+@admin_router.put("/{movie_id}/waiting-room", response_model=schemas.WaitingRoomResponse, dependencies=[Depends(security)])
+async def open_waiting_room(
+    movie_id: int,
+    settings: schemas.WaitingRoomOpen,
+    db: AsyncSession = db_dependency,
+    current_user: dict = Depends(admin_required),
+):
+    if not await db.get(models.Movies, movie_id):
+        raise HTTPException(status_code=404, detail="Movie not found")
+    return room_response(waiting_room.open(movie_id, settings.admit_per_second))
+
+
+# Orders already waiting are still written, new ones are booked directly
+@admin_router.delete("/{movie_id}/waiting-room", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(security)])
+async def close_waiting_room(movie_id: int, current_user: dict = Depends(admin_required)):
+    if not waiting_room.close(movie_id):
+        raise HTTPException(status_code=404, detail="No open waiting room for this movie")
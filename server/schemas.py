@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field, computed_field
 from datetime import datetime
-from typing import Optional, Literal
+from typing import List, Optional, Literal
 
 
 # Auth Schemas
@@ -60,6 +60,21 @@ class MovieResponse(MovieBase):
         from_attributes = True
 
 
+class ShowtimeResponse(BaseModel):
+    id: int
+    Movies_id: int
+    ticket_slot: str
+    screen_id: int
+    screen_name: str
+    capacity: int
+    seats_sold: int
+
+    @computed_field
+    @property
+    def seats_available(self) -> int:
+        return max(self.capacity - self.seats_sold, 0)
+
+
 # Booking Schemas
 class BookingBase(BaseModel):
     Movies_id: int
@@ -90,9 +105,63 @@ class BookingResponse(BaseModel):
     ticket_price: int
     Status: bool
     seat_number: str
-    qr_code: str
     movie_name: str | None
     created_at: datetime
 
+    @computed_field
+    @property
+    def qr_url(self) -> str:
+        return f"/user/bookings/{self.uuid}/qr"
+
     class Config:
         from_attributes = True
+
+
+class HoldResponse(BaseModel):
+    id: str
+    Movies_id: int
+    ticket_slot: str
+    ticket_type: str
+    tickets_booked: int
+    seat_number: str
+    expires_at: datetime
+
+
+class BookingBatchCreate(BaseModel):
+    items: List[BookingCreate] = Field(min_length=1, max_length=1000)
+
+
+class BookingBatchItemResult(BaseModel):
+    index: int
+    status_code: int
+    booking: Optional[BookingResponse] = None
+    detail: Optional[str] = None
+
+
+class BookingBatchResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BookingBatchItemResult]
+
+
+class WaitingRoomOpen(BaseModel):
+    admit_per_second: float = Field(gt=0)
+
+
+class WaitingRoomResponse(BaseModel):
+    Movies_id: int
+    admit_per_second: float
+    open: bool
+    waiting: int
+
+
+class QueueTicketResponse(BaseModel):
+    id: str
+    Movies_id: int
+    ticket_slot: str
+    status: Literal["waiting", "admitted", "booked", "failed"]
+    position: int
+    estimated_wait: float
+    status_code: Optional[int] = None
+    booking: Optional[BookingResponse] = None
+    detail: Optional[str] = None
@@ -0,0 +1,347 @@
+"""Movie search backed by an SQLite FTS5 index over title and genre.
+
+``movies_fts`` holds one row per movie, with ``rowid`` equal to ``movies.id``.
+The admin movie routes keep it in step inside their own transactions.
+Queries are built from the user's words:
+
+* the last word is matched as a prefix, for search-as-you-type;
+* words that are not in the index are widened to indexed terms within a small
+  edit distance, using a SymSpell-style index of deletions built from the
+  FTS5 vocabulary;
+* results are ranked by bm25, with title matches weighted over genre.
+
+Databases without FTS5 (e.g. PostgreSQL) fall back to ``ILIKE``.
+"""
+import asyncio
+import bisect
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Iterable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import column, false, func, literal_column, select, table, text
+from sqlalchemy.exc import OperationalError
+
+import models
+from database import AsyncSessionLocal, env_flag
+
+SEARCH_FTS = env_flag("SEARCH_FTS", True)
+# Seconds before the typo index is rebuilt from the FTS vocabulary, which picks
+# up movies added by other server processes
+SEARCH_VOCAB_TTL = float(os.getenv("SEARCH_VOCAB_TTL", "300"))
+# Maximum number of indexed terms a misspelt word is widened to
+SEARCH_MAX_CORRECTIONS = 5
+# bm25 scores every match before sorting, so very broad searches such as the
+# first letters typed are listed newest first instead of by relevance
+SEARCH_RANK_LIMIT = int(os.getenv("SEARCH_RANK_LIMIT", "2000"))
+# Title matches count ten times as much as genre matches
+TITLE_WEIGHT, GENRE_WEIGHT = 10.0, 1.0
+# Only the start of each term goes into the deletion index, as in SymSpell;
+# corrections are still checked against the whole word
+TYPO_PREFIX_LENGTH = 7
+
+movies_fts = table("movies_fts", column("rowid"), column("title"), column("genre"))
+
+CREATE_STATEMENTS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5("
+    "title, genre, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts_terms USING fts5vocab(movies_fts, 'row')",
+]
+REBUILD_STATEMENTS = [
+    "DELETE FROM movies_fts",
+    "INSERT INTO movies_fts (rowid, title, genre) SELECT id, title, genre FROM movies",
+]
+DROP_STATEMENTS = [
+    "DROP TABLE IF EXISTS movies_fts_terms",
+    "DROP TABLE IF EXISTS movies_fts",
+]
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def tokenize(value: str) -> list[str]:
+    """Split text the way FTS5's ``unicode61`` tokenizer does."""
+    value = unicodedata.normalize("NFKD", value.lower())
+    value = "".join(char for char in value if not unicodedata.combining(char))
+    return _WORD.findall(value)
+
+
+def max_distance(term: str) -> int:
+    if len(term) >= 8:
+        return 2
+    if len(term) >= 4:
+        return 1
+    return 0
+
+
+def _deletes(term: str, distance: int) -> set[str]:
+    term = term[:TYPO_PREFIX_LENGTH]
+    found = {term}
+    edge = {term}
+    for _ in range(distance):
+        edge = {word[:i] + word[i + 1:] for word in edge for i in range(len(word))}
+        found |= edge
+    return found
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Damerau-Levenshtein distance, or ``limit + 1`` once it is exceeded."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    # Cheap lower bound: characters of one word missing from the other
+    missing_a, missing_b = Counter(a), Counter(b)
+    missing_a.subtract(b)
+    missing_b.subtract(a)
+    if max(sum(n for n in missing_a.values() if n > 0), sum(n for n in missing_b.values() if n > 0)) > limit:
+        return limit + 1
+    # Only cells within ``limit`` of the diagonal can stay under the limit
+    over = limit + 1
+    previous2, previous = None, [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [i if i <= limit else over] + [over] * len(b)
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            cost = a[i - 1] != b[j - 1]
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = min(value, over)
+        if min(current) > limit:
+            return over
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class TypoIndex:
+    """Indexed terms plus the SymSpell deletion index used to correct typos."""
+
+    def __init__(self):
+        self._terms: set[str] = set()
+        self._sorted: list[str] = []
+        self._deletes: dict[str, set[str]] = defaultdict(set)
+        self._corrections: dict[str, list[str]] = {}
+        self._loaded_at: Optional[float] = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > SEARCH_VOCAB_TTL
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    def load(self, terms: Iterable[str]) -> None:
+        deletes = defaultdict(set)
+        terms = set(terms)
+        for term in terms:
+            for variant in _deletes(term, max_distance(term)):
+                deletes[variant].add(term)
+        with self._lock:
+            self._terms, self._deletes = terms, deletes
+            self._sorted = sorted(terms)
+            self._corrections = {}
+            self._loaded_at = time.monotonic()
+
+    def add(self, text_value: str) -> None:
+        if self._loaded_at is None:
+            return
+        with self._lock:
+            for term in tokenize(text_value):
+                if term in self._terms:
+                    continue
+                self._corrections = {}
+                self._terms.add(term)
+                bisect.insort(self._sorted, term)
+                for variant in _deletes(term, max_distance(term)):
+                    self._deletes[variant].add(term)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._terms
+
+    def has_prefix(self, prefix: str) -> bool:
+        i = bisect.bisect_left(self._sorted, prefix)
+        return i < len(self._sorted) and self._sorted[i].startswith(prefix)
+
+    def corrections(self, word: str) -> list[str]:
+        """Indexed terms within the allowed edit distance of ``word``, closest first."""
+        # Earlier words are corrected again on every keystroke
+        cached = self._corrections.get(word)
+        if cached is not None:
+            return cached
+        limit = max_distance(word)
+        if not limit:
+            return []
+        candidates = set()
+        for variant in _deletes(word, limit):
+            candidates |= self._deletes.get(variant, set())
+        scored = []
+        for term in candidates:
+            distance = edit_distance(word, term, limit)
+            if distance <= limit:
+                scored.append((distance, term))
+        scored.sort()
+        found = [term for _, term in scored[:SEARCH_MAX_CORRECTIONS]]
+        if len(self._corrections) >= 10000:
+            self._corrections = {}
+        self._corrections[word] = found
+        return found
+
+
+typo_index = TypoIndex()
+_fts_available: Optional[bool] = None
+
+
+def fts_enabled() -> bool:
+    return bool(SEARCH_FTS and _fts_available)
+
+
+def ensure_index(engine) -> None:
+    """Create the FTS tables if needed and fill them when they are new.
+
+    Called once at startup with the blocking engine, next to ``create_all``.
+    """
+    global _fts_available
+    if not SEARCH_FTS or engine.dialect.name != "sqlite":
+        _fts_available = False
+        return
+    try:
+        with engine.begin() as conn:
+            exists = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'movies_fts'"
+            )).first()
+            for statement in CREATE_STATEMENTS:
+                conn.execute(text(statement))
+            if not exists:
+                for statement in REBUILD_STATEMENTS:
+                    conn.execute(text(statement))
+            typo_index.load(conn.execute(text("SELECT term FROM movies_fts_terms")).scalars())
+    except OperationalError:
+        # SQLite built without FTS5
+        _fts_available = False
+        return
+    _fts_available = True
+
+
+def rebuild_index(conn) -> None:
+    """Re-read every movie into the FTS table, e.g. after a bulk load."""
+    for statement in REBUILD_STATEMENTS:
+        conn.execute(text(statement))
+    typo_index.invalidate()
+
+
+async def index_movie(db, movie: models.Movies) -> None:
+    """Stage the FTS row for ``movie``; the caller commits."""
+    await index_movies(db, [(movie.id, movie.title, movie.genre)])
+
+
+async def index_movies(db, movies: list[tuple[int, str, str]]) -> None:
+    """Stage FTS rows for ``(id, title, genre)`` tuples; the caller commits."""
+    if not fts_enabled() or not movies:
+        return
+    await db.execute(
+        text("DELETE FROM movies_fts WHERE rowid = :id"),
+        [{"id": movie_id} for movie_id, _, _ in movies],
+    )
+    await db.execute(
+        text("INSERT INTO movies_fts (rowid, title, genre) VALUES (:id, :title, :genre)"),
+        [{"id": movie_id, "title": title, "genre": genre} for movie_id, title, genre in movies],
+    )
+    for _, title, genre in movies:
+        typo_index.add(f"{title} {genre}")
+
+
+async def unindex_movie(db, movie_id: int) -> None:
+    if not fts_enabled():
+        return
+    await db.execute(text("DELETE FROM movies_fts WHERE rowid = :id"), {"id": movie_id})
+
+
+async def _load_terms(db) -> None:
+    terms = (await db.execute(text("SELECT term FROM movies_fts_terms"))).scalars().all()
+    await run_in_threadpool(typo_index.load, terms)
+
+
+async def _refresh_terms() -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            await _load_terms(db)
+    finally:
+        typo_index._refreshing = False
+
+
+async def _typo_index(db) -> TypoIndex:
+    if typo_index._loaded_at is None:
+        await _load_terms(db)
+    elif typo_index.is_stale() and not typo_index._refreshing:
+        # Keep answering from the current terms while they are reloaded
+        typo_index._refreshing = True
+        asyncio.create_task(_refresh_terms())
+    return typo_index
+
+
+def _quote(term: str) -> str:
+    return '"' + term + '"'
+
+
+async def match_expression(db, search: str) -> Optional[str]:
+    """Turn what the user typed into an FTS5 query, or None if nothing is searchable."""
+    words = tokenize(search)
+    if not words:
+        return None
+    index = await _typo_index(db)
+    groups = []
+    for position, word in enumerate(words):
+        last = position == len(words) - 1
+        if last and len(word) == 1 and len(words) > 1:
+            # A single trailing letter barely narrows the results
+            break
+        if last and index.has_prefix(word):
+            groups.append(_quote(word) + "*")
+            continue
+        if not last and word in index:
+            groups.append(_quote(word))
+            continue
+        options = [_quote(word) + ("*" if last else "")]
+        options += [_quote(term) for term in index.corrections(word)]
+        groups.append("(" + " OR ".join(options) + ")")
+    return " AND ".join(groups)
+
+
+def _match_clause(match: str):
+    return text("movies_fts MATCH :match").bindparams(match=match)
+
+
+async def count_matches(db, match: str) -> int:
+    return await db.scalar(select(func.count()).select_from(movies_fts).where(_match_clause(match)))
+
+
+def apply_search(query, match: str, ranked: bool = True):
+    """Restrict a ``select(models.Movies)`` to FTS matches, best first."""
+    query = query.join(movies_fts, movies_fts.c.rowid == models.Movies.id).where(_match_clause(match))
+    if not ranked:
+        # FTS5 returns rowid order natively, so LIMIT stops early
+        return query.order_by(movies_fts.c.rowid.desc())
+    rank = func.bm25(literal_column("movies_fts"), TITLE_WEIGHT, GENRE_WEIGHT)
+    return query.order_by(rank, models.Movies.rating.desc())
+
+
+def apply_ilike(query, search: str):
+    return query.where(models.Movies.title.ilike(f"%{search}%"))
+
+
+async def search_movies(db, query, search: str):
+    """Filter ``query`` by ``search`` with the best method the database has.
+
+    Returns the query and the number of movies matching ``search`` alone, or
+    None when that is not known without running the query.
+    """
+    if not fts_enabled():
+        return apply_ilike(query, search), None
+    match = await match_expression(db, search)
+    if match is None:
+        return query.where(false()), 0
+    matches = await count_matches(db, match)
+    return apply_search(query, match, ranked=matches <= SEARCH_RANK_LIMIT), matches
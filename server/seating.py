@@ -0,0 +1,340 @@
+"""Seat inventory for every (movie, slot) show.
+
+Each show has ROWS x SEATS_PER_ROW seats. In memory a show is a single
+240-bit integer where bit ``row * SEATS_PER_ROW + (number - 1)`` is set when
+the seat is taken, so finding and reserving seats is a handful of bit
+operations instead of a scan over ``bookings``.
+
+The bitmap is persisted in ``show_seats`` as one 30-bit mask per row. Rows are
+updated with ``taken = taken | bits`` guarded by ``taken & bits = 0``, which
+keeps the table correct even if several server processes share it.
+
+Seats on hold (see holds.py) are a second in-memory mask per show. They are
+skipped by ``reserve`` like taken seats but never written to ``show_seats``
+until the hold is confirmed.
+"""
+import threading
+
+from sqlalchemy import select, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+
+ROWS = "ABCDEFGH"
+SEATS_PER_ROW = 30
+CAPACITY = len(ROWS) * SEATS_PER_ROW
+ROW_MASK = (1 << SEATS_PER_ROW) - 1
+
+# Middle rows first, front row last
+BEST_ROW_ORDER = [ROWS.index(row) for row in "EFDGCHBA"]
+
+PERSIST_RETRIES = 3
+
+
+class SeatsUnavailable(Exception):
+    """Raised when a show does not have enough free seats left."""
+
+
+def seat_labels(mask: int) -> list[str]:
+    labels = []
+    for row, bits in row_masks(mask):
+        while bits:
+            low = bits & -bits
+            labels.append(f"{ROWS[row]}{low.bit_length()}")
+            bits ^= low
+    return labels
+
+
+def parse_seats(seat_number: str) -> int:
+    """Turn a stored ``seat_number`` such as ``"E14,E15"`` back into a mask.
+
+    Labels that do not fit the seat map are ignored.
+    """
+    mask = 0
+    for label in seat_number.split(","):
+        label = label.strip().upper()
+        if len(label) < 2 or label[0] not in ROWS or not label[1:].isdigit():
+            continue
+        number = int(label[1:])
+        if 1 <= number <= SEATS_PER_ROW:
+            mask |= 1 << (ROWS.index(label[0]) * SEATS_PER_ROW + number - 1)
+    return mask
+
+
+def row_masks(mask: int):
+    """Yield ``(row, bits)`` for every row that has at least one bit in ``mask``."""
+    for row in range(len(ROWS)):
+        bits = (mask >> (row * SEATS_PER_ROW)) & ROW_MASK
+        if bits:
+            yield row, bits
+
+
+def _center_order(positions: int, width: int) -> list[int]:
+    """Bit positions set in ``positions`` ordered by distance from the row center."""
+    center = (SEATS_PER_ROW - width) / 2
+    found = []
+    while positions:
+        low = positions & -positions
+        found.append(low.bit_length() - 1)
+        positions ^= low
+    return sorted(found, key=lambda pos: abs(pos - center))
+
+
+def best_available(taken: int, count: int) -> int:
+    """Pick ``count`` free seats, preferring one contiguous block in a good row.
+
+    Returns the mask of chosen seats, or 0 if the show cannot fit ``count``.
+    """
+    if count < 1 or CAPACITY - taken.bit_count() < count:
+        return 0
+
+    if count <= SEATS_PER_ROW:
+        block = (1 << count) - 1
+        for row in BEST_ROW_ORDER:
+            free = ~(taken >> (row * SEATS_PER_ROW)) & ROW_MASK
+            # Bit i of starts is set when seats i .. i+count-1 are all free
+            starts = free
+            for shift in range(1, count):
+                starts &= free >> shift
+            if starts:
+                start = _center_order(starts, count)[0]
+                return block << (row * SEATS_PER_ROW + start)
+
+    # No single row can seat the whole group, so fill the best seats left
+    chosen = 0
+    for row in BEST_ROW_ORDER:
+        free = ~(taken >> (row * SEATS_PER_ROW)) & ROW_MASK
+        for pos in _center_order(free, 1):
+            chosen |= 1 << (row * SEATS_PER_ROW + pos)
+            count -= 1
+            if not count:
+                return chosen
+    return 0
+
+
+class SeatInventory:
+    """Process-wide cache of show bitmaps with atomic reserve and release."""
+
+    def __init__(self):
+        self._shows: dict[tuple[int, str], int] = {}
+        self._held: dict[tuple[int, str], int] = {}
+        self._lock = threading.Lock()
+
+    def is_loaded(self, movie_id: int, slot: str) -> bool:
+        return (movie_id, slot) in self._shows
+
+    def load(self, movie_id: int, slot: str, taken: int) -> None:
+        with self._lock:
+            self._shows.setdefault((movie_id, slot), taken)
+
+    def forget(self, movie_id: int, slot: str) -> None:
+        with self._lock:
+            self._shows.pop((movie_id, slot), None)
+
+    def available(self, movie_id: int, slot: str) -> int:
+        key = (movie_id, slot)
+        return CAPACITY - (self._shows.get(key, 0) | self._held.get(key, 0)).bit_count()
+
+    def reserve(self, movie_id: int, slot: str, count: int) -> int:
+        with self._lock:
+            key = (movie_id, slot)
+            taken = self._shows[key]
+            chosen = best_available(taken | self._held.get(key, 0), count)
+            if chosen:
+                self._shows[key] = taken | chosen
+            return chosen
+
+    def hold(self, movie_id: int, slot: str, count: int) -> int:
+        """Set ``count`` free seats aside without taking them; 0 if they do not fit."""
+        with self._lock:
+            key = (movie_id, slot)
+            held = self._held.get(key, 0)
+            chosen = best_available(self._shows[key] | held, count)
+            if chosen:
+                self._held[key] = held | chosen
+            return chosen
+
+    def unhold(self, movie_id: int, slot: str, mask: int) -> None:
+        with self._lock:
+            key = (movie_id, slot)
+            held = self._held.get(key, 0) & ~mask
+            if held:
+                self._held[key] = held
+            else:
+                self._held.pop(key, None)
+
+    def take_held(self, movie_id: int, slot: str, mask: int) -> None:
+        """Turn held seats into taken ones once they are written to the database."""
+        with self._lock:
+            key = (movie_id, slot)
+            held = self._held.get(key, 0) & ~mask
+            if held:
+                self._held[key] = held
+            else:
+                self._held.pop(key, None)
+            if key in self._shows:
+                self._shows[key] |= mask
+
+    def release(self, movie_id: int, slot: str, mask: int) -> None:
+        with self._lock:
+            key = (movie_id, slot)
+            if key in self._shows:
+                self._shows[key] &= ~mask
+
+
+seat_inventory = SeatInventory()
+
+
+def _insert_ignore(db: AsyncSession):
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(models.ShowSeats).on_conflict_do_nothing()
+
+
+def show_seat_numbers(movie_id: int, slot: str):
+    """Select of the ``seat_number`` of every active booking of a show."""
+    return select(models.Bookings.seat_number).where(
+        models.Bookings.Movies_id == movie_id,
+        models.Bookings.ticket_slot == slot,
+        models.Bookings.Status == True,
+    )
+
+
+async def _read_show(db: AsyncSession, movie_id: int, slot: str):
+    result = await db.execute(
+        select(models.ShowSeats.row, models.ShowSeats.taken).where(
+            models.ShowSeats.Movies_id == movie_id,
+            models.ShowSeats.ticket_slot == slot,
+        )
+    )
+    rows = result.all()
+    if not rows:
+        return None
+    taken = 0
+    for row, bits in rows:
+        taken |= bits << (row * SEATS_PER_ROW)
+    return taken
+
+
+async def _load_show(db: AsyncSession, movie_id: int, slot: str) -> int:
+    taken = await _read_show(db, movie_id, slot)
+    if taken is not None:
+        return taken
+
+    # First booking for this show: seed the seat map from existing bookings
+    taken = 0
+    for (seat_number,) in await db.execute(show_seat_numbers(movie_id, slot)):
+        taken |= parse_seats(seat_number)
+
+    await db.execute(
+        _insert_ignore(db),
+        [
+            {
+                "Movies_id": movie_id,
+                "ticket_slot": slot,
+                "row": row,
+                "taken": (taken >> (row * SEATS_PER_ROW)) & ROW_MASK,
+            }
+            for row in range(len(ROWS))
+        ],
+    )
+    # Read back in case another process seeded the map first
+    return await _read_show(db, movie_id, slot)
+
+
+async def _update_row(db: AsyncSession, movie_id: int, slot: str, row: int, condition, value) -> bool:
+    result = await db.execute(
+        update(models.ShowSeats)
+        .where(
+            models.ShowSeats.Movies_id == movie_id,
+            models.ShowSeats.ticket_slot == slot,
+            models.ShowSeats.row == row,
+            condition,
+        )
+        .values(taken=value)
+    )
+    return result.rowcount == 1
+
+
+async def _give_back(db: AsyncSession, movie_id: int, slot: str, mask: int) -> None:
+    for row, bits in row_masks(mask):
+        await _update_row(
+            db, movie_id, slot, row, true(), models.ShowSeats.taken.op("&")(~bits)
+        )
+
+
+async def _take(db: AsyncSession, movie_id: int, slot: str, mask: int) -> bool:
+    done = 0
+    for row, bits in row_masks(mask):
+        free = models.ShowSeats.taken.op("&")(bits) == 0
+        if not await _update_row(
+            db, movie_id, slot, row, free, models.ShowSeats.taken.op("|")(bits)
+        ):
+            await _give_back(db, movie_id, slot, done)
+            return False
+        done |= bits << (row * SEATS_PER_ROW)
+    return True
+
+
+async def load_show(db: AsyncSession, movie_id: int, slot: str) -> None:
+    """Make sure the seat map of a show is in memory; the caller commits."""
+    if not seat_inventory.is_loaded(movie_id, slot):
+        seat_inventory.load(movie_id, slot, await _load_show(db, movie_id, slot))
+
+
+async def reserve_seats(db: AsyncSession, movie_id: int, slot: str, count: int) -> int:
+    """Reserve ``count`` seats for a show and stage the change on ``db``.
+
+    The caller commits. If the commit fails the seats must be handed back with
+    ``seat_inventory.release``.
+    """
+    chosen = (await reserve_seat_groups(db, movie_id, slot, [count]))[0]
+    if not chosen:
+        raise SeatsUnavailable()
+    return chosen
+
+
+async def reserve_seat_groups(db: AsyncSession, movie_id: int, slot: str, counts: list[int]) -> list[int]:
+    """Reserve several groups of seats for one show with a single write per row.
+
+    Returns one mask per entry of ``counts``, 0 for groups that did not fit.
+    """
+    for _ in range(PERSIST_RETRIES):
+        await load_show(db, movie_id, slot)
+
+        chosen = [seat_inventory.reserve(movie_id, slot, count) for count in counts]
+        union = 0
+        for mask in chosen:
+            union |= mask
+        if await _take(db, movie_id, slot, union):
+            return chosen
+
+        # Another process sold some of these seats, reload and try again
+        seat_inventory.forget(movie_id, slot)
+
+    raise SeatsUnavailable()
+
+
+async def release_seats(db: AsyncSession, movie_id: int, slot: str, mask: int) -> None:
+    """Give seats back to a show, e.g. when a booking is cancelled."""
+    if not mask:
+        return
+    await load_show(db, movie_id, slot)
+    await _give_back(db, movie_id, slot, mask)
+    seat_inventory.release(movie_id, slot, mask)
+
+
+async def take_held_seats(db: AsyncSession, movie_id: int, slot: str, mask: int) -> None:
+    """Write seats held with ``seat_inventory.hold`` to the show; the caller commits.
+
+    Raises ``SeatsUnavailable`` if another process sold one of them meanwhile,
+    in which case the seats are still held. If the commit fails the seats must
+    be handed back with ``seat_inventory.release``.
+    """
+    await load_show(db, movie_id, slot)
+    if not await _take(db, movie_id, slot, mask):
+        seat_inventory.forget(movie_id, slot)
+        raise SeatsUnavailable()
+    seat_inventory.take_held(movie_id, slot, mask)
@@ -0,0 +1,358 @@
+"""Fill an empty database with a large, skewed, reproducible dataset.
+
+Generates users, movies and bookings with the shapes that matter for
+performance work:
+
+- Movie popularity follows a Zipf curve, and the set of hot movies moves on
+  every 30 days, like new releases taking over.
+- Users follow a flatter Zipf curve, so a few heavy users have long
+  histories and most have a handful of bookings.
+- Evening slots sell best, weekends more than weekdays, and bookings are
+  made mostly in the afternoon and evening.
+- Every show holds ``seating.CAPACITY`` seats. A booking for a sold-out show
+  moves to another slot of the same movie, and when the whole movie is sold
+  out it is stored cancelled. ``--cancel-rate`` of the others are cancelled
+  as well. Keep ``--movies`` above about ``--bookings / 500`` or most of the
+  hot movies' bookings end up cancelled.
+
+Bookings are written in ``created_at`` order in batches, with the indexes of
+``bookings`` dropped until the load is done. The seat maps, showtime
+counters, analytics rollups and search index are then built from them. The same ``--seed``, ``--end`` and sizes always produce the
+same rows, apart from the salt of the shared password hash.
+
+Every user's password is ``--password``. User 1 is an admin and owns every
+movie. The target is ``DATABASE_URL`` and must not have any users yet:
+
+    cd server
+    DATABASE_URL=sqlite:///./large.db python seed_data.py --users 1000000 --movies 20000 --bookings 10000000
+"""
+import argparse
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from sqlalchemy import func, insert, select, text
+
+import analytics
+import models
+import search
+from passwords import hash_password
+from seating import CAPACITY, ROWS, ROW_MASK, SEATS_PER_ROW
+from showtimes import DEFAULT_SCREEN
+
+BATCH_SIZE = 100_000
+
+GENRES = ["Action", "Drama", "Comedy", "Thriller", "Sci-Fi", "Horror", "Romance", "Animation", "Documentary", "Family"]
+SYLLABLES = ["ka", "lo", "mi", "ra", "ne", "sto", "var", "qui", "den", "tor", "bel", "ash", "ing", "ul", "or",
+             "pha", "zen", "cro", "mar", "est", "lyn", "dra", "gon", "vi", "sel"]
+
+# Share of bookings per slot in Bookings.TIME_SLOTS order
+SLOT_WEIGHTS = [0.07, 0.12, 0.21, 0.36, 0.24]
+# Tickets per booking, 1 to 6
+TICKET_WEIGHTS = [0.28, 0.40, 0.12, 0.13, 0.04, 0.03]
+TYPE_WEIGHTS = {
+    models.Bookings.TicketType.REGULAR: 0.55,
+    models.Bookings.TicketType.PREMIUM: 0.25,
+    models.Bookings.TicketType.IMAX: 0.13,
+    models.Bookings.TicketType.FOUR_DX: 0.07,
+}
+# Bookings made per hour of the day, relative
+HOUR_WEIGHTS = [1, 0.5, 0.3, 0.2, 0.2, 0.3, 0.8, 1.5, 2.5, 3, 3.5, 4, 5, 5, 4.5, 4.5, 5, 6, 7, 7.5, 7, 5.5, 3.5, 2]
+# Monday first
+WEEKDAY_WEIGHTS = [0.8, 0.75, 0.8, 0.9, 1.2, 1.6, 1.5]
+HOT_SET_DAYS = 30
+
+# Seat i of a show is bit i of its seat map, see seating.py
+SEAT_LABELS = [f"{ROWS[i // SEATS_PER_ROW]}{i % SEATS_PER_ROW + 1}" for i in range(CAPACITY)]
+
+
+def zipf_weights(count: int, exponent: float) -> list[float]:
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+def scatter(count: int, rng: random.Random):
+    """Map ranks 0..count-1 onto ids 0..count-1 without clustering the top ranks."""
+    step = rng.randrange(count // 2 or 1, count) if count > 1 else 1
+    while math.gcd(step, count) != 1:
+        step += 1
+    offset = rng.randrange(count)
+    return lambda rank: (rank * step + offset) % count
+
+
+def make_title(rng: random.Random, number: int) -> str:
+    words = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+             for _ in range(rng.randint(1, 3))]
+    # Sequels are common enough to make titles repeat with a number
+    return " ".join(words) + (f" {rng.randint(2, 4)}" if number % 9 == 0 else "")
+
+
+def day_counts(bookings: int, first_day: datetime, days: int) -> list[int]:
+    """Bookings per day, oldest first: weekly pattern on a slowly growing trend."""
+    start = first_day
+    weights = [
+        WEEKDAY_WEIGHTS[(start + timedelta(days=day)).weekday()] * (1 + day / days)
+        for day in range(days)
+    ]
+    total = sum(weights)
+    counts = [int(bookings * weight / total) for weight in weights]
+    counts[-1] += bookings - sum(counts)
+    return counts
+
+
+def insert_rows(conn, model, columns: tuple, rows: list) -> None:
+    """Insert tuples of ``columns`` values in batches of ``BATCH_SIZE``.
+
+    On SQLite the batches go straight to the driver's ``executemany``, which
+    is several times faster than a Core insert binding every row, so values
+    must already be in stored form; see ``stored_time``.
+    """
+    if conn.dialect.name == "sqlite":
+        quote = conn.dialect.identifier_preparer.quote
+        statement = (
+            f"INSERT INTO {quote(model.__tablename__)} ({', '.join(quote(column) for column in columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})"
+        )
+        for start in range(0, len(rows), BATCH_SIZE):
+            conn.exec_driver_sql(statement, rows[start:start + BATCH_SIZE])
+        return
+    for start in range(0, len(rows), BATCH_SIZE):
+        conn.execute(insert(model), [dict(zip(columns, row)) for row in rows[start:start + BATCH_SIZE]])
+
+
+def stored_time(conn, moment: datetime):
+    # The text format SQLAlchemy stores DateTime values in on SQLite
+    return moment.strftime("%Y-%m-%d %H:%M:%S.%f") if conn.dialect.name == "sqlite" else moment
+
+
+def generate_users(conn, users: int, hashed_password: str, created_at: datetime) -> None:
+    created_at = stored_time(conn, created_at)
+    insert_rows(conn, models.Users, (
+        "email", "username", "first_name", "last_name", "hashed_password", "role", "created_at",
+    ), [
+        (f"user{i}@example.com", f"user{i}", "User", str(i), hashed_password, "admin" if i == 1 else "user",
+         created_at)
+        for i in range(1, users + 1)
+    ])
+
+
+def generate_movies(conn, rng: random.Random, movies: int, created_at: datetime) -> list[str]:
+    titles = [make_title(rng, i) for i in range(1, movies + 1)]
+    created_at = stored_time(conn, created_at)
+    insert_rows(conn, models.Movies, (
+        "title", "genre", "duration", "rating", "image_url", "user_id", "created_at",
+    ), [
+        (title, rng.choice(GENRES), rng.randint(80, 200), round(rng.triangular(1, 10, 7), 1), None, 1, created_at)
+        for title in titles
+    ])
+    return titles
+
+
+BOOKING_COLUMNS = (
+    "uuid", "Movies_id", "user_id", "customer_name", "tickets_booked", "ticket_slot", "ticket_type",
+    "ticket_price", "Status", "seat_number", "qr_code", "created_at",
+)
+
+
+def generate_bookings(conn, rng: random.Random, users: int, titles: list[str], bookings: int,
+                      first_day: datetime, days: int, movie_skew: float, user_skew: float,
+                      cancel_rate: float) -> dict:
+    """Insert the bookings and return the seats sold per ``(movie id, slot)``."""
+    movies = len(titles)
+    slots = models.Bookings.TIME_SLOTS
+    types = list(TYPE_WEIGHTS)
+    prices = [models.Bookings.TICKET_PRICES[ticket_type] for ticket_type in types]
+    type_values = [ticket_type.value for ticket_type in types]
+
+    movie_weights = zipf_weights(movies, movie_skew)
+    user_weights = zipf_weights(users, user_skew)
+    movie_of_rank = scatter(movies, rng)
+    user_of_rank = scatter(users, rng)
+    # Population lists in rank order, so rng.choices returns ids directly
+    user_ids = [user_of_rank(rank) + 1 for rank in range(users)]
+    # Slot, tickets and type are independent, so one draw from their joint
+    # distribution replaces three
+    shapes = [
+        (slot_index, tickets, type_index)
+        for slot_index in range(len(slots))
+        for tickets in range(1, len(TICKET_WEIGHTS) + 1)
+        for type_index in range(len(types))
+    ]
+    shape_weights = list(accumulate(
+        SLOT_WEIGHTS[slot_index] * TICKET_WEIGHTS[tickets - 1] * TYPE_WEIGHTS[types[type_index]]
+        for slot_index, tickets, type_index in shapes
+    ))
+    spill_order = [
+        sorted((other for other in range(len(slots)) if other != slot_index), key=lambda other: -SLOT_WEIGHTS[other])
+        for slot_index in range(len(slots))
+    ]
+    hour_weights = list(accumulate(HOUR_WEIGHTS))
+    hours = range(24)
+    clock = [f"{second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}" for second in range(86400)]
+    # seat_blocks[first][count] is the seat_number of count seats from seat first on
+    seat_blocks = [
+        [",".join(SEAT_LABELS[first:first + count]) for count in range(len(TICKET_WEIGHTS) + 1)]
+        for first in range(CAPACITY)
+    ]
+
+    sqlite = conn.dialect.name == "sqlite"
+    # Seats sold per show, at movie_id * len(slots) + slot index
+    sold = [0] * ((movies + 1) * len(slots))
+    rows = []
+    movie_ids = None
+    for day, count in enumerate(day_counts(bookings, first_day, days)):
+        if day % HOT_SET_DAYS == 0:
+            # A different set of hot movies every HOT_SET_DAYS
+            shift = (day // HOT_SET_DAYS) * 7919
+            movie_ids = [movie_of_rank((rank + shift) % movies) + 1 for rank in range(movies)]
+        day_start = first_day + timedelta(days=day)
+        micros = sorted(
+            int((hour + rng.random()) * 3_600_000_000)
+            for hour in rng.choices(hours, cum_weights=hour_weights, k=count)
+        )
+        if sqlite:
+            # Formatting the stored text directly beats datetime arithmetic per row
+            prefix = day_start.strftime("%Y-%m-%d ")
+            stamps = [f"{prefix}{clock[m // 1_000_000]}.{m % 1_000_000:06d}" for m in micros]
+        else:
+            stamps = [day_start + timedelta(microseconds=m) for m in micros]
+        uuid_hex = rng.randbytes(16 * count).hex()
+
+        for i, movie_id, user_id, (slot_index, tickets, type_index), stamp in zip(
+            range(count),
+            rng.choices(movie_ids, cum_weights=movie_weights, k=count),
+            rng.choices(user_ids, cum_weights=user_weights, k=count),
+            rng.choices(shapes, cum_weights=shape_weights, k=count),
+            stamps,
+        ):
+            show = movie_id * len(slots) + slot_index
+            if sold[show] + tickets > CAPACITY:
+                # Sold out: try the other shows of the movie, busiest slot first
+                for other in spill_order[slot_index]:
+                    if sold[movie_id * len(slots) + other] + tickets <= CAPACITY:
+                        slot_index = other
+                        show = movie_id * len(slots) + other
+                        break
+            slot = slots[slot_index]
+            taken = sold[show]
+            active = taken + tickets <= CAPACITY and rng.random() >= cancel_rate
+            if active:
+                seat_number = seat_blocks[taken][tickets]
+                sold[show] = taken + tickets
+            else:
+                seat_number = seat_blocks[0][tickets]
+
+            h = uuid_hex[32 * i:32 * i + 32]
+            rows.append((
+                # Random version 4 UUID
+                f"{h[:8]}-{h[8:12]}-4{h[13:16]}-a{h[17:20]}-{h[20:]}",
+                movie_id,
+                user_id,
+                f"user{user_id}",
+                tickets,
+                slot,
+                type_values[type_index],
+                prices[type_index] * tickets,
+                active,
+                seat_number,
+                f"Movie: {titles[movie_id - 1]}, Seat: {seat_number}, Slot: {slot}, Name: user{user_id}",
+                stamp,
+            ))
+
+        if len(rows) >= BATCH_SIZE:
+            insert_rows(conn, models.Bookings, BOOKING_COLUMNS, rows)
+            rows = []
+    insert_rows(conn, models.Bookings, BOOKING_COLUMNS, rows)
+    return {
+        (show // len(slots), slots[show % len(slots)]): taken
+        for show, taken in enumerate(sold)
+        if taken
+    }
+
+
+def generate_shows(conn, movies: int, sold: dict) -> None:
+    """Showtimes with their sold counters, and seat maps for every show with sales."""
+    conn.execute(insert(models.Screens), [{"name": DEFAULT_SCREEN, "capacity": CAPACITY}])
+    screen_id = conn.scalar(select(models.Screens.id).where(models.Screens.name == DEFAULT_SCREEN))
+    insert_rows(conn, models.Showtimes, ("Movies_id", "screen_id", "ticket_slot", "capacity", "seats_sold"), [
+        (movie_id, screen_id, slot, CAPACITY, sold.get((movie_id, slot), 0))
+        for movie_id in range(1, movies + 1)
+        for slot in models.Bookings.TIME_SLOTS
+    ])
+    # Seats are handed out in bit order, so a show's map is its lowest ``taken`` bits
+    insert_rows(conn, models.ShowSeats, ("Movies_id", "ticket_slot", "row", "taken"), [
+        (movie_id, slot, row, (((1 << taken) - 1) >> (row * SEATS_PER_ROW)) & ROW_MASK)
+        for (movie_id, slot), taken in sorted(sold.items())
+        for row in range(len(ROWS))
+    ])
+
+
+def drop_booking_indexes(conn) -> None:
+    for index in models.Bookings.__table__.indexes:
+        index.drop(conn)
+
+
+def create_booking_indexes(conn) -> None:
+    for index in models.Bookings.__table__.indexes:
+        index.create(conn)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fill an empty database with a large synthetic dataset.")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--movies", type=int, default=5_000)
+    parser.add_argument("--bookings", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365, help="history length")
+    parser.add_argument("--end", type=datetime.fromisoformat, default=datetime(2026, 1, 1),
+                        help="day after the last booking, YYYY-MM-DD")
+    parser.add_argument("--movie-skew", type=float, default=1.1, help="Zipf exponent of movie popularity")
+    parser.add_argument("--user-skew", type=float, default=0.8, help="Zipf exponent of bookings per user")
+    parser.add_argument("--cancel-rate", type=float, default=0.04)
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from database import IS_SQLITE, engine
+
+    models.Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        if conn.scalar(select(func.count()).select_from(models.Users)):
+            parser.error("the database already has users; point DATABASE_URL at an empty one")
+
+    rng = random.Random(args.seed)
+    # One hash for everyone: bcrypt per user would take hours
+    hashed_password = hash_password(args.password)
+    timings = {}
+
+    def step(name, fn, *fn_args):
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            if IS_SQLITE:
+                # A crash mid-load means starting over anyway
+                conn.execute(text("PRAGMA synchronous=OFF"))
+            result = fn(conn, *fn_args)
+        timings[name] = round(time.perf_counter() - started, 1)
+        print(f"{name}: {timings[name]}s")
+        return result
+
+    first_day = args.end - timedelta(days=args.days)
+    step("users", generate_users, args.users, hashed_password, first_day)
+    titles = step("movies", generate_movies, rng, args.movies, first_day)
+    step("drop indexes", drop_booking_indexes)
+    sold = step("bookings", generate_bookings, rng, args.users, titles, args.bookings, first_day, args.days,
+                args.movie_skew, args.user_skew, args.cancel_rate)
+    step("indexes", create_booking_indexes)
+    step("shows", generate_shows, args.movies, sold)
+    step("analytics", analytics.rebuild)
+
+    search.ensure_index(engine)
+    if search.fts_enabled():
+        step("search index", search.rebuild_index)
+    if IS_SQLITE:
+        step("analyze", lambda conn: conn.execute(text("ANALYZE")))
+    print(f"total: {sum(timings.values()):.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Showtimes and their sold-seat counters.
+
+Every (movie, slot) show has a ``showtimes`` row on a screen. ``seats_sold`` is
+kept up to date by the booking routes inside the same transaction as the
+booking itself, with ``seats_sold + n <= capacity`` as the guard, so
+availability is read from one row per show instead of summing bookings.
+
+Shows are created on the default screen for every slot in
+``Bookings.TIME_SLOTS`` when a movie is added, or the first time they are
+needed. The counter of a new show starts from the bookings it already has.
+"""
+from typing import Iterable
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from seating import CAPACITY
+
+DEFAULT_SCREEN = "Screen 1"
+
+
+def _insert_ignore(db: AsyncSession, model):
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model).on_conflict_do_nothing()
+
+
+async def default_screen(db: AsyncSession) -> models.Screens:
+    query = select(models.Screens).where(models.Screens.name == DEFAULT_SCREEN)
+    screen = (await db.execute(query)).scalars().first()
+    if screen is None:
+        await db.execute(_insert_ignore(db, models.Screens), [{"name": DEFAULT_SCREEN, "capacity": CAPACITY}])
+        screen = (await db.execute(query)).scalars().one()
+    return screen
+
+
+def sold_by_bookings(movie_id: int, slots: list[str]):
+    """Select of (slot, seats sold) of a movie's active bookings in ``slots``."""
+    return (
+        select(models.Bookings.ticket_slot, func.sum(models.Bookings.tickets_booked))
+        .where(
+            models.Bookings.Movies_id == movie_id,
+            models.Bookings.ticket_slot.in_(slots),
+            models.Bookings.Status == True,
+        )
+        .group_by(models.Bookings.ticket_slot)
+    )
+
+
+async def ensure_showtimes(db: AsyncSession, movie_id: int, slots: Iterable[str] = None) -> None:
+    """Create the shows of ``movie_id`` that do not exist yet; the caller commits."""
+    slots = list(slots or models.Bookings.TIME_SLOTS)
+    existing = set((await db.execute(
+        select(models.Showtimes.ticket_slot).where(
+            models.Showtimes.Movies_id == movie_id,
+            models.Showtimes.ticket_slot.in_(slots),
+        )
+    )).scalars())
+    missing = [slot for slot in slots if slot not in existing]
+    if not missing:
+        return
+
+    sold = dict((await db.execute(sold_by_bookings(movie_id, missing))).all())
+    screen = await default_screen(db)
+    await db.execute(
+        _insert_ignore(db, models.Showtimes),
+        [
+            {
+                "Movies_id": movie_id,
+                "screen_id": screen.id,
+                "ticket_slot": slot,
+                "capacity": screen.capacity,
+                "seats_sold": sold.get(slot) or 0,
+            }
+            for slot in missing
+        ],
+    )
+
+
+async def add_showtimes(db: AsyncSession, movie_ids: Iterable[int]) -> None:
+    """Create every show of movies that were just added and have no bookings yet."""
+    movie_ids = list(movie_ids)
+    if not movie_ids:
+        return
+    screen = await default_screen(db)
+    await db.execute(
+        _insert_ignore(db, models.Showtimes),
+        [
+            {
+                "Movies_id": movie_id,
+                "screen_id": screen.id,
+                "ticket_slot": slot,
+                "capacity": screen.capacity,
+                "seats_sold": 0,
+            }
+            for movie_id in movie_ids
+            for slot in models.Bookings.TIME_SLOTS
+        ],
+    )
+
+
+async def _add_sold(db: AsyncSession, movie_id: int, slot: str, count: int) -> bool:
+    sold = models.Showtimes.seats_sold
+    guard = sold + count <= models.Showtimes.capacity if count > 0 else sold + count >= 0
+    result = await db.execute(
+        update(models.Showtimes)
+        .where(
+            models.Showtimes.Movies_id == movie_id,
+            models.Showtimes.ticket_slot == slot,
+            guard,
+        )
+        .values(seats_sold=sold + count)
+    )
+    return result.rowcount == 1
+
+
+async def sell(db: AsyncSession, movie_id: int, slot: str, count: int) -> bool:
+    """Count ``count`` more seats as sold; False if the show does not have them."""
+    if await _add_sold(db, movie_id, slot, count):
+        return True
+    await ensure_showtimes(db, movie_id, [slot])
+    return await _add_sold(db, movie_id, slot, count)
+
+
+async def unsell(db: AsyncSession, movie_id: int, slot: str, count: int) -> None:
+    """Give ``count`` seats back; call while the booking still counts as active."""
+    if not await _add_sold(db, movie_id, slot, -count):
+        await ensure_showtimes(db, movie_id, [slot])
+        await _add_sold(db, movie_id, slot, -count)
+
+
+async def movie_showtimes(db: AsyncSession, movie_id: int):
+    query = (
+        select(
+            models.Showtimes.id,
+            models.Showtimes.Movies_id,
+            models.Showtimes.ticket_slot,
+            models.Showtimes.screen_id,
+            models.Screens.name.label("screen_name"),
+            models.Showtimes.capacity,
+            models.Showtimes.seats_sold,
+        )
+        .join(models.Screens, models.Screens.id == models.Showtimes.screen_id)
+        .where(models.Showtimes.Movies_id == movie_id)
+        .order_by(models.Showtimes.ticket_slot)
+    )
+    return (await db.execute(query)).all()
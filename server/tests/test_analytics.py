@@ -0,0 +1,142 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import analytics
+import models
+import schemas
+import seating
+from qr_renderer import qr_renderer
+from routes import bookings
+from routes.analytics import read_analytics
+
+ADMIN = {"user_id": 1, "username": "admin", "role": "admin"}
+USER = {"user_id": 2, "username": "user2", "role": "user"}
+PLUS_TWO = timezone(timedelta(hours=2))
+
+
+def booking(created_at: datetime, **values) -> dict:
+    return {
+        "created_at": created_at, "Movies_id": 1, "ticket_slot": "18:00-21:00", "ticket_type": "Regular",
+        "tickets_booked": 2, "ticket_price": 500, **values,
+    }
+
+
+def test_start_with_an_offset_is_read_as_utc(session_factory):
+    booked_at = datetime.utcnow() - timedelta(hours=1)
+
+    async def scenario():
+        async with session_factory() as db:
+            await analytics.record(db, [booking(booked_at)])
+            await db.commit()
+            start = (booked_at - timedelta(hours=1)).replace(tzinfo=timezone.utc).astimezone(PLUS_TWO)
+            return await read_analytics(start=start, end=None, granularity="day", db=db, current_user=ADMIN)
+
+    summary = asyncio.run(scenario())
+    assert summary["start"].tzinfo is None
+    assert summary["start"] == booked_at - timedelta(hours=1)
+    assert summary["totals"] == {"bookings": 1, "tickets": 2, "revenue": 500}
+
+
+def test_bounds_with_offsets_cover_the_same_hours_as_utc_ones(session_factory):
+    booked_at = datetime(2026, 3, 1, 23, 30)
+
+    async def scenario():
+        async with session_factory() as db:
+            await analytics.record(db, [booking(booked_at)])
+            await db.commit()
+            # 00:00 to 01:00 at +02:00 is 22:00 to 23:00 UTC, before the booking
+            before = await read_analytics(
+                start=datetime(2026, 3, 2, 0, tzinfo=PLUS_TWO), end=datetime(2026, 3, 2, 1, tzinfo=PLUS_TWO),
+                granularity="hour", db=db, current_user=ADMIN,
+            )
+            during = await read_analytics(
+                start=datetime(2026, 3, 2, 1, tzinfo=PLUS_TWO), end=datetime(2026, 3, 2, 2, tzinfo=PLUS_TWO),
+                granularity="hour", db=db, current_user=ADMIN,
+            )
+            return before, during
+
+    before, during = asyncio.run(scenario())
+    assert before["totals"]["bookings"] == 0
+    assert during["totals"]["bookings"] == 1
+
+
+@pytest.fixture
+def booking_routes(session_factory, monkeypatch):
+    """Sessions on a database with two movies, for calling the booking routes."""
+    inventory = seating.SeatInventory()
+    monkeypatch.setattr(seating, "seat_inventory", inventory)
+    monkeypatch.setattr(bookings, "seat_inventory", inventory)
+    monkeypatch.setattr(qr_renderer, "prerender", lambda data: None)
+
+    async def add_movies():
+        async with session_factory() as db:
+            db.add_all([
+                models.Movies(id=movie_id, title=f"Movie {movie_id}", genre="Drama", duration=120, user_id=1)
+                for movie_id in (1, 2)
+            ])
+            await db.commit()
+
+    asyncio.run(add_movies())
+    return session_factory
+
+
+def order(**values) -> schemas.BookingCreate:
+    return schemas.BookingCreate(**{
+        "Movies_id": 1, "tickets_booked": 2, "ticket_slot": "18:00-21:00", "ticket_type": "Premium", **values,
+    })
+
+
+async def summary(db) -> dict:
+    now = datetime.utcnow()
+    return await analytics.summary(db, now - timedelta(days=1), now + timedelta(days=1))
+
+
+def breakdown(result: dict) -> dict:
+    return {
+        "totals": result["totals"],
+        "by_movie": {row["Movies_id"]: (row["tickets"], row["revenue"]) for row in result["by_movie"]},
+    }
+
+
+def test_rollups_follow_a_booking_through_updates_and_cancellation(booking_routes):
+    async def scenario():
+        steps = []
+        async with booking_routes() as db:
+            created = await bookings._create_booking(order(), db, USER)
+            steps.append(breakdown(await summary(db)))
+            await bookings._update_booking(created["id"], order(tickets_booked=3), db, USER)
+            steps.append(breakdown(await summary(db)))
+            await bookings._update_booking(created["id"], order(Movies_id=2, tickets_booked=1), db, USER)
+            steps.append(breakdown(await summary(db)))
+            await bookings._delete_booking(created["id"], db, USER)
+            steps.append(breakdown(await summary(db)))
+            # Cancelling again changes nothing
+            await bookings._delete_booking(created["id"], db, USER)
+            steps.append(breakdown(await summary(db)))
+        return steps
+
+    created, more_seats, moved, cancelled, again = asyncio.run(scenario())
+    assert created == {"totals": {"bookings": 1, "tickets": 2, "revenue": 700}, "by_movie": {1: (2, 700)}}
+    assert more_seats == {"totals": {"bookings": 1, "tickets": 3, "revenue": 1050}, "by_movie": {1: (3, 1050)}}
+    assert moved == {"totals": {"bookings": 1, "tickets": 1, "revenue": 350}, "by_movie": {2: (1, 350)}}
+    assert cancelled == again == {"totals": {"bookings": 0, "tickets": 0, "revenue": 0}, "by_movie": {}}
+
+
+def test_rollups_match_a_rebuild_from_bookings(booking_routes):
+    async def scenario():
+        async with booking_routes() as db:
+            kept = await bookings._create_booking(order(), db, USER)
+            dropped = await bookings._create_booking(order(Movies_id=2, ticket_type="IMAX"), db, USER)
+            await bookings._update_booking(kept["id"], order(tickets_booked=5), db, USER)
+            await bookings._delete_booking(dropped["id"], db, USER)
+            live = await summary(db)
+
+            await (await db.connection()).run_sync(analytics.rebuild)
+            await db.commit()
+            return live, await summary(db)
+
+    live, rebuilt = asyncio.run(scenario())
+    assert live["totals"] == rebuilt["totals"] == {"bookings": 1, "tickets": 5, "revenue": 1750}
+    assert live["by_ticket_type"] == rebuilt["by_ticket_type"]
@@ -0,0 +1,98 @@
+import asyncio
+import io
+
+import pytest
+from sqlalchemy import select
+from starlette.requests import Request
+
+import models
+import search as movie_search
+from catalog_import import import_movies, read_movies
+from routes import movies as movie_routes
+
+ADMIN_ID = 1
+OTHER_ADMIN_ID = 2
+
+
+@pytest.fixture
+def catalog(session_factory, monkeypatch):
+    """Sessions on a database with one movie of each admin; no FTS tables."""
+    monkeypatch.setattr(movie_search, "_fts_available", False)
+
+    async def add_movies():
+        async with session_factory() as db:
+            db.add_all([
+                models.Movies(title="Heat", genre="Crime", duration=170, rating=8.3, image_url="heat.jpg",
+                              user_id=ADMIN_ID),
+                models.Movies(title="Alien", genre="Horror", duration=117, user_id=OTHER_ADMIN_ID),
+            ])
+            await db.commit()
+
+    asyncio.run(add_movies())
+    return session_factory
+
+
+def run_import(session_factory, text: str, file_format: str = "csv") -> dict:
+    return asyncio.run(import_movies(session_factory, read_movies(io.StringIO(text), file_format), ADMIN_ID))
+
+
+def movies(session_factory) -> dict:
+    async def load():
+        async with session_factory() as db:
+            return (await db.execute(select(models.Movies))).scalars().all()
+
+    return {movie.title: movie for movie in asyncio.run(load())}
+
+
+def test_update_keeps_the_fields_the_row_leaves_out(catalog):
+    report = run_import(catalog, "title,genre,duration,rating\nHeat,Crime,171,\n")
+    assert (report["created"], report["updated"], report["failed"]) == (0, 1, 0)
+
+    heat = movies(catalog)["Heat"]
+    assert heat.duration == 171
+    assert heat.rating == 8.3
+    assert heat.image_url == "heat.jpg"
+
+
+def test_new_rows_are_added_with_their_showtimes(catalog):
+    report = run_import(catalog, '{"title": "Ronin", "genre": "Crime", "duration": 122}\n', "jsonl")
+    assert report["created"] == 1
+
+    ronin = movies(catalog)["Ronin"]
+    assert ronin.user_id == ADMIN_ID
+
+    async def slots():
+        async with catalog() as db:
+            return (await db.execute(
+                select(models.Showtimes.ticket_slot).where(models.Showtimes.Movies_id == ronin.id)
+            )).scalars().all()
+
+    assert sorted(asyncio.run(slots())) == sorted(models.Bookings.TIME_SLOTS)
+
+
+def test_bad_duplicate_and_foreign_rows_are_reported(catalog):
+    report = run_import(catalog, (
+        "title,genre,duration\n"
+        "Ronin,Crime,122\n"
+        "Ronin,Crime,125\n"
+        "Alien,Horror,118\n"
+        "Tenet,Action,long\n"
+    ))
+    assert (report["created"], report["updated"], report["duplicates"], report["failed"]) == (1, 0, 1, 2)
+    assert {error["row"] for error in report["errors"]} == {3, 4}
+    assert movies(catalog)["Alien"].duration == 117
+    assert movies(catalog)["Ronin"].duration == 122
+
+
+def test_import_route_reads_a_body_sent_in_chunks(catalog, monkeypatch):
+    monkeypatch.setattr(movie_routes, "AsyncSessionLocal", catalog)
+    chunks = [b"title,genre,dura", b"tion\nRonin,Crime,122\nHeat,Cri", b"me,171\n"]
+
+    async def receive():
+        body = chunks.pop(0)
+        return {"type": "http.request", "body": body, "more_body": bool(chunks)}
+
+    request = Request({"type": "http", "method": "POST", "headers": [(b"content-type", b"text/csv")]}, receive)
+    report = asyncio.run(movie_routes.import_movies(request, format=None, current_user={"user_id": ADMIN_ID}))
+    assert (report["created"], report["updated"], report["failed"]) == (1, 1, 0)
+    assert movies(catalog)["Heat"].duration == 171
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+import holds
+import seating
+from holds import SeatHolds, TooManyHolds
+from seating import CAPACITY, SeatInventory
+
+MOVIE = 1
+SLOT = "18:00-21:00"
+
+
+@pytest.fixture(autouse=True)
+def inventory(monkeypatch):
+    inventory = SeatInventory()
+    monkeypatch.setattr(seating, "seat_inventory", inventory)
+    monkeypatch.setattr(holds, "seat_inventory", inventory)
+    return inventory
+
+
+def test_concurrent_holds_of_one_user_stop_at_the_limit(inventory, monkeypatch):
+    async def load_show(db, movie_id, slot):
+        # Reading the seat map lets the other requests run, as the database does
+        await asyncio.sleep(0)
+        inventory.load(movie_id, slot, 0)
+
+    monkeypatch.setattr(holds, "load_show", load_show)
+    seat_holds = SeatHolds(max_per_user=2)
+
+    async def scenario():
+        return await asyncio.gather(
+            *(seat_holds.place(None, 7, MOVIE, SLOT, 2, "Regular") for _ in range(5)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(scenario())
+    placed = [result for result in results if not isinstance(result, Exception)]
+    assert len(placed) == 2
+    assert all(isinstance(result, TooManyHolds) for result in results if result not in placed)
+    # Seats of the refused holds went back
+    assert inventory.available(MOVIE, SLOT) == CAPACITY - 4
+
+
+def place(session_factory, seat_holds, *orders):
+    """Place (user, count) holds in turn; the hold or the exception of each."""
+    async def scenario():
+        results = []
+        async with session_factory() as db:
+            for user_id, count in orders:
+                try:
+                    results.append(await seat_holds.place(db, user_id, MOVIE, SLOT, count, "Regular"))
+                except Exception as error:
+                    results.append(error)
+            await db.commit()
+        return results
+
+    return asyncio.run(scenario())
+
+
+def test_held_seats_are_not_offered_again(session_factory, inventory):
+    first, second = place(session_factory, SeatHolds(), (1, 4), (2, 4))
+    assert first.seats.bit_count() == second.seats.bit_count() == 4
+    assert not first.seats & second.seats
+    assert inventory.available(MOVIE, SLOT) == CAPACITY - 8
+
+
+def test_expired_holds_give_their_seats_back(session_factory, inventory):
+    seat_holds = SeatHolds(ttl=60)
+    hold, = place(session_factory, seat_holds, (1, 4))
+
+    assert seat_holds.expire(now=hold.expires_at - 1) == 0
+    assert inventory.available(MOVIE, SLOT) == CAPACITY - 4
+    assert seat_holds.expire(now=hold.expires_at) == 1
+    assert inventory.available(MOVIE, SLOT) == CAPACITY
+    assert seat_holds.take(hold.id, 1) is None
+    assert seat_holds.stats() == {"open": 0, "expired": 1}
+
+
+def test_a_user_gets_a_hold_back_once_one_is_released(session_factory, inventory):
+    seat_holds = SeatHolds(max_per_user=2)
+    first, second, third, other = place(session_factory, seat_holds, (1, 1), (1, 1), (1, 1), (2, 1))
+    assert isinstance(third, TooManyHolds)
+    assert other.user_id == 2
+
+    assert not seat_holds.release(first.id, 2)
+    assert seat_holds.release(first.id, 1)
+    again, = place(session_factory, seat_holds, (1, 1))
+    assert again.user_id == 1
+
+
+def test_full_show_refuses_the_hold(session_factory):
+    seat_holds = SeatHolds()
+    everything, too_many = place(session_factory, seat_holds, (1, CAPACITY), (2, 1))
+    assert everything.seats.bit_count() == CAPACITY
+    assert isinstance(too_many, seating.SeatsUnavailable)
+
+
+def test_confirmed_hold_keeps_its_seats(session_factory, inventory):
+    seat_holds = SeatHolds()
+    hold, = place(session_factory, seat_holds, (1, 3))
+
+    async def confirm():
+        async with session_factory() as db:
+            taken = seat_holds.take(hold.id, 1)
+            await seating.take_held_seats(db, MOVIE, SLOT, taken.seats)
+            await db.commit()
+
+    asyncio.run(confirm())
+    assert seat_holds.stats()["open"] == 0
+    # Expiring later does not hand sold seats back
+    assert seat_holds.expire(now=hold.expires_at) == 0
+    assert inventory.available(MOVIE, SLOT) == CAPACITY - 3
@@ -0,0 +1,139 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+
+from idempotency import IdempotencyStore, fingerprint, idempotent
+
+KEY = IdempotencyStore.key(1, "POST", "/user/bookings/", "retry-1")
+
+
+def counted(result=None, error=None, pause: float = 0):
+    """A route call that counts its runs."""
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(pause)
+        if error is not None:
+            raise error
+        return result
+
+    return call, calls
+
+
+def test_repeat_gets_the_stored_response_without_running_again():
+    store = IdempotencyStore()
+    call, calls = counted({"id": 7})
+
+    async def scenario():
+        first = await store.run(KEY, fingerprint({"seats": 2}), call, status_code=201)
+        again = await store.run(KEY, fingerprint({"seats": 2}), call, status_code=201)
+        return first, again
+
+    first, again = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert first.status_code == again.status_code == 201
+    assert json.loads(again.body) == json.loads(first.body) == {"id": 7}
+    assert "idempotent-replayed" not in first.headers
+    assert again.headers["idempotent-replayed"] == "true"
+    assert store.replays == 1
+
+
+def test_repeat_while_the_first_runs_waits_for_it():
+    store = IdempotencyStore()
+    call, calls = counted({"id": 7}, pause=0.05)
+
+    async def scenario():
+        return await asyncio.gather(*(store.run(KEY, fingerprint({"seats": 2}), call) for _ in range(3)))
+
+    responses = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert {response.body for response in responses} == {b'{"id":7}'}
+    assert store.stats()["running"] == 0
+
+
+def test_key_reused_for_a_different_body_is_rejected():
+    store = IdempotencyStore()
+    call, calls = counted({"id": 7}, pause=0.05)
+
+    async def scenario():
+        running = asyncio.ensure_future(store.run(KEY, fingerprint({"seats": 2}), call))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as while_running:
+            await store.run(KEY, fingerprint({"seats": 3}), call)
+        await running
+        with pytest.raises(HTTPException) as after:
+            await store.run(KEY, fingerprint({"seats": 3}), call)
+        return while_running.value, after.value
+
+    while_running, after = asyncio.run(scenario())
+    assert while_running.status_code == after.status_code == 422
+    assert len(calls) == 1
+
+
+def test_client_errors_are_replayed_and_server_errors_run_again():
+    store = IdempotencyStore()
+    conflict, conflict_calls = counted(error=HTTPException(status_code=409, detail="Not enough seats available"))
+    failure, failure_calls = counted(error=HTTPException(status_code=503, detail="Busy"))
+    other_key = IdempotencyStore.key(1, "POST", "/user/bookings/", "retry-2")
+
+    async def scenario():
+        with pytest.raises(HTTPException):
+            await store.run(KEY, fingerprint(), conflict)
+        replayed = await store.run(KEY, fingerprint(), conflict)
+        for _ in range(2):
+            with pytest.raises(HTTPException):
+                await store.run(other_key, fingerprint(), failure)
+        return replayed
+
+    replayed = asyncio.run(scenario())
+    assert len(conflict_calls) == 1
+    assert replayed.status_code == 409
+    assert json.loads(replayed.body) == {"detail": "Not enough seats available"}
+    assert len(failure_calls) == 2
+
+
+def test_a_response_of_the_route_is_replayed_with_its_status_and_headers():
+    store = IdempotencyStore()
+    queued = ORJSONResponse({"id": "ticket"}, status_code=202, headers={"Location": "/user/queue/ticket"})
+    call, calls = counted(queued)
+
+    async def scenario():
+        await store.run(KEY, fingerprint(), call, status_code=201)
+        return await store.run(KEY, fingerprint(), call, status_code=201)
+
+    again = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert again.status_code == 202
+    assert again.headers["location"] == "/user/queue/ticket"
+    assert json.loads(again.body) == {"id": "ticket"}
+
+
+def test_stored_responses_expire():
+    store = IdempotencyStore(ttl=0)
+    call, calls = counted({"id": 7})
+
+    async def scenario():
+        await store.run(KEY, fingerprint(), call)
+        await store.run(KEY, fingerprint(), call)
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+def test_requests_without_a_key_always_run_and_bad_keys_are_rejected():
+    call, calls = counted({"id": 7})
+
+    async def scenario():
+        await idempotent(None, 1, "POST", "/user/bookings/", (), call)
+        await idempotent(None, 1, "POST", "/user/bookings/", (), call)
+        with pytest.raises(HTTPException) as error:
+            await idempotent("x" * 256, 1, "POST", "/user/bookings/", (), call)
+        return error.value
+
+    error = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert error.status_code == 400
@@ -0,0 +1,43 @@
+import asyncio
+
+from sqlalchemy import func, select
+
+import models
+import search as movie_search
+import seating
+from routes import movies
+from seating import CAPACITY, SeatInventory, reserve_seats
+
+ADMIN = {"user_id": 1, "username": "admin", "role": "admin"}
+SLOT = "18:00-21:00"
+
+
+def test_deleted_movie_leaves_no_seats_taken_for_the_next_movie(session_factory, monkeypatch):
+    inventory = SeatInventory()
+    monkeypatch.setattr(seating, "seat_inventory", inventory)
+    monkeypatch.setattr(movies, "seat_inventory", inventory)
+    monkeypatch.setattr(movie_search, "_fts_available", False)
+
+    def add_movie(db) -> models.Movies:
+        movie = models.Movies(title="Heat", genre="Crime", duration=170, user_id=ADMIN["user_id"])
+        db.add(movie)
+        return movie
+
+    async def scenario():
+        async with session_factory() as db:
+            movie = add_movie(db)
+            await db.flush()
+            await reserve_seats(db, movie.id, SLOT, 4)
+            await db.commit()
+            await movies.delete_movie(movie.id, db, ADMIN)
+
+            # SQLite hands the ID of the last row out again
+            again = add_movie(db)
+            await db.commit()
+            seat_rows = await db.scalar(select(func.count()).select_from(models.ShowSeats))
+            return movie.id, again.id, seat_rows
+
+    deleted_id, new_id, seat_rows = asyncio.run(scenario())
+    assert new_id == deleted_id
+    assert seat_rows == 0
+    assert not inventory.is_loaded(new_id, SLOT)
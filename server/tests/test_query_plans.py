@@ -0,0 +1,79 @@
+"""Query plans of the hot route queries on a seeded, analyzed database.
+
+The statements come from the helpers the routes send them through, so a
+query that stops using its index fails here, e.g. after a change to the
+query or to the indexes in ``models.py``.
+"""
+import os
+import re
+import subprocess
+import sys
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, select
+
+import models
+from routes.bookings import booking_history, booking_rows
+from routes.movies import count_movies, filter_movies
+from seating import show_seat_numbers
+from showtimes import sold_by_bookings
+
+from conftest import SERVER_DIR
+
+MOVIE_ID, SLOT = 1, models.Bookings.TIME_SLOTS[0]
+
+# "SCAN bookings" or "SCAN movies USING COVERING INDEX ...", not a subquery's result
+FULL_SCAN = re.compile(r"^SCAN (bookings|movies)\b")
+SORTED = "USE TEMP B-TREE"
+
+
+def catalog(genre=None, min_rating=None):
+    return filter_movies(select(models.Movies), genre, min_rating)
+
+
+HOT_QUERIES = {
+    "movies by genre": catalog("Drama").offset(20).limit(10),
+    "movies by genre, total": count_movies(catalog("Drama")),
+    "movies by rating": catalog(min_rating=8.5).offset(20).limit(10),
+    "movies by rating, total": count_movies(catalog(min_rating=8.5)),
+    "movies by genre and rating": catalog("Drama", 8.5).limit(10),
+    "movies by genre and rating, total": count_movies(catalog("Drama", 8.5)),
+    "booking history": booking_history(1),
+    "booking history, some fields": booking_history(1, ("id", "movie_name", "Status")),
+    "booking history, next page": booking_history(1, after=(datetime(2025, 6, 1), 1000)),
+    "booking by id": booking_rows().where(models.Bookings.id == 1),
+    "show seats of active bookings": show_seat_numbers(MOVIE_ID, SLOT),
+    "show seats sold by bookings": sold_by_bookings(MOVIE_ID, models.Bookings.TIME_SLOTS),
+}
+
+
+@pytest.fixture(scope="module")
+def conn(tmp_path_factory):
+    path = tmp_path_factory.mktemp("plans") / "plans.db"
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}", BCRYPT_ROUNDS="4")
+    subprocess.run(
+        [sys.executable, "seed_data.py", "--users", "2000", "--movies", "300", "--bookings", "30000"],
+        cwd=SERVER_DIR, env=env, check=True, stdout=subprocess.DEVNULL,
+    )
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.connect() as conn:
+        yield conn
+    engine.dispose()
+
+
+def explain(conn, statement) -> list[str]:
+    compiled = statement.compile(conn, compile_kwargs={"render_postcompile": True})
+    params = compiled.construct_params()
+    processors = compiled._bind_processors
+    values = tuple(
+        processors[name](params[name]) if name in processors else params[name]
+        for name in compiled.positiontup
+    )
+    return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", values)]
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_query_uses_an_index(conn, name):
+    plan = explain(conn, HOT_QUERIES[name])
+    assert not [line for line in plan if FULL_SCAN.match(line) or SORTED in line], plan
@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+from rate_limit import AdmissionControl, MemoryBackend, RateLimiter
+
+
+def test_sliding_window_counts_part_of_the_previous_window(monkeypatch):
+    now = [6000.0]  # start of a 60 second window
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    limiter = RateLimiter({"booking": (3, 60)}, backend=MemoryBackend())
+
+    def check(client: str = "user:1"):
+        return asyncio.run(limiter.check("booking", client))
+
+    assert [check() for _ in range(3)] == [None, None, None]
+    assert check() == 75
+    assert check("user:2") is None
+
+    # Halfway through the next window half of the last one's four still count
+    now[0] = 6090.0
+    assert check() is None
+    assert check() is not None
+    # and none once it has slid out entirely
+    now[0] = 6180.0
+    assert check() is None
+    assert limiter.stats()["limited"] == 2
+
+
+def test_requests_over_the_in_flight_cap_are_shed():
+    admission = AdmissionControl(max_in_flight=1, wait=0.01)
+
+    async def scenario():
+        first = await admission.acquire()
+        second = await admission.acquire()
+        admission.release()
+        third = await admission.acquire()
+        admission.release()
+        return first, second, third
+
+    assert asyncio.run(scenario()) == (True, False, True)
+    assert admission.stats() == {"in_flight": 0, "max_in_flight": 1, "shed": 1}
+
+
+def test_zero_in_flight_cap_admits_everything():
+    admission = AdmissionControl(max_in_flight=0)
+
+    async def scenario():
+        return [await admission.acquire() for _ in range(10)]
+
+    assert all(asyncio.run(scenario()))
+    assert admission.stats()["in_flight"] == 10
@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+from starlette.requests import Request
+
+from response_cache import MemoryBackend, ResponseCache, cache_key
+
+
+def request(if_none_match: str = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/movies/", "headers": headers})
+
+
+class Catalog:
+    """Stand-in for the database behind a cached route."""
+
+    def __init__(self):
+        self.movies = ["Movie 1"]
+        self.loads = 0
+
+    async def load(self):
+        self.loads += 1
+        return {"movies": list(self.movies)}
+
+
+def test_second_request_is_served_from_the_cache():
+    cache, catalog = ResponseCache("test", backend=MemoryBackend()), Catalog()
+
+    async def scenario():
+        first = await cache.respond(request(), cache_key("movies", 0, 10), catalog.load)
+        second = await cache.respond(request(), cache_key("movies", 0, 10), catalog.load)
+        other_page = await cache.respond(request(), cache_key("movies", 10, 10), catalog.load)
+        return first, second, other_page
+
+    first, second, other_page = asyncio.run(scenario())
+    assert catalog.loads == 2
+    assert first.body == second.body
+    assert json.loads(first.body) == {"movies": ["Movie 1"]}
+    assert first.headers["etag"] == second.headers["etag"]
+    assert cache.stats() == {"hits": 1, "misses": 2}
+
+
+def test_matching_etag_gets_a_304_without_a_body():
+    cache, catalog = ResponseCache("test", backend=MemoryBackend()), Catalog()
+
+    async def scenario():
+        first = await cache.respond(request(), "key", catalog.load)
+        etag = first.headers["etag"]
+        return (
+            etag,
+            await cache.respond(request(etag), "key", catalog.load),
+            await cache.respond(request(f'W/"other", {etag}'), "key", catalog.load),
+            await cache.respond(request('"stale"'), "key", catalog.load),
+        )
+
+    etag, not_modified, listed, stale = asyncio.run(scenario())
+    assert not_modified.status_code == listed.status_code == 304
+    assert not_modified.body == b""
+    assert not_modified.headers["etag"] == etag
+    assert not_modified.headers["cache-control"] == "public, no-cache"
+    assert stale.status_code == 200
+    assert catalog.loads == 1
+
+
+def test_invalidate_drops_every_entry_and_changes_the_etag():
+    cache, catalog = ResponseCache("test", backend=MemoryBackend()), Catalog()
+
+    async def scenario():
+        before = await cache.respond(request(), "key", catalog.load)
+        total_before = await cache.value("total", catalog.load)
+        catalog.movies.append("Movie 2")
+        await cache.invalidate()
+        after = await cache.respond(request(before.headers["etag"]), "key", catalog.load)
+        total_after = await cache.value("total", catalog.load)
+        return before, after, total_before, total_after
+
+    before, after, total_before, total_after = asyncio.run(scenario())
+    assert after.status_code == 200
+    assert after.headers["etag"] != before.headers["etag"]
+    assert json.loads(after.body) == {"movies": ["Movie 1", "Movie 2"]}
+    assert total_before == {"movies": ["Movie 1"]}
+    assert total_after == {"movies": ["Movie 1", "Movie 2"]}
+    assert catalog.loads == 4
+
+
+def test_caches_in_other_namespaces_are_not_invalidated():
+    catalog = Catalog()
+    backend = MemoryBackend()
+    movies, other = ResponseCache("movies", backend=backend), ResponseCache("other", backend=backend)
+
+    async def scenario():
+        await movies.respond(request(), "key", catalog.load)
+        await other.respond(request(), "key", catalog.load)
+        await other.invalidate()
+        await movies.respond(request(), "key", catalog.load)
+
+    asyncio.run(scenario())
+    assert movies.stats() == {"hits": 1, "misses": 1}
+    assert catalog.loads == 2
+
+
+def test_entries_expire_after_their_ttl():
+    cache, catalog = ResponseCache("test", backend=MemoryBackend(), ttl=0), Catalog()
+
+    async def scenario():
+        await cache.respond(request(), "key", catalog.load)
+        await cache.respond(request(), "key", catalog.load)
+
+    asyncio.run(scenario())
+    assert catalog.loads == 2
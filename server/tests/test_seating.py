@@ -0,0 +1,171 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select, update
+
+import models
+import seating
+from seating import (
+    CAPACITY, ROWS, SEATS_PER_ROW, SeatInventory, SeatsUnavailable, best_available, parse_seats,
+    reserve_seat_groups, reserve_seats, seat_labels,
+)
+
+MOVIE = 1
+SLOT = "18:00-21:00"
+
+
+def row_of(label: str) -> int:
+    return parse_seats(",".join(f"{label}{number}" for number in range(1, SEATS_PER_ROW + 1)))
+
+
+@pytest.fixture(autouse=True)
+def inventory(monkeypatch):
+    inventory = SeatInventory()
+    monkeypatch.setattr(seating, "seat_inventory", inventory)
+    return inventory
+
+
+async def stored(db) -> int:
+    taken = 0
+    for row, bits in (await db.execute(
+        select(models.ShowSeats.row, models.ShowSeats.taken).where(
+            models.ShowSeats.Movies_id == MOVIE, models.ShowSeats.ticket_slot == SLOT,
+        )
+    )).all():
+        taken |= bits << (row * SEATS_PER_ROW)
+    return taken
+
+
+# ---------------- best_available ----------------
+
+def test_group_sits_together_in_the_middle_of_the_best_row():
+    assert seat_labels(best_available(0, 4)) == ["E14", "E15", "E16", "E17"]
+
+
+def test_group_moves_to_the_next_best_row_when_its_row_is_full():
+    assert seat_labels(best_available(row_of("E"), 2)) == ["F15", "F16"]
+
+
+def test_group_stays_as_close_to_the_center_as_the_free_seats_allow():
+    taken = parse_seats("E14,E15,E16,E17")
+    assert seat_labels(best_available(taken, 2)) == ["E12", "E13"]
+
+
+def test_group_wider_than_a_row_is_split_over_the_best_rows():
+    chosen = best_available(0, SEATS_PER_ROW + 2)
+    assert chosen & row_of("E") == row_of("E")
+    assert seat_labels(chosen & row_of("F")) == ["F15", "F16"]
+
+
+def test_group_is_split_when_no_row_has_enough_seats_together():
+    # Every other seat of every row taken
+    taken = 0
+    for row in range(len(ROWS)):
+        taken |= int("01" * (SEATS_PER_ROW // 2), 2) << (row * SEATS_PER_ROW)
+    chosen = best_available(taken, 2)
+    assert chosen.bit_count() == 2
+    assert not chosen & taken
+
+
+def test_sold_out_show_has_no_seats():
+    full = (1 << CAPACITY) - 1
+    assert best_available(full, 1) == 0
+    assert best_available(full & ~parse_seats("A1"), 2) == 0
+    assert best_available(0, CAPACITY + 1) == 0
+    assert best_available(0, 0) == 0
+
+
+def test_held_seats_are_skipped_by_reserve(inventory):
+    inventory.load(MOVIE, SLOT, 0)
+    held = inventory.hold(MOVIE, SLOT, 4)
+    chosen = inventory.reserve(MOVIE, SLOT, 4)
+    assert chosen and not chosen & held
+
+
+# ---------------- reserve_seat_groups ----------------
+
+def test_groups_are_reserved_apart_and_written_once(session_factory):
+    async def scenario():
+        async with session_factory() as db:
+            chosen = await reserve_seat_groups(db, MOVIE, SLOT, [2, 3, 4])
+            await db.commit()
+            return chosen, await stored(db)
+
+    chosen, taken = asyncio.run(scenario())
+    assert [mask.bit_count() for mask in chosen] == [2, 3, 4]
+    assert chosen[0] & chosen[1] == chosen[0] & chosen[2] == chosen[1] & chosen[2] == 0
+    assert taken == chosen[0] | chosen[1] | chosen[2]
+
+
+def test_groups_that_do_not_fit_get_no_seats(session_factory):
+    async def scenario():
+        async with session_factory() as db:
+            chosen = await reserve_seat_groups(db, MOVIE, SLOT, [CAPACITY - 1, 2, 1])
+            await db.commit()
+            with pytest.raises(SeatsUnavailable):
+                await reserve_seats(db, MOVIE, SLOT, 1)
+            return chosen
+
+    chosen = asyncio.run(scenario())
+    assert chosen[0].bit_count() == CAPACITY - 1
+    assert chosen[1] == 0
+    assert chosen[2].bit_count() == 1
+
+
+def test_seats_sold_by_another_process_are_skipped_on_retry(session_factory, inventory):
+    async def scenario():
+        async with session_factory() as db:
+            await reserve_seats(db, MOVIE, SLOT, 1)
+            await db.commit()
+            # Another process takes the seats this one would pick next
+            sold_elsewhere = best_available(await stored(db), 4)
+            row = ROWS.index(seat_labels(sold_elsewhere)[0][0])
+            await db.execute(
+                update(models.ShowSeats)
+                .where(models.ShowSeats.row == row)
+                .values(taken=models.ShowSeats.taken.op("|")(sold_elsewhere >> (row * SEATS_PER_ROW)))
+            )
+            await db.commit()
+
+            chosen = await reserve_seats(db, MOVIE, SLOT, 4)
+            await db.commit()
+            return sold_elsewhere, chosen, await stored(db)
+
+    sold_elsewhere, chosen, taken = asyncio.run(scenario())
+    assert chosen.bit_count() == 4
+    assert not chosen & sold_elsewhere
+    assert taken & (chosen | sold_elsewhere) == chosen | sold_elsewhere
+
+
+def test_a_conflicting_row_rolls_back_the_rows_taken_before_it(session_factory):
+    async def scenario():
+        async with session_factory() as db:
+            await seating.load_show(db, MOVIE, SLOT)
+            conflict = parse_seats("F1")
+            await seating._take(db, MOVIE, SLOT, conflict)
+            before = await stored(db)
+            taken = await seating._take(db, MOVIE, SLOT, parse_seats("E1,E2") | conflict)
+            return taken, before, await stored(db)
+
+    taken, before, after = asyncio.run(scenario())
+    assert not taken
+    assert after == before
+
+
+def test_reserving_gives_up_after_persist_retries(session_factory, inventory, monkeypatch):
+    attempts = []
+
+    async def always_conflicts(db, movie_id, slot, mask):
+        attempts.append(mask)
+        return False
+
+    monkeypatch.setattr(seating, "_take", always_conflicts)
+
+    async def scenario():
+        async with session_factory() as db:
+            with pytest.raises(SeatsUnavailable):
+                await reserve_seats(db, MOVIE, SLOT, 2)
+
+    asyncio.run(scenario())
+    assert len(attempts) == seating.PERSIST_RETRIES
+    assert not inventory.is_loaded(MOVIE, SLOT)
@@ -0,0 +1,45 @@
+import time
+
+from token_cache import TokenCache
+
+CLAIMS = {"user_id": 1, "username": "admin", "role": "admin"}
+
+
+def test_token_is_forgotten_once_it_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = TokenCache()
+    cache.put("token", CLAIMS, expires_at=1060.0)
+    cache.put("expired", CLAIMS, expires_at=1000.0)
+
+    assert cache.get("token") == CLAIMS
+    assert cache.get("expired") is None
+    now[0] = 1060.0
+    assert cache.get("token") is None
+    assert cache.stats() == {"size": 0, "hits": 1, "misses": 2}
+
+
+def test_least_recently_used_token_is_dropped_first():
+    cache = TokenCache(size=2)
+    expires_at = time.time() + 60
+    cache.put("first", {"user_id": 1}, expires_at)
+    cache.put("second", {"user_id": 2}, expires_at)
+    cache.get("first")
+    cache.put("third", {"user_id": 3}, expires_at)
+
+    assert cache.get("second") is None
+    assert cache.get("first") == {"user_id": 1}
+    assert cache.get("third") == {"user_id": 3}
+
+
+def test_claims_handed_out_are_copies():
+    cache = TokenCache()
+    cache.put("token", CLAIMS, time.time() + 60)
+    cache.get("token")["role"] = "user"
+    assert cache.get("token")["role"] == "admin"
+
+
+def test_size_zero_caches_nothing():
+    cache = TokenCache(size=0)
+    cache.put("token", CLAIMS, time.time() + 60)
+    assert cache.get("token") is None
@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+from waiting_room import AlreadyQueued, QueueFull, WaitingRoom
+
+
+def user(user_id: int) -> dict:
+    return {"user_id": user_id, "username": f"user{user_id}", "role": "user"}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_tickets_are_admitted_in_order_at_the_room_rate(clock):
+    room = WaitingRoom()
+    room.open(1, rate=2)
+    tickets = [room.enqueue(1, user(user_id), "2 Regular") for user_id in range(5)]
+    assert [room.position(ticket) for ticket in tickets] == [1, 2, 3, 4, 5]
+
+    clock[0] += 1
+    assert room.admit() == tickets[:2]
+    assert [room.position(ticket) for ticket in tickets] == [0, 0, 1, 2, 3]
+    assert room.estimated_wait(tickets[4]) == 1.5
+
+    # Half a second earns one more, and a long pause no more than a second's worth
+    clock[0] += 0.5
+    assert room.admit() == tickets[2:3]
+    clock[0] += 30
+    assert room.admit() == tickets[3:5]
+
+
+def test_one_round_admits_at_most_max_batch(clock):
+    room = WaitingRoom(max_batch=3)
+    for movie_id in (1, 2):
+        room.open(movie_id, rate=10)
+        for user_id in range(5):
+            room.enqueue(movie_id, user(user_id), "1 Regular")
+
+    clock[0] += 1
+    assert len(room.admit()) == 3
+
+
+def test_a_user_waits_with_one_order_per_movie():
+    room = WaitingRoom()
+    room.open(1, rate=1)
+    room.open(2, rate=1)
+    ticket = room.enqueue(1, user(1), "2 Regular")
+
+    assert room.enqueue(1, user(1), "2 Regular") is ticket
+    with pytest.raises(AlreadyQueued):
+        room.enqueue(1, user(1), "3 Regular")
+    assert room.enqueue(2, user(1), "3 Regular") is not ticket
+    assert room.ticket(ticket.id, 1) is ticket
+    assert room.ticket(ticket.id, 2) is None
+
+
+def test_full_queue_refuses_tickets():
+    room = WaitingRoom(max_queue=2)
+    room.open(1, rate=1)
+    room.enqueue(1, user(1), "1 Regular")
+    room.enqueue(1, user(2), "1 Regular")
+    with pytest.raises(QueueFull):
+        room.enqueue(1, user(3), "1 Regular")
+
+
+def test_closed_room_goes_away_once_its_queue_is_written(clock):
+    room = WaitingRoom()
+    room.open(1, rate=5)
+    ticket = room.enqueue(1, user(1), "1 Regular")
+    assert room.close(1)
+    assert not room.is_open(1)
+
+    clock[0] += 1
+    assert room.admit() == [ticket]
+    room.finish(ticket, 201, {"id": 7})
+    room.admit()
+    assert room.room(1) is None
+    assert room.ticket(ticket.id, 1).result == {"id": 7}
@@ -0,0 +1,218 @@
+"""Virtual waiting rooms for shows that open to a rush of bookings.
+
+An admin opens a room for a movie with an admission rate. While it is open,
+``POST /user/bookings/`` for that movie writes nothing: the order gets a
+queue ticket and a 202, and the client polls ``GET /user/queue/{id}`` for
+its position and, once written, its booking.
+
+One writer task admits tickets from every room at the room's rate, first
+come first served, and writes each round of admitted orders in a single
+transaction: one seat map write and one counter update per show, one
+multi-row INSERT and one commit. A rush costs SQLite a few large commits a
+second instead of one per request, each waiting on the write lock.
+
+A user has at most one waiting ticket per movie: ordering the same again
+returns it, ordering something else is refused until it was written. Sent
+with an ``Idempotency-Key``, a retry gets its first 202 back even after
+that, see idempotency.py. Results are kept ``WAITING_ROOM_RESULT_TTL``
+seconds after the order is written. Rooms live in the server process that
+opened them, like seat holds, so a launch needs its bookings routed to one
+process.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+WAITING_ROOM_TICK_MS = int(os.getenv("WAITING_ROOM_TICK_MS", "200"))
+# Orders written per transaction
+WAITING_ROOM_MAX_BATCH = int(os.getenv("WAITING_ROOM_MAX_BATCH", "500"))
+WAITING_ROOM_MAX_QUEUE = int(os.getenv("WAITING_ROOM_MAX_QUEUE", "100000"))
+WAITING_ROOM_RESULT_TTL = int(os.getenv("WAITING_ROOM_RESULT_TTL", "600"))
+
+log = logging.getLogger("showtimex.waiting_room")
+
+
+class QueueFull(Exception):
+    """Raised when a room already has ``WAITING_ROOM_MAX_QUEUE`` tickets waiting."""
+
+
+class AlreadyQueued(Exception):
+    """Raised when a user with a waiting ticket orders something else for the movie."""
+
+
+@dataclass
+class Ticket:
+    id: str
+    seq: int
+    movie_id: int
+    user: dict
+    order: Any  # schemas.BookingCreate
+    # Set once the order is written: 201 and the booking row, or an error and its detail
+    status_code: Optional[int] = None
+    result: Any = None
+
+
+@dataclass
+class Room:
+    movie_id: int
+    rate: float  # tickets admitted per second
+    open: bool = True
+    queue: deque = field(default_factory=deque)
+    # user -> their waiting ticket
+    waiting: dict = field(default_factory=dict)
+    issued: int = 0
+    admitted: int = 0
+    credit: float = 0.0
+
+
+class WaitingRoom:
+    def __init__(
+        self, interval: float = WAITING_ROOM_TICK_MS / 1000, max_batch: int = WAITING_ROOM_MAX_BATCH,
+        max_queue: int = WAITING_ROOM_MAX_QUEUE, result_ttl: int = WAITING_ROOM_RESULT_TTL,
+    ):
+        self.interval = interval
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self.commits = 0
+        self.written = 0
+        self.largest_batch = 0
+        self._rooms: dict[int, Room] = {}
+        self._tickets: dict[str, Ticket] = {}
+        # (forget at, ticket id) of written tickets, oldest first
+        self._done: deque = deque()
+        self._last_admit = time.monotonic()
+
+    def open(self, movie_id: int, rate: float) -> Room:
+        """Open a room for ``movie_id``, or change the rate of the one it has."""
+        room = self._rooms.get(movie_id)
+        if room is None:
+            room = self._rooms[movie_id] = Room(movie_id, rate)
+        room.rate = rate
+        room.open = True
+        return room
+
+    def close(self, movie_id: int) -> bool:
+        """Stop queuing new orders; tickets already waiting are still written."""
+        room = self._rooms.get(movie_id)
+        if room is None or not room.open:
+            return False
+        room.open = False
+        return True
+
+    def room(self, movie_id: int) -> Optional[Room]:
+        return self._rooms.get(movie_id)
+
+    def is_open(self, movie_id: int) -> bool:
+        room = self._rooms.get(movie_id)
+        return room is not None and room.open
+
+    def enqueue(self, movie_id: int, user: dict, order) -> Ticket:
+        """Queue ``order`` of ``user``; raises ``QueueFull`` or ``AlreadyQueued``."""
+        room = self._rooms[movie_id]
+        ticket = room.waiting.get(user["user_id"])
+        if ticket is not None:
+            if ticket.order != order:
+                raise AlreadyQueued()
+            return ticket
+        if len(room.queue) >= self.max_queue:
+            raise QueueFull()
+
+        ticket = Ticket(uuid.uuid4().hex, room.issued, movie_id, user, order)
+        room.issued += 1
+        room.queue.append(ticket)
+        room.waiting[user["user_id"]] = ticket
+        self._tickets[ticket.id] = ticket
+        return ticket
+
+    def ticket(self, ticket_id: str, user_id: int) -> Optional[Ticket]:
+        ticket = self._tickets.get(ticket_id)
+        if ticket is None or ticket.user["user_id"] != user_id:
+            return None
+        return ticket
+
+    def position(self, ticket: Ticket) -> int:
+        """Tickets ahead of this one plus one, 0 once it was admitted."""
+        room = self._rooms.get(ticket.movie_id)
+        if room is None or ticket.seq < room.admitted:
+            return 0
+        return ticket.seq - room.admitted + 1
+
+    def estimated_wait(self, ticket: Ticket) -> float:
+        room = self._rooms.get(ticket.movie_id)
+        if room is None:
+            return 0.0
+        return round(self.position(ticket) / room.rate, 1)
+
+    def admit(self) -> list[Ticket]:
+        """Tickets due by each room's rate, at most ``max_batch`` in all."""
+        now = time.monotonic()
+        elapsed, self._last_admit = now - self._last_admit, now
+        admitted = []
+        for movie_id, room in list(self._rooms.items()):
+            if not room.queue:
+                room.credit = 0.0
+                if not room.open:
+                    del self._rooms[movie_id]
+                continue
+            # At most a second's worth builds up while the writer is busy
+            room.credit = min(room.credit + room.rate * elapsed, max(room.rate, 1.0))
+            count = min(int(room.credit), len(room.queue), self.max_batch - len(admitted))
+            room.credit -= count
+            for _ in range(count):
+                ticket = room.queue.popleft()
+                del room.waiting[ticket.user["user_id"]]
+                admitted.append(ticket)
+            room.admitted += count
+        return admitted
+
+    def finish(self, ticket: Ticket, status_code: int, result) -> None:
+        ticket.status_code = status_code
+        ticket.result = result
+        self._done.append((time.monotonic() + self.result_ttl, ticket.id))
+
+    def _forget_results(self) -> None:
+        now = time.monotonic()
+        while self._done and self._done[0][0] <= now:
+            self._tickets.pop(self._done.popleft()[1], None)
+
+    async def run(self, write: Callable[[list[Ticket]], Awaitable[list[tuple[int, Any]]]]) -> None:
+        """Admit and write tickets every ``interval`` seconds until cancelled.
+
+        ``write`` stores the orders of a list of tickets in one transaction and
+        returns (status code, booking row or error detail) for each.
+        """
+        while True:
+            await asyncio.sleep(self.interval)
+            self._forget_results()
+            tickets = self.admit()
+            if not tickets:
+                continue
+            try:
+                results = await write(tickets)
+            except Exception:
+                log.exception("Writing %d queued bookings failed", len(tickets))
+                results = [(503, "Booking could not be saved, please order again")] * len(tickets)
+            else:
+                self.commits += 1
+                self.written += len(tickets)
+                self.largest_batch = max(self.largest_batch, len(tickets))
+            for ticket, (status_code, result) in zip(tickets, results):
+                self.finish(ticket, status_code, result)
+
+    def stats(self) -> dict:
+        return {
+            "rooms": len(self._rooms),
+            "waiting": sum(len(room.queue) for room in self._rooms.values()),
+            "commits": self.commits,
+            "written": self.written,
+            "largest_batch": self.largest_batch,
+        }
+
+
+waiting_room = WaitingRoom()